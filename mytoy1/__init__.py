@@ -10,7 +10,14 @@ from ._types_and_formats import (
     SingleDNASequence, SingleRecordDNAFASTAFormat,
     SingleRecordDNAFASTADirectoryFormat,
     TotalSeqCount, MySequenceCountFormat,
-    SingleRecordSeqCountDirectoryFormat)
+    SingleRecordSeqCountDirectoryFormat,
+    PairwiseAlignments, PairwiseAlignmentsFormat,
+    PairwiseAlignmentsDirectoryFormat,
+    CIGARAlignments, CIGARAlignmentsFormat, CIGARAlignmentsDirectoryFormat,
+    SequenceStats, SequenceStatsFormat, SequenceLengthsFormat,
+    SequenceStatsDirectoryFormat)
+from ._sequences import (EncodedSequence, EncodedDNAIterator, DNAFASTAFile,
+                         PairwiseAlignmentIterator)
 
 
 
@@ -26,5 +33,13 @@ __all__ = [
     "SingleDNASequence", "SingleRecordDNAFASTAFormat",
     "SingleRecordDNAFASTADirectoryFormat",
     "TotalSeqCount", "MySequenceCountFormat",
-    "SingleRecordSeqCountDirectoryFormat"
+    "SingleRecordSeqCountDirectoryFormat",
+    "PairwiseAlignments", "PairwiseAlignmentsFormat",
+    "PairwiseAlignmentsDirectoryFormat",
+    "CIGARAlignments", "CIGARAlignmentsFormat",
+    "CIGARAlignmentsDirectoryFormat",
+    "SequenceStats", "SequenceStatsFormat", "SequenceLengthsFormat",
+    "SequenceStatsDirectoryFormat",
+    "EncodedSequence", "EncodedDNAIterator", "DNAFASTAFile",
+    "PairwiseAlignmentIterator"
 ]
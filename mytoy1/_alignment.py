@@ -0,0 +1,1229 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import re
+
+import numpy as np
+
+from skbio import DNA
+from skbio.alignment import TabularMSA
+
+# The alignment engine works on integer encoded sequences. A, C, G and T are
+# codes 0 to 3, and the IUPAC degenerate bases follow them; substitution
+# scores are looked up in a table indexed by the codes of both sequences.
+_ALPHABET = b'ACGT'
+_IUPAC_BASES = {'A': 'A', 'C': 'C', 'G': 'G', 'T': 'T',
+                'R': 'AG', 'Y': 'CT', 'S': 'CG', 'W': 'AT', 'K': 'GT',
+                'M': 'AC', 'B': 'CGT', 'D': 'AGT', 'H': 'ACT', 'V': 'ACG',
+                'N': 'ACGT'}
+_IUPAC_ALPHABET = ''.join(_IUPAC_BASES).encode('ascii')
+# The code of the complement of each code: the degenerate base standing for
+# the complements of the bases it stands for.
+_COMPLEMENT = np.array(
+    [list(map(set, _IUPAC_BASES.values())).index(
+        set(bases.translate(str.maketrans('ACGT', 'TGCA'))))
+     for bases in _IUPAC_BASES.values()], dtype=np.uint8)
+_GAP_CHAR = ord('-')
+
+_ENCODING = np.full(256, 255, dtype=np.uint8)
+for _code, _char in enumerate(_IUPAC_ALPHABET):
+    _ENCODING[_char] = _code
+    _ENCODING[ord(chr(_char).lower())] = _code
+del _code, _char
+
+# Pairs aligned together in a batch keep at most about this many cells of
+# traceback between them.
+_BATCH_CELLS = 2 ** 24
+
+# Multiplier packing the number of matches and of diagonal steps of a path
+# into one integer.
+_MATCH_UNIT = 2 ** 32
+
+# Traceback directions, using the same encoding as scikit-bio.
+_TB_END = 0
+_TB_MATCH = 1
+_TB_VGAP = 2
+_TB_HGAP = 3
+
+# The alignment modes: terminal gaps penalized like any other, terminal gaps
+# free, as scikit-bio's global alignment has them, and Smith-Waterman.
+_MODES = ('global', 'semi-global', 'local')
+
+# Whether leading and trailing gaps are free in each mode; in local mode,
+# the first row and column score zero as free leading gaps do. The last two
+# modes, with only the gaps at one end free, are for the ends of sequences
+# aligned between anchors.
+_FREE_END_GAPS = {'global': (False, False), 'semi-global': (True, True),
+                  'local': (True, False), 'semi-global-start': (True, False),
+                  'semi-global-end': (False, True)}
+
+# The lengths and the operations of a CIGAR string.
+_CIGAR_LENGTHS = re.compile(r'\d+')
+_CIGAR_OPS = re.compile(r'[MID]')
+
+# Where each of the four 2-bit directions packed into a byte goes.
+_BIT_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+
+def encode(seq, degenerate=False):
+    """Return the uint8 code array for an ACGT ``skbio.DNA`` sequence.
+
+    With ``degenerate``, the IUPAC degenerate bases are allowed as well.
+    """
+    raw = np.frombuffer(str(seq).encode('ascii'), dtype=np.uint8)
+    codes = _ENCODING[raw]
+    alphabet = _IUPAC_ALPHABET if degenerate else _ALPHABET
+    bad = codes >= len(alphabet)
+    if bad.any():
+        offending = sorted(set(chr(c) for c in raw[bad]))
+        raise ValueError(
+            "Sequences may only contain the characters %s, but the "
+            "following character(s) were found: %s."
+            % (_characters(alphabet), ", ".join(offending)))
+    return codes
+
+
+def reverse_complement(codes):
+    """Return the codes of the reverse complement of an encoded
+    sequence."""
+    return _COMPLEMENT[codes[::-1]]
+
+
+def _characters(alphabet):
+    return '%s and %s' % (', '.join(alphabet[:-1].decode('ascii')),
+                          chr(alphabet[-1]))
+
+
+def substitution_table(match_score, mismatch_score):
+    """Return the code-by-code substitution scores for ``match_score`` and
+    ``mismatch_score``.
+
+    A, C, G and T score as in the matrix that
+    ``skbio.alignment.global_pairwise_align_nucleotide`` builds; the
+    degenerate bases score as ``iupac_substitution_table`` makes them.
+    """
+    scores = np.full((len(_ALPHABET), len(_ALPHABET)), mismatch_score,
+                     dtype=float)
+    np.fill_diagonal(scores, match_score)
+    return iupac_substitution_table(_ALPHABET.decode('ascii'), scores)
+
+
+def iupac_substitution_table(characters, scores):
+    """Return the code-by-code substitution table for a matrix of scores.
+
+    ``scores[i, j]`` is the score of ``characters[i]`` against
+    ``characters[j]``, which must include A, C, G and T and may include any
+    of the IUPAC degenerate bases. A pair with a degenerate base that isn't
+    in ``characters`` scores the average of the pairs of bases it could
+    stand for: with a match score of 1 and a mismatch score of -2, N against
+    A scores 1/4 * 1 + 3/4 * -2. This is all worked out once, so that
+    degenerate bases cost nothing extra while aligning.
+    """
+    characters = [character.upper() for character in characters]
+    unknown = sorted(set(characters) - set(_IUPAC_BASES))
+    if unknown:
+        raise ValueError(
+            "The substitution matrix may only have the characters %s, but "
+            "the following character(s) were found: %s."
+            % (_characters(_IUPAC_ALPHABET), ", ".join(unknown)))
+    missing = [base for base in _ALPHABET.decode('ascii')
+               if base not in characters]
+    if missing:
+        raise ValueError("The substitution matrix has no scores for %s."
+                         % ", ".join(missing))
+
+    scores = np.asarray(scores, dtype=float)
+    codes = _ENCODING[np.frombuffer(''.join(characters).encode('ascii'),
+                                    dtype=np.uint8)]
+    is_base = codes < len(_ALPHABET)
+    base_scores = np.empty((len(_ALPHABET), len(_ALPHABET)))
+    base_scores[np.ix_(codes[is_base], codes[is_base])] = \
+        scores[np.ix_(is_base, is_base)]
+    # the weight of each base in each code
+    weights = np.zeros((len(_IUPAC_ALPHABET), len(_ALPHABET)))
+    for code, bases in enumerate(_IUPAC_BASES.values()):
+        weights[code, _ENCODING[np.frombuffer(bases.encode('ascii'),
+                                              dtype=np.uint8)]] = \
+            1 / len(bases)
+    table = weights @ base_scores @ weights.T
+    # exactly symmetric, whatever the rounding, if the scores are
+    table = (table + table.T) / 2
+    table[np.ix_(codes, codes)] = scores
+    return table
+
+
+def _score_dtype(table, gap_open_penalty, gap_extend_penalty, n, m):
+    # The smallest integer type that the scores of an n x m matrix fit in,
+    # with room to spare for the stand-in for -inf, or float if the scores
+    # aren't all whole numbers or could overflow.
+    values = np.append(table.ravel(), [gap_open_penalty, gap_extend_penalty])
+    if not np.array_equal(values, np.round(values)):
+        return np.float64
+    # every step of a path changes its score by at most this much
+    bound = (n + m + 1) * np.abs(values).max()
+    for dtype in (np.int16, np.int32):
+        if bound < np.iinfo(dtype).max // 4:
+            return dtype
+    return np.float64
+
+
+class XDropped(Exception):
+    """Raised when an alignment is abandoned by the X-drop rule.
+
+    ``result`` holds what the alignment would have returned for a truncated
+    alignment: the two sequences aligned up to the best scoring cell found,
+    followed by what is left of each of them against gaps. Its score is that
+    of the best cell.
+    """
+
+    def __init__(self, result):
+        super().__init__('The alignment was abandoned by the X-drop rule.')
+        self.result = result
+
+
+def global_align(codes1, codes2, gap_open_penalty, gap_extend_penalty,
+                 match_score, mismatch_score, band_width=None,
+                 memory_limit=None, x_drop=None, substitution_matrix=None,
+                 mode='semi-global', cells=None):
+    """Globally align two encoded sequences with affine gap penalties.
+
+    This computes exactly the recurrence used by
+    ``skbio.alignment.global_pairwise_align_nucleotide``: a gap is extended
+    when the neighboring cell was itself reached by a gap in the same
+    direction and opened otherwise, terminal gaps are not penalized, and ties
+    are broken in favor of a horizontal gap, then a match, then a vertical
+    gap. Rather than visiting the cells one at a time, the matrix is filled
+    one anti-diagonal at a time, as every cell of a diagonal only depends on
+    the two diagonals before it.
+
+    That is the default ``mode``, 'semi-global'. In 'global' mode, terminal
+    gaps are penalized like any other, as with scikit-bio's
+    ``penalize_terminal_gaps=True``. In 'local' mode, this is the
+    Smith-Waterman alignment of ``skbio.alignment.local_pairwise_align``: no
+    cell scores below zero, a cell scoring zero starts a new alignment, and
+    the alignment ends at the best scoring cell (the first in row-major
+    order, if there are several), covering only the aligned parts of the two
+    sequences. All three fill the same anti-diagonals; they only differ in
+    the first and last row and column, and in where the traceback starts.
+    The 'semi-global-start' and 'semi-global-end' modes only leave the
+    leading or the trailing gaps free, respectively.
+
+    The sequences may have degenerate bases in them, encoded with
+    ``encode(..., degenerate=True)``. Substitutions are scored by
+    ``substitution_table(match_score, mismatch_score)``, or by
+    ``substitution_matrix`` if it's given, a table like those that
+    ``iupac_substitution_table`` returns.
+
+    If ``band_width`` is given, only the cells within ``band_width`` of the
+    diagonals through the two corners of the matrix are filled. A path that
+    leaves the band has to cross one of its edges, so its score is at most
+    the score of that edge cell plus a perfect match of whatever is left of
+    the two sequences. Whenever that bound beats the score of the alignment
+    found inside the band, the band is widened and the alignment recomputed.
+    It is widened at least twofold, and enough that even a perfect match of
+    all the positions a path outside of it could align wouldn't beat the
+    score found so far, so the second attempt is always the last one.
+
+    The traceback takes two bits per filled cell. If that is more than
+    ``memory_limit`` bytes, only a few checkpoint diagonals are kept and the
+    parts of the matrix the traceback passes through are recomputed from
+    them. This gives the same alignment as keeping the whole traceback, in
+    about twice the time. Hirschberg's divide and conquer can't be used here:
+    it relies on the score of a cell being the best score of any path to it,
+    which the scikit-bio recurrence doesn't guarantee.
+
+    If ``x_drop`` is given, cells scoring more than ``x_drop`` below the best
+    score found so far are dropped, as in BLAST's X-drop extension, and the
+    filling stops once every cell of an anti-diagonal has been dropped.
+    Where trailing gaps are free, the cells of the last row and column don't
+    count: if one of them is left, all that remains is free trailing gaps,
+    and the alignment through the best such cell is returned, which may not
+    be quite the one found without ``x_drop``. Otherwise the alignment fell
+    too far from its best and is abandoned, raising ``XDropped``.
+
+    In 'global' mode, leading gaps cost as much as any other, so the first
+    row and column are dropped along with the rest, and an unrelated pair,
+    whose score only ever falls, is abandoned after a small part of the
+    matrix. Where leading gaps are free, as in 'semi-global' mode, the first
+    row and column keep every diagonal alive until the best score is more
+    than ``x_drop`` above zero. So an unrelated pair, which never scores
+    much, is only cut short once the diagonals are past the first row and
+    column, at about the length of the longer sequence, where the cells left
+    on the last row or column are only reached through terminal gaps. If
+    the best score is still no more than ``x_drop`` by then, the pair is
+    abandoned as well. ``x_drop`` can't be used in 'local' mode, where no
+    cell scores below zero, nor can ``band_width``, as the alignment
+    needn't go anywhere near the corners.
+
+    If ``cells`` is given, it's a ``collections.Counter`` that the cells
+    filled are counted in, as ``'filled'``, including those filled again for
+    a wider band or for the traceback.
+
+    Returns the alignment score and the aligned positions as two index arrays
+    into ``codes1`` and ``codes2``, with ``-1`` marking a gap.
+    """
+    _check_mode(mode, band_width, x_drop)
+    # rows follow codes2 and columns follow codes1, as in scikit-bio
+    n = len(codes2)
+    m = len(codes1)
+    if n == 0 or m == 0:
+        if mode == 'local':
+            empty = np.zeros(0, dtype=np.intp)
+            return 0.0, empty, empty.copy()
+        # aligning against an empty sequence is all terminal gaps
+        gaps = np.full(n + m, -1, dtype=np.intp)
+        idx1 = gaps.copy()
+        idx1[:m] = np.arange(m)
+        idx2 = gaps
+        idx2[m:] = np.arange(n)
+        score = 0.0
+        # two empty sequences align with nothing at all, gaps included
+        if mode == 'global' and n + m > 0:
+            score = -float(gap_open_penalty +
+                           (n + m - 1) * gap_extend_penalty)
+        return score, idx1, idx2
+
+    table = _table(match_score, mismatch_score, substitution_matrix)
+    while True:
+        band = _band(n, m, band_width)
+        diagonals = _Diagonals(codes1, codes2, table, gap_open_penalty,
+                               gap_extend_penalty, x_drop=x_drop, mode=mode,
+                               cells=cells)
+        if (memory_limit is not None and
+                _Traceback.size(n, m, band) > memory_limit):
+            traceback = _CheckpointedTraceback(
+                diagonals, band, _CheckpointedTraceback.interval(n, m))
+        else:
+            traceback = _Traceback(n, m, band)
+        score, edge_bound = _fill(diagonals, band, traceback)
+        if score is None:
+            # finished from the best cell on the last row or column, with
+            # trailing gaps, or else cut short at the best cell of all
+            abandoned = diagonals.abandoned()
+            if abandoned:
+                score, (i, j) = diagonals.best, diagonals.best_cell
+            else:
+                score, (i, j) = diagonals.end, diagonals.end_cell
+            idx1, idx2 = _traceback(traceback, i, j)
+            result = (score,
+                      np.concatenate([idx1, np.arange(j, m),
+                                      np.full(n - i, -1)]),
+                      np.concatenate([idx2, np.full(m - j, -1),
+                                      np.arange(i, n)]))
+            if abandoned:
+                raise XDropped(result)
+            return result
+        if mode == 'local':
+            score, (i, j) = diagonals.peak, diagonals.peak_cell
+            idx1, idx2 = _traceback(traceback, i, j)
+            return score, idx1, idx2
+        if edge_bound <= score:
+            idx1, idx2 = _traceback(traceback, n, m)
+            return score, idx1, idx2
+        band_width = _widen(n, m, table, band_width, score)
+
+
+def global_align_strands(codes1, strands, gap_open_penalty,
+                         gap_extend_penalty, match_score, mismatch_score,
+                         band_width=None, memory_limit=None, x_drop=None,
+                         substitution_matrix=None, mode='semi-global',
+                         cells=None):
+    """Globally align an encoded sequence against each of a few others of
+    the same length, such as both strands of a sequence.
+
+    Gives the same alignments as ``global_align`` on ``codes1`` and each of
+    ``strands``, as a list in the order of ``strands``. An alignment that is
+    abandoned by x-drop has its ``XDropped`` in its place rather than
+    raising it, so that the others are still returned.
+
+    Without ``band_width`` or ``x_drop``, in the default mode, and if their
+    tracebacks fit in a batch of ``global_align_batch`` together, and in
+    ``memory_limit``, all the alignments are filled in one sweep over the
+    anti-diagonals; otherwise they are aligned one after the other, each
+    with the packed traceback of ``global_align``, which takes a fraction of
+    the memory of a batch's. ``cells`` is as for ``global_align``.
+    """
+    n = len(strands[0])
+    m = len(codes1)
+    batched = len(strands) * batch_cells(n, m)
+    if (len(strands) > 1 and n > 0 and m > 0 and band_width is None and
+            x_drop is None and mode == 'semi-global' and
+            batched <= _BATCH_CELLS and
+            (memory_limit is None or batched <= memory_limit)):
+        if cells is not None:
+            cells['filled'] += len(strands) * (n + 1) * (m + 1)
+        return global_align_batch(
+            [(codes1, codes2) for codes2 in strands], gap_open_penalty,
+            gap_extend_penalty, match_score, mismatch_score,
+            max_cells=batched, substitution_matrix=substitution_matrix)
+
+    results = []
+    for codes2 in strands:
+        try:
+            results.append(global_align(
+                codes1, codes2, gap_open_penalty, gap_extend_penalty,
+                match_score, mismatch_score, band_width=band_width,
+                memory_limit=memory_limit, x_drop=x_drop,
+                substitution_matrix=substitution_matrix, mode=mode,
+                cells=cells))
+        except XDropped as e:
+            results.append(e)
+    return results
+
+
+def global_score(codes1, codes2, gap_open_penalty, gap_extend_penalty,
+                 match_score, mismatch_score, band_width=None, x_drop=None,
+                 substitution_matrix=None):
+    """Score the global alignment of two encoded sequences.
+
+    This fills the same matrix as ``global_align``, but keeps no traceback.
+    Instead, the number of matches and the length of the alignment are
+    carried along with the score of every cell, so that only a few
+    anti-diagonals are ever held in memory. The shorter sequence is put on
+    the rows of the matrix, which keeps the diagonals short; the tie-breaking
+    order is mirrored accordingly, so the result is the same either way.
+
+    Returns the alignment score, the number of matches and the length of the
+    alignment, including gaps. ``x_drop`` and ``substitution_matrix`` are as
+    for ``global_align``.
+    """
+    if len(codes1) == 0 or len(codes2) == 0:
+        return 0.0, 0, len(codes1) + len(codes2)
+
+    transposed = len(codes2) > len(codes1)
+    if transposed:
+        codes1, codes2 = codes2, codes1
+    n = len(codes2)
+    m = len(codes1)
+
+    table = _table(match_score, mismatch_score, substitution_matrix)
+    if transposed:
+        table = table.T
+    while True:
+        band = _band(n, m, band_width)
+        diagonals = _Diagonals(codes1, codes2, table, gap_open_penalty,
+                               gap_extend_penalty, count_matches=True,
+                               vertical_first=transposed, x_drop=x_drop)
+        score, edge_bound = _fill(diagonals, band)
+        if score is None:
+            # as in global_align
+            if diagonals.abandoned():
+                matches, length = diagonals.best_counts
+                i, j = diagonals.best_cell
+                raise XDropped((diagonals.best, matches,
+                                length + (n - i) + (m - j)))
+            matches, length = diagonals.end_counts
+            i, j = diagonals.end_cell
+            return diagonals.end, matches, length + (n - i) + (m - j)
+        if edge_bound <= score:
+            return (score, int(diagonals.matches(n + m)[n]),
+                    int(diagonals.length(n + m)[n]))
+        band_width = _widen(n, m, table, band_width, score)
+
+
+def _check_mode(mode, band_width, x_drop):
+    if mode not in _FREE_END_GAPS:
+        raise ValueError('The mode must be one of %s, not %r.'
+                         % (', '.join(_MODES), mode))
+    if x_drop is not None and mode == 'local':
+        raise ValueError("x_drop can't be used in local mode.")
+    if band_width is not None and mode == 'local':
+        raise ValueError("band_width can't be used in local mode.")
+
+
+def _table(match_score, mismatch_score, substitution_matrix):
+    if substitution_matrix is not None:
+        return substitution_matrix
+    return substitution_table(match_score, mismatch_score)
+
+
+def _widen(n, m, table, band_width, score):
+    # a path leaving the band has fewer than min(n, m) - band_width aligned
+    # pairs, which bounds how wide the band needs to be
+    best_substitution = table.max()
+    if best_substitution > 0:
+        needed = min(n, m) - int(np.floor(score / best_substitution))
+    else:
+        needed = min(n, m)
+    return max(2 * band_width, needed)
+
+
+def _band(n, m, band_width):
+    # The band is given as the range of j - i covered in row i. It always
+    # contains both corners of the matrix, i.e. the diagonals 0 and m - n.
+    if band_width is None:
+        return None
+    kmin = max(min(0, m - n) - band_width, -n)
+    kmax = min(max(0, m - n) + band_width, m)
+    if kmin == -n and kmax == m:
+        return None
+    return kmin, kmax
+
+
+def _band_limits(n, m, band):
+    return band if band is not None else (-n, m)
+
+
+def _band_rows(d, n, m, kmin, kmax):
+    # first and last row of diagonal d that are inside the band
+    return max(0, d - m, -((kmax - d) // 2)), min(n, d, (d - kmin) // 2)
+
+
+class _Diagonals:
+    """Rolling anti-diagonal buffers of the DP matrix.
+
+    Scores are kept for the last three anti-diagonals and directions for the
+    last two, indexed by row; cell (i, j) lives on diagonal i + j. The
+    buffers are reused, so the cells just outside of the rows being filled
+    are reset to -inf on each diagonal.
+
+    If the scoring parameters are whole numbers, the scores are held in the
+    smallest integer type that can't overflow on a matrix of this size, and
+    ``neg`` stands in for -inf; otherwise, or if no integer type is big
+    enough, they are floats and ``neg`` is -inf.
+
+    With ``count_matches``, the number of matches and the length of the path
+    chosen for each cell are kept for the last three diagonals as well. With
+    ``vertical_first``, ties are broken in favor of a vertical gap, then a
+    match, then a horizontal gap, which is what filling the transposed matrix
+    needs.
+
+    With ``x_drop``, cells more than ``x_drop`` below the best score found
+    so far are set to ``neg``. The threshold of each diagonal is kept, so that
+    filling a diagonal again drops the same cells.
+
+    ``mode`` is as for ``global_align``. In 'local' mode, the best cell of
+    the matrix is kept track of by ``track_peak``, which ``_fill`` calls
+    once for each diagonal.
+
+    If ``cells`` is given, it's a ``collections.Counter`` that every cell
+    filled is counted in, as ``'filled'``, including those filled again.
+    """
+
+    def __init__(self, codes1, codes2, table, gap_open_penalty,
+                 gap_extend_penalty, count_matches=False,
+                 vertical_first=False, x_drop=None, mode='semi-global',
+                 cells=None):
+        self.codes1 = codes1
+        self.codes2 = codes2
+        self.n = len(codes2)
+        self.m = len(codes1)
+        # only the scores between the codes in the sequences matter
+        size = int(max(codes1.max(initial=0), codes2.max(initial=0))) + 1
+        dtype = _score_dtype(table[:size, :size], gap_open_penalty,
+                             gap_extend_penalty, self.n, self.m)
+        if dtype is np.float64:
+            self.neg = -np.inf
+        else:
+            # far enough below any real score that nothing derived from it
+            # can catch up, and far enough above the minimum that taking a
+            # penalty off it can't wrap around
+            self.neg = dtype(np.iinfo(dtype).min // 2)
+            table = table.astype(dtype)
+            gap_open_penalty = dtype(gap_open_penalty)
+            gap_extend_penalty = dtype(gap_extend_penalty)
+        self.table = table
+        self.gap_open_penalty = gap_open_penalty
+        self.gap_extend_penalty = gap_extend_penalty
+        self.scores = [np.full(self.n + 1, self.neg, dtype=dtype)
+                       for _ in range(3)]
+        self.directions = [np.full(self.n + 1, _TB_END, dtype=np.uint8)
+                           for _ in range(2)]
+        self.vertical_first = vertical_first
+        self.count_matches = count_matches
+        if count_matches:
+            self._match_counts = [np.zeros(self.n + 1, dtype=np.int64)
+                                  for _ in range(3)]
+            self._lengths = [np.zeros(self.n + 1, dtype=np.int64)
+                             for _ in range(3)]
+        self.x_drop = x_drop
+        if x_drop is not None:
+            # the origin scores 0, and any cell is better than nothing
+            self.best = 0.0
+            self.best_cell = (0, 0)
+            self.best_counts = (0, 0)
+            # and the best of the cells on the last row or column, from
+            # which the alignment is finished with free trailing gaps
+            self.end = self.neg
+            self.end_cell = None
+            self.end_counts = None
+            self._thresholds = np.full(self.n + self.m + 1, np.nan)
+        self.mode = mode
+        self.free_leading_gaps, self.free_trailing_gaps = \
+            _FREE_END_GAPS[mode]
+        if mode == 'local':
+            # where an alignment ends if nothing scores above zero
+            self.peak = 0.0
+            self.peak_cell = (0, 0)
+        self.cells = cells
+
+    def score(self, d):
+        return self.scores[d % 3]
+
+    def direction(self, d):
+        return self.directions[d % 2]
+
+    def matches(self, d):
+        return self._match_counts[d % 3]
+
+    def length(self, d):
+        return self._lengths[d % 3]
+
+    def save(self, d):
+        return (self.scores[d % 3].copy(), self.scores[(d - 1) % 3].copy(),
+                self.directions[d % 2].copy())
+
+    def restore(self, d, state):
+        self.scores[d % 3][:] = state[0]
+        self.scores[(d - 1) % 3][:] = state[1]
+        self.directions[d % 2][:] = state[2]
+
+    def fill(self, d, first, last):
+        n = self.n
+        m = self.m
+        if self.cells is not None:
+            self.cells['filled'] += max(0, last - first + 1)
+        score_cur = self.scores[d % 3]
+        score_prev = self.scores[(d - 1) % 3]
+        score_prev2 = self.scores[(d - 2) % 3]
+        tb_cur = self.directions[d % 2]
+        tb_prev = self.directions[(d - 1) % 2]
+
+        # the first row and column are leading gaps, or where local
+        # alignments start
+        if first == 0:
+            score_cur[0] = self._leading_gaps(d)
+            tb_cur[0] = _TB_HGAP if d > 0 and self.mode != 'local' \
+                else _TB_END
+            if self.count_matches:
+                self._count_leading_gaps(d, 0)
+        if last == d and d > 0:
+            score_cur[d] = self._leading_gaps(d)
+            tb_cur[d] = _TB_VGAP if self.mode != 'local' else _TB_END
+            if self.count_matches:
+                self._count_leading_gaps(d, d)
+
+        lo = max(1, first)
+        hi = min(d - 1, last)
+        if lo <= hi:
+            rows = slice(lo, hi + 1)
+            above = slice(lo - 1, hi)
+
+            # codes1[j - 1] and codes2[i - 1] for i in lo..hi and j = d - i
+            c1 = self.codes1[d - hi - 1:d - lo][::-1]
+            c2 = self.codes2[lo - 1:hi]
+            diag = score_prev2[above] + self.table[c1, c2]
+
+            # the cell to the left is on the previous diagonal in the same
+            # row, the cell above is on the previous diagonal one row up
+            left = score_prev[rows] - np.where(tb_prev[rows] == _TB_HGAP,
+                                               self.gap_extend_penalty,
+                                               self.gap_open_penalty)
+            up = score_prev[above] - np.where(tb_prev[above] == _TB_VGAP,
+                                              self.gap_extend_penalty,
+                                              self.gap_open_penalty)
+            # trailing gaps are free: horizontal gaps in the last row and
+            # vertical gaps in the last column don't cost anything
+            if self.free_trailing_gaps:
+                if hi == n:
+                    left[-1] = score_prev[n]
+                if d - lo == m:
+                    up[0] = score_prev[lo - 1]
+
+            if self.vertical_first:
+                (first_score, first_tb), (last_score, last_tb) = \
+                    (up, _TB_VGAP), (left, _TB_HGAP)
+            else:
+                (first_score, first_tb), (last_score, last_tb) = \
+                    (left, _TB_HGAP), (up, _TB_VGAP)
+            best = first_score
+            tb = np.full(hi - lo + 1, first_tb, dtype=np.uint8)
+            is_diag = diag > best
+            best = np.where(is_diag, diag, best)
+            tb[is_diag] = _TB_MATCH
+            is_last = last_score > best
+            best = np.where(is_last, last_score, best)
+            tb[is_last] = last_tb
+            if self.mode == 'local':
+                # starting afresh wins ties, as in scikit-bio
+                tb[best <= 0] = _TB_END
+                best = np.maximum(best, 0)
+
+            score_cur[rows] = best
+            tb_cur[rows] = tb
+
+            if self.count_matches:
+                self._count(d, lo, hi, tb, c1 == c2)
+
+        if first > 0:
+            score_cur[first - 1] = self.neg
+        if last < n:
+            score_cur[last + 1] = self.neg
+
+        if self.x_drop is not None:
+            self._drop(d, first, last)
+
+    def track_peak(self, d, first, last):
+        """Keep track of the best cell of the matrix, up to diagonal
+        ``d``."""
+        scores = self.scores[d % 3][first:last + 1]
+        k = int(np.argmax(scores))
+        i = first + k
+        # ties go to the first cell in row-major order, as np.argmax over
+        # the whole matrix would have it
+        if scores[k] > self.peak or \
+                (scores[k] == self.peak and i < self.peak_cell[0]):
+            self.peak = float(scores[k])
+            self.peak_cell = (i, d - i)
+
+    def dropped(self, d, first, last):
+        """Whether all the cells of diagonal ``d`` have been dropped.
+
+        If trailing gaps are free, the cells of the last row and column
+        don't count, as all they can do is carry their score to the end.
+        """
+        if self.x_drop is None:
+            return False
+        if self.free_trailing_gaps:
+            first = max(first, d - self.m + 1)
+            last = min(last, self.n - 1)
+        return first <= last and \
+            (self.scores[d % 3][first:last + 1] == self.neg).all()
+
+    def abandoned(self):
+        """Whether an alignment whose filling stopped early is abandoned.
+
+        It is if no cell of the last row or column was left, or if the best
+        score never rose more than ``x_drop`` above the free leading gaps,
+        which then keep the cells of the last row or column alive without
+        anything aligned on the way to them.
+        """
+        return self.end_cell is None or self.best <= self.x_drop
+
+    def _drop(self, d, first, last):
+        scores = self.scores[d % 3][first:last + 1]
+        if np.isnan(self._thresholds[d]):
+            # the first time this diagonal is filled
+            k = int(np.argmax(scores))
+            if scores[k] > self.best:
+                self.best, self.best_cell, self.best_counts = \
+                    self._cell(d, first + k)
+            self._thresholds[d] = self.best - self.x_drop
+        scores[scores < self._thresholds[d]] = self.neg
+        if not self.free_trailing_gaps:
+            return
+        for i in {self.n, d - self.m}:
+            if first <= i <= last and scores[i - first] > self.end:
+                self.end, self.end_cell, self.end_counts = self._cell(d, i)
+
+    def _cell(self, d, i):
+        counts = None
+        if self.count_matches:
+            counts = (int(self.matches(d)[i]), int(self.length(d)[i]))
+        return float(self.score(d)[i]), (i, d - i), counts
+
+    def _leading_gaps(self, d):
+        if self.free_leading_gaps or d == 0:
+            return 0
+        return -(self.gap_open_penalty + (d - 1) * self.gap_extend_penalty)
+
+    def _count_leading_gaps(self, d, i):
+        self._match_counts[d % 3][i] = 0
+        self._lengths[d % 3][i] = d
+
+    def _count(self, d, lo, hi, tb, is_match):
+        # carry the counts over from the cell each path came from
+        rows = slice(lo, hi + 1)
+        above = slice(lo - 1, hi)
+        is_left = tb == _TB_HGAP
+        is_up = tb == _TB_VGAP
+        for counts, step in ((self._match_counts, is_match & (tb == _TB_MATCH)),
+                             (self._lengths, 1)):
+            counts[d % 3][rows] = np.where(
+                is_left, counts[(d - 1) % 3][rows],
+                np.where(is_up, counts[(d - 1) % 3][above],
+                         counts[(d - 2) % 3][above])) + step
+
+
+class _Traceback:
+    """Traceback directions of the filled cells of the DP matrix.
+
+    The directions take two bits each, and are packed four to the byte. The
+    matrix is stored row-major, each row starting on a new byte. Without a
+    band, a row holds all of its m + 1 cells; with a band, only the
+    ``kmax - kmin + 1`` cells of the band, so that memory grows with the
+    band width rather than the sequence length. Either way, the cells of one
+    anti-diagonal are in different rows, and so in different bytes.
+    """
+
+    def __init__(self, n, m, band):
+        # cell (i, j) is at column j - shift * i - offset of row i
+        if band is None:
+            width = m + 1
+            self._shift = 0
+            self._offset = 0
+        else:
+            kmin, kmax = band
+            width = kmax - kmin + 1
+            self._shift = 1
+            self._offset = kmin
+        self._row_bytes = _packed_size(width)
+        self.directions = np.zeros((n + 1) * self._row_bytes, dtype=np.uint8)
+        # so that the cells of diagonal d are at columns d + _columns[i]
+        rows = np.arange(n + 1)
+        self._row_starts = rows * self._row_bytes
+        self._columns = -(self._shift + 1) * rows - self._offset
+
+    @staticmethod
+    def size(n, m, band):
+        if band is None:
+            return (n + 1) * _packed_size(m + 1)
+        return (n + 1) * _packed_size(band[1] - band[0] + 1)
+
+    def add_diagonal(self, d, first, last, diagonals):
+        columns = self._columns[first:last + 1] + d
+        self.directions[self._row_starts[first:last + 1] + (columns >> 2)] |= \
+            diagonals.direction(d)[first:last + 1] << _BIT_SHIFTS[columns & 3]
+
+    def __getitem__(self, cell):
+        i, j = cell
+        column = j - self._shift * i - self._offset
+        return (self.directions[i * self._row_bytes + (column >> 2)] >>
+                _BIT_SHIFTS[column & 3]) & 3
+
+
+def _packed_size(cells):
+    return (cells + 3) // 4
+
+
+class _CheckpointedTraceback:
+    """Traceback directions recomputed block-wise from checkpoints.
+
+    Only every ``interval``-th anti-diagonal is kept while the matrix is
+    filled. When the traceback reaches a cell, the diagonals between the
+    closest checkpoint before it and the cell are filled again, keeping their
+    directions. Going back k diagonals, the traceback moves up at most k
+    rows, so only those rows are refilled.
+    """
+
+    def __init__(self, diagonals, band, interval):
+        self._diagonals = diagonals
+        self._kmin, self._kmax = _band_limits(diagonals.n, diagonals.m, band)
+        self._interval = interval
+        self._checkpoints = {}
+        self._block = None
+        self._d0 = None
+
+    @staticmethod
+    def interval(n, m):
+        # Balance the memory used by the checkpoints (two score diagonals and
+        # one direction diagonal per checkpoint) with that of one block.
+        return max(1, int(np.ceil(np.cbrt(17 * (n + 1) * (n + m)))))
+
+    def add_diagonal(self, d, first, last, diagonals):
+        if d % self._interval == 0:
+            self._checkpoints[d] = diagonals.save(d)
+
+    def __getitem__(self, cell):
+        i, j = cell
+        d = i + j
+        if d == 0:
+            return _TB_END
+        if self._block is None or not self._d0 < d <= self._d1:
+            self._refill(i, d)
+        return self._block[d - self._d0 - 1, i - self._lo]
+
+    def _refill(self, i_end, d_end):
+        diagonals = self._diagonals
+        d0 = (d_end - 1) // self._interval * self._interval
+        lo = max(0, i_end - (d_end - d0))
+        diagonals.restore(d0, self._checkpoints[d0])
+
+        block = np.full((d_end - d0, i_end - lo + 1), _TB_END, dtype=np.uint8)
+        for d in range(d0 + 1, d_end + 1):
+            first, last = _band_rows(d, diagonals.n, diagonals.m, self._kmin,
+                                     self._kmax)
+            first = max(first, lo)
+            last = min(last, i_end)
+            if first <= last:
+                diagonals.fill(d, first, last)
+                block[d - d0 - 1, first - lo:last - lo + 1] = \
+                    diagonals.direction(d)[first:last + 1]
+
+        self._block = block
+        self._d0 = d0
+        self._d1 = d_end
+        self._lo = lo
+
+
+def _fill(diagonals, band, traceback=None):
+    n = diagonals.n
+    m = diagonals.m
+    kmin, kmax = _band_limits(n, m, band)
+    # best possible score per position left after leaving the band
+    best_substitution = max(diagonals.table.max(), 0.0)
+    edge_bound = -np.inf
+
+    for d in range(n + m + 1):
+        first, last = _band_rows(d, n, m, kmin, kmax)
+        diagonals.fill(d, first, last)
+        if diagonals.dropped(d, first, last):
+            return None, edge_bound
+        if diagonals.mode == 'local':
+            diagonals.track_peak(d, first, last)
+
+        # the cells on the edges of the band, unless the band reaches the
+        # corner of the matrix on that side
+        for k, i in ((kmin, last), (kmax, first)):
+            if d - 2 * i == k and -n < k < m:
+                bound = diagonals.score(d)[i] + \
+                    best_substitution * min(n - i, m - d + i)
+                edge_bound = max(edge_bound, bound)
+
+        if traceback is not None:
+            traceback.add_diagonal(d, first, last, diagonals)
+
+    return float(diagonals.score(n + m)[n]), edge_bound
+
+
+def _traceback(traceback, i, j):
+    idx1 = []
+    idx2 = []
+    direction = traceback[i, j]
+    while direction != _TB_END:
+        if direction == _TB_MATCH:
+            i -= 1
+            j -= 1
+            idx1.append(j)
+            idx2.append(i)
+        elif direction == _TB_VGAP:
+            i -= 1
+            idx1.append(-1)
+            idx2.append(i)
+        else:
+            j -= 1
+            idx1.append(j)
+            idx2.append(-1)
+        direction = traceback[i, j]
+    return (np.array(idx1[::-1], dtype=np.intp),
+            np.array(idx2[::-1], dtype=np.intp))
+
+
+def global_align_batch(pairs, gap_open_penalty, gap_extend_penalty,
+                       match_score, mismatch_score, max_cells=None,
+                       substitution_matrix=None):
+    """Globally align many pairs of encoded sequences at once.
+
+    Gives the same alignments as ``global_align`` on each of ``pairs``, but
+    instead of filling one matrix at a time, the pairs are stacked into
+    padded arrays and every anti-diagonal is filled for all the pairs of a
+    batch together. This makes up for the cost of each NumPy call when the
+    sequences are too short to do so on their own. The pairs are sorted by
+    size, so that those in a batch need little padding, and each batch keeps
+    at most about ``max_cells`` cells of traceback.
+
+    Returns a list of the score and the two index arrays for each pair, in
+    the order of ``pairs``.
+    """
+    table = _table(match_score, mismatch_score, substitution_matrix)
+    results = [None] * len(pairs)
+    for batch in _batches(pairs, max_cells):
+        batch_pairs = [pairs[k] for k in batch]
+        scores, traceback = _fill_batch(batch_pairs, table, gap_open_penalty,
+                                        gap_extend_penalty, traceback=True)
+        alignments = _traceback_batch(traceback, batch_pairs)
+        for k, score, (idx1, idx2) in zip(batch, scores, alignments):
+            results[k] = float(score), idx1, idx2
+    return results
+
+
+def global_score_batch(pairs, gap_open_penalty, gap_extend_penalty,
+                       match_score, mismatch_score, max_cells=None,
+                       substitution_matrix=None):
+    """Score the global alignments of many pairs of encoded sequences at once.
+
+    This is to ``global_score`` what ``global_align_batch`` is to
+    ``global_align``. Returns a list of the score, the number of matches and
+    the length of the alignment for each pair, in the order of ``pairs``.
+    """
+    table = _table(match_score, mismatch_score, substitution_matrix)
+    results = [None] * len(pairs)
+    for batch in _batches(pairs, max_cells):
+        scores, (matches, lengths) = _fill_batch(
+            [pairs[k] for k in batch], table, gap_open_penalty,
+            gap_extend_penalty, count_matches=True)
+        for k, score, n_matches, length in zip(batch, scores, matches,
+                                               lengths):
+            results[k] = float(score), int(n_matches), int(length)
+    return results
+
+
+def global_score_sweep(codes1, codes2, parameter_sets, max_cells=None):
+    """Score the global alignment of two encoded sequences with each of
+    many sets of scoring parameters at once.
+
+    ``parameter_sets`` is a list of gap open penalty, gap extend penalty,
+    match score and mismatch score tuples. The sets are stacked like the
+    pairs of ``global_score_batch``, each with a substitution table and gap
+    penalties of its own, so that every anti-diagonal is filled for all of
+    them together from the one encoding of the sequences. Only a few
+    diagonals of each are kept, so about ``max_cells`` cells' worth of sets
+    are filled at a time.
+
+    Returns a list of the score, the number of matches and the length of the
+    alignment for each set, in the order of ``parameter_sets``, as
+    ``global_score`` gives them.
+    """
+    if len(codes1) == 0 or len(codes2) == 0:
+        return [global_score(codes1, codes2, *parameters)
+                for parameters in parameter_sets]
+    if max_cells is None:
+        max_cells = _BATCH_CELLS
+    size = max(1, max_cells // (len(codes2) + 1))
+    results = []
+    for start in range(0, len(parameter_sets), size):
+        chunk = parameter_sets[start:start + size]
+        gap_open_penalties, gap_extend_penalties, match_scores, \
+            mismatch_scores = np.array(chunk, dtype=float).T
+        tables = np.stack([substitution_table(match_score, mismatch_score)
+                           for match_score, mismatch_score
+                           in zip(match_scores, mismatch_scores)])
+        scores, (matches, lengths) = _fill_batch(
+            [(codes1, codes2)] * len(chunk), tables, gap_open_penalties,
+            gap_extend_penalties, count_matches=True)
+        results += [(float(score), int(n_matches), int(length))
+                    for score, n_matches, length
+                    in zip(scores, matches, lengths)]
+    return results
+
+
+def batch_cells(n, m):
+    """Return the cells of traceback a pair of lengths ``n`` and ``m`` takes
+    up in a batch."""
+    return (n + m + 1) * (n + 1)
+
+
+def _batches(pairs, max_cells):
+    if max_cells is None:
+        max_cells = _BATCH_CELLS
+    # rows follow the second sequence of each pair
+    shapes = [(len(codes2), len(codes1)) for codes1, codes2 in pairs]
+    batch = []
+    n = m = 0
+    for k in sorted(range(len(pairs)), key=shapes.__getitem__):
+        next_n = max(n, shapes[k][0])
+        next_m = max(m, shapes[k][1])
+        if batch and \
+                (len(batch) + 1) * batch_cells(next_n, next_m) > max_cells:
+            yield batch
+            batch = []
+            next_n, next_m = shapes[k]
+        batch.append(k)
+        n, m = next_n, next_m
+    if batch:
+        yield batch
+
+
+def _fill_batch(pairs, table, gap_open_penalty, gap_extend_penalty,
+                traceback=False, count_matches=False):
+    # The same recurrence as _Diagonals.fill, on arrays with the pairs along
+    # the first axis. Every pair is filled out to the size of the largest;
+    # the padding cells are filled with whatever, but no cell of a pair's
+    # own matrix depends on them. Only the trailing gaps, which are free in
+    # the last row and column of each pair's matrix, need masking per pair.
+    # The table and the penalties are either shared by all the pairs, or a
+    # stack of tables and arrays of penalties with one for each pair.
+    size = len(pairs)
+    pair_tables = ()
+    if table.ndim == 3:
+        pair_tables = (np.arange(size)[:, None], )
+        gap_open_penalty = np.asarray(gap_open_penalty)[:, None]
+        gap_extend_penalty = np.asarray(gap_extend_penalty)[:, None]
+    m = np.array([len(codes1) for codes1, _ in pairs])
+    n = np.array([len(codes2) for _, codes2 in pairs])
+    rows_total = n.max()
+    cols_total = m.max()
+    codes1 = np.zeros((size, cols_total), dtype=np.uint8)
+    codes2 = np.zeros((size, rows_total), dtype=np.uint8)
+    for b, (c1, c2) in enumerate(pairs):
+        codes1[b, :len(c1)] = c1
+        codes2[b, :len(c2)] = c2
+
+    scores = [np.full((size, rows_total + 1), -np.inf) for _ in range(3)]
+    directions = [np.full((size, rows_total + 1), _TB_END, dtype=np.uint8)
+                  for _ in range(2)]
+    if traceback:
+        # stored by diagonal rather than by column, so that each diagonal is
+        # a single contiguous copy
+        tb_all = np.zeros((size, rows_total + cols_total + 1, rows_total + 1),
+                          dtype=np.uint8)
+    if count_matches:
+        # the number of diagonal steps and of matches on the path to each
+        # cell are packed into one integer, so that a single array carries
+        # both; the length of the path follows from the diagonal steps
+        counts = [np.zeros((size, rows_total + 1), dtype=np.int64)
+                  for _ in range(3)]
+        diagonal_steps = np.where(np.eye(table.shape[-1], dtype=bool),
+                                  1 + _MATCH_UNIT, 1)
+        final_counts = np.zeros(size, dtype=np.int64)
+
+    ends = n + m
+    final = np.zeros(size)
+    for d in range(rows_total + cols_total + 1):
+        first = max(0, d - cols_total)
+        last = min(d, rows_total)
+        score_cur = scores[d % 3]
+        score_prev = scores[(d - 1) % 3]
+        score_prev2 = scores[(d - 2) % 3]
+        tb_cur = directions[d % 2]
+        tb_prev = directions[(d - 1) % 2]
+
+        if first == 0:
+            score_cur[:, 0] = 0.0
+            tb_cur[:, 0] = _TB_HGAP if d > 0 else _TB_END
+            if count_matches:
+                counts[d % 3][:, 0] = 0
+        if last == d and d > 0:
+            score_cur[:, d] = 0.0
+            tb_cur[:, d] = _TB_VGAP
+            if count_matches:
+                counts[d % 3][:, d] = 0
+
+        lo = max(1, first)
+        hi = min(d - 1, last)
+        if lo <= hi:
+            rows = slice(lo, hi + 1)
+            above = slice(lo - 1, hi)
+            i = np.arange(lo, hi + 1)
+
+            c1 = codes1[:, d - hi - 1:d - lo][:, ::-1]
+            c2 = codes2[:, lo - 1:hi]
+            diag = score_prev2[:, above] + table[pair_tables + (c1, c2)]
+
+            left_penalty = np.where(tb_prev[:, rows] == _TB_HGAP,
+                                    gap_extend_penalty, gap_open_penalty)
+            up_penalty = np.where(tb_prev[:, above] == _TB_VGAP,
+                                  gap_extend_penalty, gap_open_penalty)
+            left_penalty[i == n[:, None]] = 0.0
+            up_penalty[d - i == m[:, None]] = 0.0
+            left = score_prev[:, rows] - left_penalty
+            up = score_prev[:, above] - up_penalty
+
+            best = left
+            tb = np.full(best.shape, _TB_HGAP, dtype=np.uint8)
+            is_diag = diag > best
+            best = np.where(is_diag, diag, best)
+            tb[is_diag] = _TB_MATCH
+            is_up = up > best
+            best = np.where(is_up, up, best)
+            tb[is_up] = _TB_VGAP
+
+            score_cur[:, rows] = best
+            tb_cur[:, rows] = tb
+
+            if count_matches:
+                counts[d % 3][:, rows] = np.where(
+                    tb == _TB_HGAP, counts[(d - 1) % 3][:, rows],
+                    np.where(is_up, counts[(d - 1) % 3][:, above],
+                             counts[(d - 2) % 3][:, above] +
+                             diagonal_steps[c1, c2]))
+
+        if traceback:
+            tb_all[:, d, first:last + 1] = tb_cur[:, first:last + 1]
+
+        done = np.flatnonzero(ends == d)
+        if len(done):
+            final[done] = score_cur[done, n[done]]
+            if count_matches:
+                final_counts[done] = counts[d % 3][done, n[done]]
+
+    if traceback:
+        return final, tb_all
+    return final, (final_counts // _MATCH_UNIT,
+                   ends - final_counts % _MATCH_UNIT)
+
+
+def _traceback_batch(tb_all, pairs):
+    # all the paths are followed back together, one step at a time; those
+    # that have reached the origin stay there
+    size = len(pairs)
+    i = np.array([len(codes2) for _, codes2 in pairs])
+    j = np.array([len(codes1) for codes1, _ in pairs])
+    max_steps = (i + j).max()
+    idx1 = np.full((size, max_steps), -1, dtype=np.intp)
+    idx2 = np.full((size, max_steps), -1, dtype=np.intp)
+    lengths = np.zeros(size, dtype=np.intp)
+    batch_index = np.arange(size)
+    for step in range(max_steps):
+        direction = tb_all[batch_index, i + j, i]
+        active = direction != _TB_END
+        if not active.any():
+            break
+        from_above = active & (direction != _TB_HGAP)
+        from_left = active & (direction != _TB_VGAP)
+        i -= from_above
+        j -= from_left
+        idx1[:, step] = np.where(from_left, j, -1)
+        idx2[:, step] = np.where(from_above, i, -1)
+        lengths += active
+    return [(idx1[b, :lengths[b]][::-1].copy(),
+             idx2[b, :lengths[b]][::-1].copy()) for b in range(size)]
+
+
+def gapped(seq, idx):
+    """Return the string of ``seq`` with gaps wherever ``idx`` is -1."""
+    raw = np.frombuffer(str(seq).encode('ascii'), dtype=np.uint8)
+    aligned = np.full(len(idx), _GAP_CHAR, dtype=np.uint8)
+    present = idx >= 0
+    aligned[present] = raw[idx[present]]
+    return aligned.tobytes().decode('ascii')
+
+
+def cigar(idx1, idx2):
+    """Return the CIGAR string of an alignment, the first sequence being the
+    query and the second the target.
+
+    Aligned pairs of positions are M, query positions against gaps I, and
+    target positions against gaps D.
+    """
+    ops = np.where(idx2 < 0, 1, np.where(idx1 < 0, 2, 0))
+    starts = np.flatnonzero(np.diff(ops, prepend=-1))
+    lengths = np.diff(np.append(starts, len(ops)))
+    return ''.join('%d%s' % (length, 'MID'[op]) for length, op
+                   in zip(lengths.tolist(), ops[starts].tolist()))
+
+
+def from_cigar(cigar, start1=0, start2=0):
+    """Return the two index arrays of the alignment a CIGAR string stands
+    for, the aligned parts of the sequences starting at ``start1`` and
+    ``start2``."""
+    lengths = np.array(_CIGAR_LENGTHS.findall(cigar), dtype=np.intp)
+    ops = np.repeat(np.array(['MID'.index(op)
+                              for op in _CIGAR_OPS.findall(cigar)],
+                             dtype=np.uint8), lengths)
+    in1 = ops != 2
+    in2 = ops != 1
+    idx1 = np.where(in1, start1 + np.cumsum(in1) - 1, -1)
+    idx2 = np.where(in2, start2 + np.cumsum(in2) - 1, -1)
+    return idx1.astype(np.intp), idx2.astype(np.intp)
+
+
+def count_matches(codes1, codes2, idx1, idx2):
+    """Return the number of matching positions of an alignment."""
+    present = (idx1 >= 0) & (idx2 >= 0)
+    return int((codes1[idx1[present]] == codes2[idx2[present]]).sum())
+
+
+def _aligned_dna(seq, idx):
+    metadata = seq.metadata if seq.has_metadata() else None
+    return DNA(gapped(seq, idx), metadata=metadata, validate=False)
+
+
+def to_msa(seq1, seq2, idx1, idx2):
+    """Build the ``TabularMSA`` for an alignment of ``seq1`` and ``seq2``."""
+    return TabularMSA([_aligned_dna(seq1, idx1), _aligned_dna(seq2, idx2)])
@@ -0,0 +1,225 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import bisect
+import collections
+
+import numpy as np
+
+from ._alignment import global_align, _ALPHABET, _table
+from ._pool import chunks, imap, worker_state
+
+# Anchors are exact matches of this many bases, found among the minimizers
+# of the two sequences: the k-mer of smallest hash in each window of this
+# many consecutive k-mers.
+_ANCHOR_KMER_SIZE = 15
+_ANCHOR_WINDOW = 10
+
+# The gaps between anchors are sent to the worker processes this many at a
+# time.
+_CHUNK_SIZE = 256
+
+
+def minimizers(codes, k, w):
+    """Return the positions and values of the (w, k)-minimizers of an
+    encoded sequence.
+
+    Each k-mer is read as a base-4 number, and ordered by an invertible hash
+    of it, so that runs of low complexity aren't favored. The minimizers are
+    the smallest k-mers of every window of ``w`` consecutive ones, so that
+    two sequences sharing a stretch of ``w + k - 1`` bases share a minimizer
+    in it. K-mers with degenerate bases in them are never minimizers.
+    """
+    count = len(codes) - k + 1
+    if count < w:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.uint64)
+    values = np.zeros(count, dtype=np.uint64)
+    degenerate = np.zeros(count, dtype=bool)
+    for offset in range(k):
+        window = codes[offset:offset + count]
+        values = values * np.uint64(len(_ALPHABET)) + \
+            (window & 3).astype(np.uint64)
+        degenerate |= window >= len(_ALPHABET)
+    hashes = _hash(values)
+    hashes[degenerate] = np.iinfo(np.uint64).max
+
+    positions = np.unique(
+        np.lib.stride_tricks.sliding_window_view(hashes, w).argmin(axis=1) +
+        np.arange(count - w + 1))
+    positions = positions[~degenerate[positions]]
+    return positions, values[positions]
+
+
+def _hash(values):
+    # a 64-bit integer mix (the finalizer of MurmurHash3), which wraps
+    # around, as intended
+    with np.errstate(over='ignore'):
+        values = values ^ (values >> np.uint64(33))
+        values = values * np.uint64(0xff51afd7ed558ccd)
+        values = values ^ (values >> np.uint64(33))
+        values = values * np.uint64(0xc4ceb9fe1a85ec53)
+        return values ^ (values >> np.uint64(33))
+
+
+def find_anchors(codes1, codes2, k, w):
+    """Return the positions in both sequences of the minimizers they share.
+
+    Only the minimizers found once in each sequence are kept, so that
+    repeats don't anchor anything. The anchors are sorted by their position
+    in ``codes1``.
+    """
+    anchors = []
+    for codes in (codes1, codes2):
+        positions, values = minimizers(codes, k, w)
+        values, first, counts = np.unique(values, return_index=True,
+                                          return_counts=True)
+        anchors.append((values[counts == 1],
+                        positions[first[counts == 1]]))
+    (values1, positions1), (values2, positions2) = anchors
+    _, k1, k2 = np.intersect1d(values1, values2, assume_unique=True,
+                               return_indices=True)
+    order = np.argsort(positions1[k1])
+    return positions1[k1][order], positions2[k2][order]
+
+
+def chain_anchors(positions1, positions2, k):
+    """Return the runs of exact matches of the best chain of anchors.
+
+    The chain is the longest run of anchors increasing in both sequences,
+    found as the longest increasing subsequence of their positions in
+    ``codes2``. Overlapping anchors on the same diagonal are merged into one
+    run, and those overlapping the run before them otherwise are left out.
+    Returns the start of each run in both sequences and its length.
+    """
+    # patience sorting, keeping the anchor each one follows in the chain
+    tails = []
+    tail_anchors = []
+    previous = np.full(len(positions2), -1)
+    for anchor, position in enumerate(positions2.tolist()):
+        pile = bisect.bisect_left(tails, position)
+        if pile > 0:
+            previous[anchor] = tail_anchors[pile - 1]
+        if pile == len(tails):
+            tails.append(position)
+            tail_anchors.append(anchor)
+        else:
+            tails[pile] = position
+            tail_anchors[pile] = anchor
+    chain = []
+    anchor = tail_anchors[-1] if tail_anchors else -1
+    while anchor >= 0:
+        chain.append(anchor)
+        anchor = previous[anchor]
+
+    runs = []
+    for anchor in reversed(chain):
+        start1 = int(positions1[anchor])
+        start2 = int(positions2[anchor])
+        if runs:
+            run_start1, run_start2, length = runs[-1]
+            if start1 - start2 == run_start1 - run_start2 and \
+                    start1 <= run_start1 + length:
+                runs[-1][2] = start1 + k - run_start1
+                continue
+            if start1 < run_start1 + length or start2 < run_start2 + length:
+                continue
+        runs.append([start1, start2, k])
+    return runs
+
+
+def anchored_align(codes1, codes2, gap_open_penalty, gap_extend_penalty,
+                   match_score, mismatch_score, band_width=None,
+                   memory_limit=None, substitution_matrix=None,
+                   mode='semi-global', n_jobs=1, cells=None):
+    """Align two long encoded sequences through exact matching anchors.
+
+    The minimizers the two sequences share, and that are found only once in
+    each, are chained into the longest series of exact matches that are in
+    the same order in both. The matches are kept as they are, and only the
+    gaps between them are aligned, by ``global_align`` with terminal gaps
+    penalized, as they are inside the alignment. The parts of the sequences
+    before the first match and after the last one are aligned as ``mode``
+    has them at those ends, which must be 'global' or 'semi-global'. The
+    gaps are aligned in a pool of ``n_jobs`` processes.
+
+    This turns a matrix of the product of the lengths of the sequences into
+    many small ones along its diagonal, so that sequences of millions of
+    bases can be aligned, but it can only be as good as the chain: if the
+    two sequences have been rearranged, all but one arrangement of the
+    matching parts ends up against gaps. Without any anchors, this is the
+    same as ``global_align``. ``cells`` is as for ``global_align``, and
+    counts the cells filled in all the gaps.
+
+    Returns the alignment score and the two index arrays, as
+    ``global_align`` does.
+    """
+    if mode not in ('global', 'semi-global'):
+        raise ValueError('Anchored alignments can only be global or '
+                         'semi-global.')
+    table = _table(match_score, mismatch_score, substitution_matrix)
+    positions1, positions2 = find_anchors(codes1, codes2, _ANCHOR_KMER_SIZE,
+                                          _ANCHOR_WINDOW)
+    runs = chain_anchors(positions1, positions2, _ANCHOR_KMER_SIZE)
+
+    # the gaps around and between the runs, with the mode each one is
+    # aligned in
+    ends1 = [0] + [start1 + length for start1, _, length in runs]
+    ends2 = [0] + [start2 + length for _, start2, length in runs]
+    starts1 = [start1 for start1, _, _ in runs] + [len(codes1)]
+    starts2 = [start2 for _, start2, _ in runs] + [len(codes2)]
+    modes = ['global'] * (len(runs) + 1)
+    if mode == 'semi-global':
+        if runs:
+            modes[0] = 'semi-global-start'
+            modes[-1] = 'semi-global-end'
+        else:
+            modes[0] = 'semi-global'
+    segments = [(codes1[end1:start1], codes2[end2:start2], segment_mode)
+                for end1, end2, start1, start2, segment_mode
+                in zip(ends1, ends2, starts1, starts2, modes)]
+
+    # the table is built once here, rather than for every gap
+    params = dict(gap_open_penalty=gap_open_penalty,
+                  gap_extend_penalty=gap_extend_penalty,
+                  match_score=match_score, mismatch_score=mismatch_score,
+                  band_width=band_width, memory_limit=memory_limit,
+                  substitution_matrix=table)
+    score = 0.0
+    idx1 = []
+    idx2 = []
+    alignments = (alignment for chunk in _counted(imap(
+        _align_segments, chunks(segments, _CHUNK_SIZE), n_jobs,
+        {'params': params}), cells) for alignment in chunk)
+    for k, (segment_score, segment_idx1, segment_idx2) in \
+            enumerate(alignments):
+        score += segment_score
+        idx1.append(np.where(segment_idx1 >= 0, segment_idx1 + ends1[k], -1))
+        idx2.append(np.where(segment_idx2 >= 0, segment_idx2 + ends2[k], -1))
+        if k < len(runs):
+            start1, start2, length = runs[k]
+            run1 = codes1[start1:start1 + length]
+            score += float(table[run1, run1].sum())
+            idx1.append(np.arange(start1, start1 + length))
+            idx2.append(np.arange(start2, start2 + length))
+    return (score, np.concatenate(idx1).astype(np.intp),
+            np.concatenate(idx2).astype(np.intp))
+
+
+def _align_segments(chunk):
+    cells = collections.Counter()
+    return [global_align(codes1, codes2, mode=mode, cells=cells,
+                         **worker_state['params'])
+            for codes1, codes2, mode in chunk], cells
+
+
+def _counted(results, cells):
+    # the alignments of each chunk, adding up the cells they filled
+    for alignments, chunk_cells in results:
+        if cells is not None:
+            cells.update(chunk_cells)
+        yield alignments
@@ -0,0 +1,367 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import collections
+import contextlib
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from ._alignment import (batch_cells, cigar, count_matches, gapped,
+                         global_align,
+                         global_align_batch, global_score, global_score_batch,
+                         XDropped, _BATCH_CELLS)
+from ._cache import AlignmentCache
+from ._edit_distance import edit_distance
+from ._kmers import kmer_profile, kmer_similarity
+from ._pool import chunks, imap, worker_state
+
+# Records are sent to the worker processes in chunks, so that the cost of
+# pickling them and collecting the results is shared by many alignments,
+# and so that there are enough pairs in each to align them in batches.
+_CHUNK_SIZE = 256
+
+# All-vs-all distances are computed in square tiles of this many sequences
+# each way, so that a task is large enough to be worth sending to a worker.
+_TILE_SIZE = 32
+
+
+def _one_vs_many_state(query, params, screens=None, cache=None,
+                       as_cigar=False):
+    state = dict(query=str(query), query_codes=query.codes, params=params,
+                 screens=screens, cache=cache, as_cigar=as_cigar)
+    if screens is not None and screens['min_kmer_similarity'] is not None:
+        state['query_profile'] = kmer_profile(query.codes,
+                                              screens['kmer_size'])
+    return state
+
+
+def _encode_chunk(chunk):
+    codes = []
+    for target_id, target in chunk:
+        try:
+            codes.append(target.codes)
+        except ValueError as e:
+            raise ValueError('Sequence %r: %s' % (target_id, e)) from e
+    return codes
+
+
+def _align_chunk(chunk):
+    query = worker_state['query']
+    query_codes = worker_state['query_codes']
+    params = worker_state['params']
+    targets = _encode_chunk(chunk)
+    pruned = collections.Counter()
+    aligned = _screen(query_codes, targets, pruned)
+    pairs = [(query_codes, targets[k]) for k in aligned]
+    if worker_state['cache'] is None:
+        alignments = _align_pairs(pairs, params)
+    else:
+        # each process opens the cache for itself, and for each chunk, so
+        # that it's closed again however the pool is shut down
+        with contextlib.closing(
+                AlignmentCache(*worker_state['cache'])) as cache:
+            alignments = _align_pairs_cached(pairs, params, cache)
+    if params.get('x_drop') is not None:
+        pruned['x_drop'] += alignments.count(None)
+
+    results = [(target_id, ) + (None, ) * 5 for target_id, _ in chunk]
+    for k, alignment in zip(aligned, alignments):
+        if alignment is None:
+            continue
+        score, idx1, idx2 = alignment
+        target_id, target = chunk[k]
+        matches = count_matches(query_codes, targets[k], idx1, idx2)
+        if worker_state['as_cigar']:
+            results[k] = (target_id, score, matches, len(idx1),
+                          _span(idx1) + _span(idx2), cigar(idx1, idx2))
+        else:
+            results[k] = (target_id, score, matches, len(idx1),
+                          gapped(query, idx1), gapped(target, idx2))
+    return results, pruned
+
+
+def _span(idx):
+    # the start and end of the aligned part of a sequence
+    present = idx[idx >= 0]
+    if not len(present):
+        return 0, 0
+    return int(present[0]), int(present[-1]) + 1
+
+
+def _screen(query_codes, targets, pruned):
+    # Returns the indices of the targets worth aligning to the query. The
+    # others are counted in pruned, by the screen that caught them: the
+    # cheap k-mer screen goes first, then the edit distance.
+    screens = worker_state['screens']
+    kept = list(range(len(targets)))
+    if screens is None:
+        return kept
+
+    min_similarity = screens['min_kmer_similarity']
+    if min_similarity is not None:
+        k = screens['kmer_size']
+        similarity = kmer_similarity(
+            [worker_state['query_profile']],
+            [kmer_profile(target_codes, k) for target_codes in targets],
+            k)[0]
+        kept = [i for i in kept if similarity[i] >= min_similarity]
+        pruned['kmer'] += len(targets) - len(kept)
+
+    max_edit_distance = screens['max_edit_distance']
+    if max_edit_distance is not None:
+        screened = len(kept)
+        kept = [i for i in kept
+                if edit_distance(query_codes, targets[i],
+                                 max_distance=max_edit_distance) is not None]
+        pruned['edit_distance'] += screened - len(kept)
+    return kept
+
+
+def _batched(pairs, max_cells):
+    # the pairs small enough to align in batches, and all the others
+    batched = []
+    single = []
+    for k, (codes1, codes2) in enumerate(pairs):
+        if batch_cells(len(codes2), len(codes1)) <= max_cells:
+            batched.append(k)
+        else:
+            single.append(k)
+    return batched, single
+
+
+def _unless_dropped(function, pair, params):
+    try:
+        return function(*pair, **params)
+    except XDropped:
+        return None
+
+
+def _align_pairs(pairs, params):
+    # Aligning in batches fills the whole matrix of each pair, so it's only
+    # used without a band or X-drop, and for pairs whose traceback fits in
+    # the memory limit; it gives the same alignments as global_align either
+    # way. Pairs abandoned by the X-drop rule give None.
+    if params['band_width'] is not None or \
+            params.get('x_drop') is not None:
+        return [_unless_dropped(global_align, pair, params)
+                for pair in pairs]
+    max_cells = _BATCH_CELLS
+    if params['memory_limit'] is not None:
+        max_cells = min(max_cells, params['memory_limit'])
+    batched, single = _batched(pairs, max_cells)
+
+    results = [None] * len(pairs)
+    batch_params = {key: value for key, value in params.items()
+                    if key not in ('band_width', 'memory_limit', 'x_drop')}
+    for k, result in zip(batched, global_align_batch(
+            [pairs[k] for k in batched], max_cells=max_cells,
+            **batch_params)):
+        results[k] = result
+    for k in single:
+        results[k] = global_align(*pairs[k], **params)
+    return results
+
+
+def _align_pairs_cached(pairs, params, cache):
+    # as _align_pairs, but only aligning the pairs that aren't in the cache;
+    # alignments cut short by the X-drop rule, or that may have been, aren't
+    # added to it
+    keys = [AlignmentCache.key(
+        *pair, params['gap_open_penalty'], params['gap_extend_penalty'],
+        params['match_score'], params['mismatch_score'],
+        params.get('substitution_matrix')) for pair in pairs]
+    results = [cache.get(key) for key in keys]
+    missing = [k for k, result in enumerate(results) if result is None]
+    for k, result in zip(missing,
+                         _align_pairs([pairs[k] for k in missing], params)):
+        results[k] = result
+        if params.get('x_drop') is None:
+            cache.put(keys[k], *result)
+    return results
+
+
+def _score_pairs(pairs, params):
+    # as _align_pairs, for global_score
+    if params['band_width'] is not None or \
+            params.get('x_drop') is not None:
+        return [_unless_dropped(global_score, pair, params)
+                for pair in pairs]
+    batched, single = _batched(pairs, _BATCH_CELLS)
+
+    results = [None] * len(pairs)
+    batch_params = {key: value for key, value in params.items()
+                    if key not in ('band_width', 'x_drop')}
+    for k, result in zip(batched, global_score_batch(
+            [pairs[k] for k in batched], **batch_params)):
+        results[k] = result
+    for k in single:
+        results[k] = global_score(*pairs[k], **params)
+    return results
+
+
+def align_one_vs_many(query, references, n_jobs=1, max_edit_distance=None,
+                      min_kmer_similarity=None, kmer_size=8, pruned=None,
+                      cache=None, as_cigar=False, **params):
+    """Align ``query`` against each of ``references``.
+
+    ``query`` is an ``EncodedSequence`` and ``references`` an iterable of
+    (id, ``EncodedSequence``) pairs, which are sent to the worker processes
+    packed as they are; ``params`` are passed on to ``global_align``. Yields
+    the target id, score, number of matches, alignment length and the two
+    aligned strings for each reference, in the order of ``references``.
+
+    References with a k-mer similarity to the query below
+    ``min_kmer_similarity``, or more than ``max_edit_distance`` edits away
+    from it, aren't aligned, and neither are those whose alignment is
+    abandoned by the X-drop rule; everything but their id is None. If
+    ``pruned`` is given, it's a ``collections.Counter`` that counts these
+    by screen, as ``'kmer'``, ``'edit_distance'`` and ``'x_drop'``.
+
+    If ``cache`` is given, it's the directory and size passed on to
+    ``AlignmentCache``, and alignments are looked up there before they're
+    computed.
+
+    With ``as_cigar``, the two aligned strings are replaced by the start and
+    end of the aligned parts of the query and the target, as a tuple of
+    four, and the CIGAR string of the alignment, which are much smaller.
+    """
+    screens = {'min_kmer_similarity': min_kmer_similarity,
+               'kmer_size': kmer_size,
+               'max_edit_distance': max_edit_distance}
+    results = imap(_align_chunk, chunks(references, _CHUNK_SIZE), n_jobs,
+                   _one_vs_many_state(query, params, screens, cache,
+                                      as_cigar))
+    for chunk, chunk_pruned in results:
+        if pruned is not None:
+            pruned.update(chunk_pruned)
+        yield from chunk
+
+
+def _edit_distance_chunk(chunk):
+    query_codes = worker_state['query_codes']
+    targets = _encode_chunk(chunk)
+    return [(target_id, edit_distance(query_codes, target_codes))
+            for (target_id, _), target_codes in zip(chunk, targets)]
+
+
+def edit_distances_one_vs_many(query, references, n_jobs=1):
+    """Compute the edit distance of ``query`` to each of ``references``.
+
+    Takes the same ``query`` and ``references`` as ``align_one_vs_many``, and
+    yields the target id and the edit distance for each reference.
+    """
+    results = imap(_edit_distance_chunk, chunks(references, _CHUNK_SIZE),
+                   n_jobs, _one_vs_many_state(query, None))
+    for chunk in results:
+        yield from chunk
+
+
+def _attach_codes():
+    # the encoded sequences are read straight from the shared memory block,
+    # so they are never pickled; the block must outlive the array viewing it
+    buffer = SharedMemory(name=worker_state['buffer_name'])
+    worker_state['codes'] = np.ndarray((worker_state['offsets'][-1],),
+                                       dtype=np.uint8, buffer=buffer.buf)
+    worker_state['buffer'] = buffer
+
+
+def _distance_tile(tile):
+    (i_start, i_end), (j_start, j_end) = tile
+    codes = worker_state['codes']
+    offsets = worker_state['offsets']
+    params = worker_state['params']
+    screens = worker_state['screens']
+    cells = [(i, j) for i in range(i_start, i_end)
+             for j in range(max(i + 1, j_start), j_end)]
+    n_cells = len(cells)
+
+    # pairs that fail the k-mer screen, or are abandoned by the X-drop
+    # rule, are as far apart as can be
+    pruned = collections.Counter()
+    distances = np.zeros((i_end - i_start, j_end - j_start))
+    min_similarity = screens['min_kmer_similarity']
+    if min_similarity is not None:
+        k = screens['kmer_size']
+        similarity = kmer_similarity(
+            [kmer_profile(codes[offsets[i]:offsets[i + 1]], k)
+             for i in range(i_start, i_end)],
+            [kmer_profile(codes[offsets[j]:offsets[j + 1]], k)
+             for j in range(j_start, j_end)], k)
+        screened_out = similarity < min_similarity
+        distances[screened_out] = 1.0
+        cells = [(i, j) for i, j in cells
+                 if not screened_out[i - i_start, j - j_start]]
+        pruned['kmer'] += n_cells - len(cells)
+
+    pairs = [(codes[offsets[i]:offsets[i + 1]],
+              codes[offsets[j]:offsets[j + 1]]) for i, j in cells]
+    scores = _score_pairs(pairs, params)
+    if params.get('x_drop') is not None:
+        pruned['x_drop'] += scores.count(None)
+    for (i, j), result in zip(cells, scores):
+        if result is None:
+            distances[i - i_start, j - j_start] = 1.0
+            continue
+        _, matches, length = result
+        distances[i - i_start, j - j_start] = \
+            1 - matches / length if length else 0.0
+    return tile, np.triu(distances, k=i_start - j_start + 1), pruned
+
+
+def _tiles(n, size):
+    for i in range(0, n, size):
+        for j in range(i, n, size):
+            yield (i, min(i + size, n)), (j, min(j + size, n))
+
+
+def distances_all_vs_all(codes, n_jobs=1, min_kmer_similarity=None,
+                         kmer_size=8, pruned=None, **params):
+    """Compute the alignment distance between each pair of ``codes``.
+
+    ``codes`` is a list of encoded sequences; ``params`` are passed on to
+    ``global_score``. The distance is the fraction of the positions of the
+    alignment that aren't matches. Only the upper triangle of the matrix is
+    aligned, in tiles spread over ``n_jobs`` processes, which all read the
+    sequences from one block of shared memory.
+
+    Pairs with a k-mer similarity below ``min_kmer_similarity`` aren't
+    aligned, and are given a distance of 1, as are those whose alignment is
+    abandoned by the X-drop rule. If ``pruned`` is given, it's a
+    ``collections.Counter`` that counts these as ``'kmer'`` and
+    ``'x_drop'``.
+
+    Returns the full, symmetric matrix of distances.
+    """
+    n = len(codes)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(c) for c in codes], out=offsets[1:])
+
+    # a shared memory block can't be empty
+    buffer = SharedMemory(create=True, size=max(int(offsets[-1]), 1))
+    try:
+        np.ndarray((offsets[-1],), dtype=np.uint8, buffer=buffer.buf)[:] = \
+            np.concatenate(codes) if n else []
+        screens = {'min_kmer_similarity': min_kmer_similarity,
+                   'kmer_size': kmer_size}
+        distances = np.zeros((n, n))
+        for ((i_start, i_end), (j_start, j_end)), tile, tile_pruned in imap(
+                _distance_tile, _tiles(n, _TILE_SIZE), n_jobs,
+                dict(buffer_name=buffer.name, offsets=offsets,
+                     params=params, screens=screens), _attach_codes):
+            distances[i_start:i_end, j_start:j_end] = tile
+            if pruned is not None:
+                pruned.update(tile_pruned)
+    finally:
+        # with n_jobs=1 the arrays viewing the block are in this process,
+        # and have to be released before the block can be closed
+        worker_state.pop('codes', None)
+        worker_state.clear()
+        buffer.close()
+        buffer.unlink()
+    return distances + distances.T
@@ -0,0 +1,151 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import contextlib
+import hashlib
+import os
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+_SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS alignments (
+    key BLOB PRIMARY KEY,
+    score REAL NOT NULL,
+    idx1 BLOB NOT NULL,
+    idx2 BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alignments_last_used ON alignments (last_used);
+CREATE TABLE IF NOT EXISTS usage (total INTEGER NOT NULL);
+INSERT INTO usage SELECT 0 WHERE NOT EXISTS (SELECT * FROM usage);
+CREATE TRIGGER IF NOT EXISTS alignments_insert AFTER INSERT ON alignments
+    BEGIN UPDATE usage SET total = total + new.size; END;
+CREATE TRIGGER IF NOT EXISTS alignments_delete AFTER DELETE ON alignments
+    BEGIN UPDATE usage SET total = total - old.size; END;
+COMMIT;
+"""
+
+# Bytes counted for each entry on top of its index arrays, for the key and
+# the rest of the row.
+_ENTRY_OVERHEAD = 64
+
+
+class AlignmentCache:
+    """An on-disk cache of pairwise alignments.
+
+    Alignments are kept in an SQLite database in ``directory``, keyed by a
+    hash of the two sequences and the scoring parameters, and stored as
+    their compressed index arrays. When the entries add up to more than
+    ``max_size`` bytes, the least recently used are evicted. SQLite's locking
+    makes it safe for many processes to use the same cache at once; each
+    process should open its own ``AlignmentCache``.
+    """
+
+    def __init__(self, directory, max_size):
+        os.makedirs(directory, exist_ok=True)
+        self.max_size = max_size
+        # transactions are managed explicitly, and waiting on another
+        # process's lock is better than failing
+        self._connection = sqlite3.connect(
+            os.path.join(directory, 'alignments.sqlite'), timeout=600,
+            isolation_level=None)
+        # losing the last few entries to a power cut is fine for a cache
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(_SCHEMA)
+
+    @staticmethod
+    def key(codes1, codes2, gap_open_penalty, gap_extend_penalty,
+            match_score, mismatch_score, substitution_matrix=None,
+            mode='semi-global', anchored=False):
+        digest = hashlib.sha256()
+        for codes in (codes1, codes2):
+            digest.update(len(codes).to_bytes(8, 'little'))
+            digest.update(np.ascontiguousarray(codes, dtype=np.uint8).data)
+        digest.update(repr(tuple(float(value) for value in (
+            gap_open_penalty, gap_extend_penalty, match_score,
+            mismatch_score))).encode('ascii'))
+        if substitution_matrix is not None:
+            digest.update(np.ascontiguousarray(substitution_matrix,
+                                               dtype='<f8').data)
+        # the defaults add nothing, so older entries stay valid
+        if mode != 'semi-global':
+            digest.update(mode.encode('ascii'))
+        if anchored:
+            digest.update(b'anchored')
+        return digest.digest()
+
+    def get(self, key):
+        """Return the score and index arrays stored under ``key``, or None."""
+        with self._transaction():
+            row = self._connection.execute(
+                'SELECT score, idx1, idx2 FROM alignments WHERE key = ?',
+                (key, )).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                'UPDATE alignments SET last_used = ? WHERE key = ?',
+                (time.time(), key))
+        score, idx1, idx2 = row
+        return score, _unpack(idx1), _unpack(idx2)
+
+    def put(self, key, score, idx1, idx2):
+        """Store an alignment under ``key``, evicting old entries to make
+        room for it."""
+        idx1 = _pack(idx1)
+        idx2 = _pack(idx2)
+        size = len(idx1) + len(idx2) + _ENTRY_OVERHEAD
+        if size > self.max_size:
+            return
+        with self._transaction():
+            # rather than INSERT OR REPLACE, which wouldn't fire the trigger
+            # keeping track of the total size for the replaced entry
+            self._connection.execute('DELETE FROM alignments WHERE key = ?',
+                                     (key, ))
+            self._connection.execute(
+                'INSERT INTO alignments VALUES (?, ?, ?, ?, ?, ?)',
+                (key, score, idx1, idx2, size, time.time()))
+            # oldest first, one at a time, so that no more are evicted than
+            # needed, and never the one just stored, which fits by itself
+            while self._total() > self.max_size:
+                self._connection.execute(
+                    'DELETE FROM alignments WHERE key = (SELECT key FROM '
+                    'alignments WHERE key != ? ORDER BY last_used LIMIT 1)',
+                    (key, ))
+
+    def close(self):
+        self._connection.close()
+
+    def _total(self):
+        return self._connection.execute(
+            'SELECT total FROM usage').fetchone()[0]
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # the write lock is taken up front, so that two processes can't both
+        # read and then fail to upgrade to writing
+        self._connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._connection.execute('ROLLBACK')
+            raise
+        self._connection.execute('COMMIT')
+
+
+def _pack(idx):
+    return zlib.compress(np.asarray(idx, dtype='<i4').tobytes(), 1)
+
+
+def _unpack(data):
+    return np.frombuffer(zlib.decompress(data), dtype='<i4').astype(np.intp)
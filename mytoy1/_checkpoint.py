@@ -0,0 +1,74 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+
+from ._scan import map_file
+
+# The file is identified by a hash of this many bytes at its start, and the
+# part of it already scanned is checked against a hash of this many bytes
+# before the offset the scan got to.
+_HASHED_SIZE = 1024 ** 2
+
+
+class ScanCheckpoint:
+    """A sidecar file recording how far a scan of a FASTA file got, so that
+    a later scan of the same file, after more has been appended to it, only
+    needs to scan what was appended.
+
+    The sidecar is a small JSON file at ``path``, holding the byte offset
+    the scan got to, the result so far, and hashes of the start of the file
+    and of the block just before the offset. Artifacts are extracted to a
+    new path for every action, so a file is known by the hash of its start,
+    rather than by its path or inode; the hash of the last block checks that
+    what was scanned hasn't changed since. A file that doesn't match its
+    checkpoint is scanned again from the start.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def resume(self, fasta_path):
+        """Return the offset to resume scanning ``fasta_path`` from and the
+        result of the scan up to there, or 0 and None if there is no
+        checkpoint of it, or none that can be read."""
+        data = map_file(fasta_path)
+        try:
+            with open(self.path) as fh:
+                saved = json.load(fh)
+            offset = saved['offset']
+            if offset > len(data) or \
+                    saved['hashes'] != _hashes(data, offset):
+                return 0, None
+            return offset, saved['result']
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            # a sidecar that was truncated or otherwise corrupted is no
+            # worse than none at all
+            return 0, None
+
+    def save(self, fasta_path, offset, result):
+        """Record that ``fasta_path`` was scanned up to ``offset``, with
+        ``result``, which must be JSON serializable."""
+        data = map_file(fasta_path)
+        saved = {'offset': offset, 'result': result,
+                 'hashes': _hashes(data, offset)}
+        # written whole and then renamed, so that a scan stopped halfway
+        # leaves the last checkpoint as it was
+        temporary = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(temporary, 'w') as fh:
+            json.dump(saved, fh)
+        os.replace(temporary, self.path)
+
+
+def _hashes(data, offset):
+    # the start of the file, and the block before the offset
+    return [hashlib.sha256(data[:min(offset, _HASHED_SIZE)]).hexdigest(),
+            hashlib.sha256(
+                data[max(0, offset - _HASHED_SIZE):offset]).hexdigest()]
@@ -0,0 +1,171 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy as np
+
+from ._alignment import _band, _table, _widen, _Traceback
+from ._anchors import minimizers, _ANCHOR_KMER_SIZE, _ANCHOR_WINDOW
+
+# Filling an anti-diagonal costs about as much as this many cells on top of
+# the cells themselves, whatever its length, so that a band only pays off
+# on long sequences.
+_DIAGONAL_COST = 4096
+
+# Pairs costing less than this are aligned in full, without estimating
+# their identity, which would take longer than anything it could save.
+_MIN_ESTIMATED_COST = 2 ** 24
+
+# Narrowing the band only pays off if it leaves out at least this fraction
+# of the cost, as a band that turns out too narrow is filled twice.
+_MIN_BAND_SAVING = 0.25
+
+# About this fraction of the differences between related sequences are
+# insertions and deletions, rather than substitutions.
+_INDEL_FRACTION = 0.25
+
+# The band is made this much wider than the expected score calls for, so
+# that a slightly lower score doesn't have it filled twice.
+_BAND_MARGIN = 32
+
+# Beyond this cost, an exact alignment takes the better part of an hour,
+# and sequences at least this similar are aligned through anchors instead.
+_MAX_EXACT_COST = 2 ** 36
+_MIN_ANCHORED_IDENTITY = 0.9
+
+STRATEGIES = ('full', 'banded', 'linear-space', 'anchored')
+
+
+def estimate_identity(codes1, codes2):
+    """Estimate the identity of two encoded sequences from the minimizers
+    they share.
+
+    The minimizers are a sample of the k-mers of a sequence, the same one
+    ``anchored_align`` takes its anchors from, and two sequences sharing a
+    k-mer share its minimizer. So the fraction of the minimizers of the
+    sequence with fewer that the other has too is about the fraction of its
+    k-mers found in the other, and a k-mer is only found there if all of its
+    k bases are, which makes the identity about that fraction to the power
+    1/k. Taking the sequence with fewer minimizers lets a short sequence
+    found inside a long one count as identical to it, as in a semi-global
+    alignment.
+
+    Returns None if either sequence is too short to have any minimizers.
+    """
+    samples = [np.unique(minimizers(codes, _ANCHOR_KMER_SIZE,
+                                    _ANCHOR_WINDOW)[1])
+               for codes in (codes1, codes2)]
+    smaller = min(len(sample) for sample in samples)
+    if smaller == 0:
+        return None
+    shared = len(np.intersect1d(*samples, assume_unique=True))
+    return (shared / smaller) ** (1 / _ANCHOR_KMER_SIZE)
+
+
+def band_cells(n, m, band_width=None):
+    """Return the number of cells ``global_align`` fills for sequences of
+    lengths ``m`` and ``n``, with a band of ``band_width``."""
+    band = _band(n, m, band_width)
+    if band is None:
+        return (n + 1) * (m + 1)
+    kmin, kmax = band
+    rows = np.arange(n + 1)
+    return int(np.clip(np.minimum(rows + kmax, m) -
+                       np.maximum(rows + kmin, 0) + 1, 0, None).sum())
+
+
+def _cost(n, m, cells):
+    return cells + (n + m + 1) * _DIAGONAL_COST
+
+
+def _anchored_cells(n, m, identity):
+    # A minimizer is an anchor if all of its bases match, and there are
+    # about two of them in every window + 1 positions, so the anchors are
+    # about this far apart, give or take an exponential spread. Whatever of
+    # the space between two of them isn't covered by the first is aligned in
+    # full, and so is a window or so around each difference. Without any
+    # anchors, the whole matrix is.
+    length = min(n, m)
+    spacing = (_ANCHOR_WINDOW + 1) / 2 / max(identity, 1e-3) ** \
+        _ANCHOR_KMER_SIZE
+    between = 2 * length * spacing * np.exp(-_ANCHOR_KMER_SIZE / spacing)
+    around = (1 - identity) * length * (_ANCHOR_WINDOW + 2) ** 2
+    return int(min(between + around, (n + 1) * (m + 1)))
+
+
+def _expected_score(n, m, identity, table, gap_open_penalty):
+    # the average scores of a match and a mismatch of the four bases, over
+    # the length of the shorter sequence, with each indel a gap of its own
+    bases = table[:4, :4]
+    match = np.diag(bases).mean()
+    mismatch = bases[~np.eye(4, dtype=bool)].mean()
+    length = min(n, m)
+    differences = (1 - identity) * length
+    return (identity * length * match +
+            (1 - _INDEL_FRACTION) * differences * mismatch -
+            _INDEL_FRACTION * differences * gap_open_penalty)
+
+
+def plan_alignment(codes1, codes2, gap_open_penalty, match_score,
+                   mismatch_score, substitution_matrix=None,
+                   memory_limit=None, mode='semi-global', band_width=None,
+                   x_drop=None, anchored=False):
+    """Choose how ``nw_align`` aligns two encoded sequences.
+
+    Pairs too small for it to matter are aligned in 'full'. For the others,
+    the identity is estimated with ``estimate_identity``, and a 'banded'
+    alignment is chosen if the band leaves out enough of the matrix. It is
+    made as wide as ``global_align`` would widen it to for the score
+    expected of that identity, so that it usually doesn't need widening;
+    it is widened if it turns out too narrow, so this is exact either way.
+    The scoring parameters are as for ``global_align``, each indel being
+    expected to be a gap of its own. If the
+    traceback of that doesn't fit in ``memory_limit`` bytes, it is
+    'linear-space', recomputed from checkpoints. Only if even the band would
+    take too long, and the sequences are similar enough, are they aligned
+    through anchors, which isn't exact, but close to it for such sequences;
+    that is never chosen in local mode, or with ``x_drop``.
+
+    A ``band_width`` or ``anchored`` given by the user is kept as it is.
+
+    Returns the strategy, one of ``STRATEGIES``, the band width to align
+    with, the estimated identity, or None if it wasn't estimated, and the
+    estimated number of cells that will be filled.
+    """
+    n = len(codes2)
+    m = len(codes1)
+    table = _table(match_score, mismatch_score, substitution_matrix)
+    identity = None
+    cells = band_cells(n, m, band_width)
+    if anchored or (band_width is None and mode != 'local' and
+                    _cost(n, m, cells) > _MIN_ESTIMATED_COST):
+        identity = estimate_identity(codes1, codes2)
+    if anchored:
+        return ('anchored', band_width, identity,
+                _anchored_cells(n, m, identity or 0.0))
+
+    if identity is not None:
+        width = _BAND_MARGIN + _widen(
+            n, m, table, 0,
+            _expected_score(n, m, identity, table, gap_open_penalty))
+        banded = band_cells(n, m, width)
+        if _cost(n, m, banded) <= \
+                (1 - _MIN_BAND_SAVING) * _cost(n, m, cells):
+            band_width = width
+            cells = banded
+        if (_cost(n, m, cells) > _MAX_EXACT_COST and x_drop is None and
+                identity >= _MIN_ANCHORED_IDENTITY):
+            return ('anchored', None, identity,
+                    _anchored_cells(n, m, identity))
+
+    strategy = 'full' if band_width is None else 'banded'
+    if (memory_limit is not None and
+            _Traceback.size(n, m, _band(n, m, band_width)) > memory_limit):
+        # global_align switches to this itself, and fills the cells the
+        # traceback goes through a second time
+        return 'linear-space', band_width, identity, 2 * cells
+    return strategy, band_width, identity, cells
@@ -0,0 +1,73 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy as np
+
+from ._alignment import _IUPAC_ALPHABET
+
+
+def _pattern_masks(codes):
+    # bit i of the mask of a code is set if codes[i] is that code
+    return [int.from_bytes(np.packbits(codes == code,
+                                       bitorder='little').tobytes(),
+                           'little')
+            for code in range(len(_IUPAC_ALPHABET))]
+
+
+def edit_distance(codes1, codes2, max_distance=None):
+    """Return the edit distance between two encoded sequences.
+
+    This is the number of substitutions, insertions and deletions needed to
+    turn one sequence into the other, which is minus the score of their
+    global alignment with a match score of 0 and a mismatch score and
+    (linear) gap penalty of 1, all gaps included. It is computed with the
+    bit-vector algorithm of Myers (1999), in the global form given by Hyyrö
+    (2001): a column of the DP matrix is held as the bits of two integers,
+    one for the cells that are one more than the cell above them and one for
+    those that are one less, so that each position of the longer sequence
+    takes a handful of integer operations whatever the length of the shorter
+    one. A degenerate base only matches the same degenerate base.
+
+    If ``max_distance`` is given, this stops as soon as the distance is known
+    to be greater, and returns None.
+    """
+    if len(codes1) < len(codes2):
+        codes1, codes2 = codes2, codes1
+    # the shorter sequence is held in the bits, the longer one is walked
+    n = len(codes2)
+    m = len(codes1)
+    if max_distance is not None and m - n > max_distance:
+        return None
+    if n == 0:
+        return m
+
+    masks = _pattern_masks(codes2)
+    full = (1 << n) - 1
+    last = 1 << (n - 1)
+    positive = full
+    negative = 0
+    distance = n
+    for j, code in enumerate(codes1.tolist(), start=1):
+        eq = masks[code]
+        xv = eq | negative
+        xh = (((eq & positive) + positive) ^ positive) | eq
+        positive_h = negative | (~(xh | positive) & full)
+        negative_h = positive & xh
+        if positive_h & last:
+            distance += 1
+        elif negative_h & last:
+            distance -= 1
+        # the last row can only get better by one per remaining position
+        if max_distance is not None and distance - (m - j) > max_distance:
+            return None
+        # the first row is 0, 1, 2, ... so it always goes up by one
+        positive_h = (positive_h << 1) | 1
+        negative_h <<= 1
+        positive = (negative_h | ~(xv | positive_h)) & full
+        negative = positive_h & xv
+    return distance
@@ -0,0 +1,60 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy as np
+from scipy import sparse
+
+from ._alignment import _ALPHABET
+
+
+def kmer_profile(codes, k):
+    """Return the sorted, distinct k-mers of an encoded sequence.
+
+    Each k-mer is read as a base-4 number, so the k-mers of a sequence come
+    out of a single matrix product over a sliding window of its codes.
+    K-mers with degenerate bases in them are left out.
+    """
+    if len(codes) < k:
+        return np.zeros(0, dtype=np.int64)
+    windows = np.lib.stride_tricks.sliding_window_view(codes, k)
+    places = len(_ALPHABET) ** np.arange(k - 1, -1, -1, dtype=np.int64)
+    kmers = windows @ places
+    degenerate = codes >= len(_ALPHABET)
+    if degenerate.any():
+        kmers = kmers[np.lib.stride_tricks.sliding_window_view(
+            degenerate, k).sum(axis=1) == 0]
+    return np.unique(kmers)
+
+
+def _presence(profiles, k):
+    # one row per profile, one column per possible k-mer
+    indptr = np.zeros(len(profiles) + 1, dtype=np.int64)
+    np.cumsum([len(profile) for profile in profiles], out=indptr[1:])
+    indices = (np.concatenate(profiles) if profiles else
+               np.zeros(0, dtype=np.int64))
+    return sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.int64), indices, indptr),
+        shape=(len(profiles), len(_ALPHABET) ** k))
+
+
+def kmer_similarity(profiles1, profiles2, k):
+    """Return the Jaccard similarity of each of ``profiles1`` to each of
+    ``profiles2``.
+
+    This is the number of k-mers two sequences share over the number found
+    in either. The shared k-mers of all the pairs are counted at once, as a
+    product of sparse presence matrices. Sequences too short to have any
+    k-mers can't be told apart this way, so two of them have a similarity
+    of 1.
+    """
+    shared = (_presence(profiles1, k) @ _presence(profiles2, k).T).toarray()
+    sizes1 = np.array([len(profile) for profile in profiles1])
+    sizes2 = np.array([len(profile) for profile in profiles2])
+    union = sizes1[:, None] + sizes2[None, :] - shared
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(union > 0, shared / union, 1.0)
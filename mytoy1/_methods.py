@@ -6,12 +6,35 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import collections
+import itertools
+import time
+
 import pandas as pd
 
-from skbio.alignment import global_pairwise_align_nucleotide, TabularMSA
-from skbio import DNA
+import qiime2
+from skbio.alignment import TabularMSA
+from skbio import DistanceMatrix
 
-from q2_types.feature_data import DNAIterator
+from ._alignment import (global_align_strands, global_score,
+                         global_score_sweep,
+                         iupac_substitution_table, reverse_complement, to_msa,
+                         XDropped)
+from ._anchors import anchored_align
+from ._batch import (align_one_vs_many, distances_all_vs_all,
+                     edit_distances_one_vs_many)
+from ._cache import AlignmentCache
+from ._checkpoint import ScanCheckpoint
+from ._dispatch import plan_alignment
+from ._scan import (count_records, map_file, scan, summarize_tallies,
+                    tally_sequences)
+from ._sequences import DNAFASTAFile, EncodedDNAIterator, EncodedSequence
+from ._types_and_formats import (CIGARAlignmentsDirectoryFormat,
+                                 CIGARAlignmentsFormat,
+                                 PairwiseAlignmentsFormat,
+                                 SequenceLengthsFormat,
+                                 SequenceStatsDirectoryFormat,
+                                 SequenceStatsFormat)
 
 
 def duplicate_table(table: pd.DataFrame) -> pd.DataFrame:
@@ -19,27 +42,438 @@ def duplicate_table(table: pd.DataFrame) -> pd.DataFrame:
 
 #type hints using : and -> after the argument
 #uses workaround to get first dna sequence from multiple seqs
-def nw_align(seq1: DNA,
-             seq2: DNA,
+def nw_align(seq1: EncodedSequence,
+             seq2: EncodedSequence,
              gap_open_penalty: float = 5,
              gap_extend_penalty: float = 2,
              match_score: float = 1,
-             mismatch_score: float = -2) -> TabularMSA:
+             mismatch_score: float = -2,
+             band_width: int = None,
+             x_drop: float = None,
+             substitution_matrix: qiime2.Metadata = None,
+             mode: str = 'semi-global',
+             strand: str = 'forward',
+             anchored: bool = False,
+             memory_limit: int = 1024,
+             n_jobs: int = 1,
+             cache_dir: str = None,
+             cache_size: int = 1024) -> TabularMSA:
+    if anchored and x_drop is not None:
+        raise ValueError("x-drop can't be used in anchored alignments.")
+    codes1 = seq1.codes
+    strands = [seq2.codes]
+    if strand == 'both':
+        strands.append(reverse_complement(strands[0]))
+    substitution_matrix = _substitution_matrix(substitution_matrix)
+
+    # each strand is cached on its own; the band and the memory limit don't
+    # change the alignment, so they aren't part of the key
+    cache = keys = results = None
+    if cache_dir is not None:
+        cache = AlignmentCache(cache_dir, cache_size * 1024 ** 2)
+    try:
+        if cache is not None:
+            keys = [AlignmentCache.key(codes1, codes2, gap_open_penalty,
+                                       gap_extend_penalty, match_score,
+                                       mismatch_score, substitution_matrix,
+                                       mode, anchored)
+                    for codes2 in strands]
+            results = [cache.get(key) for key in keys]
+            if None in results:
+                results = None
+
+        if results is None:
+            results, strategies = _align_strands(
+                codes1, strands, gap_open_penalty=gap_open_penalty,
+                gap_extend_penalty=gap_extend_penalty,
+                match_score=match_score, mismatch_score=mismatch_score,
+                band_width=band_width, x_drop=x_drop,
+                substitution_matrix=substitution_matrix, mode=mode,
+                anchored=anchored, memory_limit=memory_limit * 1024 ** 2,
+                n_jobs=n_jobs)
+            # with x_drop, the alignment may not be the one the key stands
+            # for, and neither is one the plan aligned through anchors
+            if cache is not None and x_drop is None:
+                for key, result, strategy in zip(keys, results, strategies):
+                    if anchored or strategy != 'anchored':
+                        cache.put(key, *result)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    # the better scoring strand, unless it was abandoned by x-drop and the
+    # other wasn't; the forward strand wins ties
+    ranks = [(not isinstance(result, XDropped), _result(result)[0])
+             for result in results]
+    reverse = len(results) > 1 and ranks[1] > ranks[0]
+    result = results[reverse]
+    if isinstance(result, XDropped):
+        _report_x_drop()
+    _, idx1, idx2 = _result(result)
+
+    seq2 = seq2.to_dna()
+    if reverse:
+        print('The reverse complement of seq2 aligned better, and is the '
+              'one aligned.')
+        seq2 = seq2.reverse_complement()
+        if seq2.has_metadata():
+            seq2.metadata['description'] = ' '.join(
+                filter(None, [seq2.metadata.get('description'),
+                              '(reverse complement)']))
+    return to_msa(seq1.to_dna(), seq2, idx1, idx2)
+
+
+def _align_strands(codes1, strands, gap_open_penalty, gap_extend_penalty,
+                   match_score, mismatch_score, band_width, x_drop,
+                   substitution_matrix, mode, anchored, memory_limit, n_jobs):
+    # Each strand is aligned as planned for it, and those planned alike
+    # together, so that both strands are filled in one sweep when they can
+    # be. The plan is reported with the cells actually filled. Returns the
+    # alignments and the strategy of each.
+    plans = [plan_alignment(codes1, codes2, gap_open_penalty, match_score,
+                            mismatch_score, substitution_matrix,
+                            memory_limit, mode, band_width, x_drop, anchored)
+             for codes2 in strands]
+    groups = collections.defaultdict(list)
+    for k, (strategy, planned_band_width, _, _) in enumerate(plans):
+        groups[strategy, planned_band_width].append(k)
+
+    results = [None] * len(strands)
+    for (strategy, planned_band_width), group in groups.items():
+        cells = collections.Counter()
+        start = time.perf_counter()
+        if strategy == 'anchored':
+            aligned = [anchored_align(
+                codes1, strands[k], gap_open_penalty=gap_open_penalty,
+                gap_extend_penalty=gap_extend_penalty,
+                match_score=match_score, mismatch_score=mismatch_score,
+                band_width=planned_band_width,
+                substitution_matrix=substitution_matrix, mode=mode,
+                memory_limit=memory_limit, n_jobs=n_jobs, cells=cells
+            ) for k in group]
+        else:
+            aligned = global_align_strands(
+                codes1, [strands[k] for k in group],
+                gap_open_penalty=gap_open_penalty,
+                gap_extend_penalty=gap_extend_penalty,
+                match_score=match_score, mismatch_score=mismatch_score,
+                band_width=planned_band_width, x_drop=x_drop,
+                substitution_matrix=substitution_matrix, mode=mode,
+                memory_limit=memory_limit, cells=cells)
+        for k, result in zip(group, aligned):
+            results[k] = result
+        _report_plan(
+            [('seq2', 'the reverse complement of seq2')[k] for k in group],
+            strategy, planned_band_width,
+            [plans[k][2] for k in group], sum(plans[k][3] for k in group),
+            cells['filled'], time.perf_counter() - start)
+    return results, [plan[0] for plan in plans]
+
+
+def _result(result):
+    return result.result if isinstance(result, XDropped) else result
+
+
+def nw_score(seq1: EncodedSequence,
+             seq2: EncodedSequence,
+             gap_open_penalty: float = 5,
+             gap_extend_penalty: float = 2,
+             match_score: float = 1,
+             mismatch_score: float = -2,
+             band_width: int = None,
+             x_drop: float = None,
+             substitution_matrix: qiime2.Metadata = None) -> qiime2.Metadata:
+    try:
+        score, matches, length = global_score(
+            seq1.codes, seq2.codes, gap_open_penalty=gap_open_penalty,
+            gap_extend_penalty=gap_extend_penalty, match_score=match_score,
+            mismatch_score=mismatch_score, band_width=band_width,
+            x_drop=x_drop,
+            substitution_matrix=_substitution_matrix(substitution_matrix)
+        )
+    except XDropped as e:
+        score, matches, length = e.result
+        _report_x_drop()
+
+    result = pd.DataFrame(
+        {'score': [score],
+         'percent_identity': [100 * matches / length if length else 0.0],
+         'aligned_length': [length]},
+        index=pd.Index([seq2.id or 'seq2'], name='id'))
+    return qiime2.Metadata(result)
+
+
+def nw_sweep(seq1: EncodedSequence,
+             seq2: EncodedSequence,
+             gap_open_penalties: list = None,
+             gap_extend_penalties: list = None,
+             match_scores: list = None,
+             mismatch_scores: list = None) -> qiime2.Metadata:
+    # each list defaults to the one value nw_align has by default
+    grid = list(itertools.product(
+        [5] if gap_open_penalties is None else gap_open_penalties,
+        [2] if gap_extend_penalties is None else gap_extend_penalties,
+        [1] if match_scores is None else match_scores,
+        [-2] if mismatch_scores is None else mismatch_scores))
+    results = global_score_sweep(seq1.codes, seq2.codes, grid)
+
+    result = pd.DataFrame(
+        grid, columns=['gap_open_penalty', 'gap_extend_penalty',
+                       'match_score', 'mismatch_score'], dtype=float,
+        index=pd.Index(['combination-%d' % (k + 1)
+                        for k in range(len(grid))], name='id'))
+    result['score'] = [score for score, _, _ in results]
+    result['percent_identity'] = [100 * matches / length if length else 0.0
+                                  for _, matches, length in results]
+    result['aligned_length'] = [length for _, _, length in results]
+    return qiime2.Metadata(result)
+
+
+def nw_align_many(query: EncodedSequence,
+                  references: EncodedDNAIterator,
+                  gap_open_penalty: float = 5,
+                  gap_extend_penalty: float = 2,
+                  match_score: float = 1,
+                  mismatch_score: float = -2,
+                  band_width: int = None,
+                  x_drop: float = None,
+                  substitution_matrix: qiime2.Metadata = None,
+                  memory_limit: int = 1024,
+                  n_jobs: int = 1,
+                  max_edit_distance: int = None,
+                  min_kmer_similarity: float = None,
+                  kmer_size: int = 8,
+                  cache_dir: str = None,
+                  cache_size: int = 1024) -> PairwiseAlignmentsFormat:
+    results, pruned = _align_many(**locals())
+
+    # results are written out as they come in, rather than collected first
+    ff = PairwiseAlignmentsFormat()
+    with ff.open() as fh:
+        fh.write('\t'.join(PairwiseAlignmentsFormat.HEADER) + '\n')
+        for target_id, score, matches, length, aligned_query, \
+                aligned_target in results:
+            if score is None:
+                # not aligned: all but the id is left empty
+                fh.write(target_id + '\t' * 5 + '\n')
+                continue
+            identity = 100 * matches / length if length else 0.0
+            fh.write(f"{target_id}\t{score!r}\t{identity!r}\t{length}\t"
+                     f"{aligned_query}\t{aligned_target}\n")
+    _report_pruned(pruned)
+    return ff
+
+
+def nw_align_many_cigar(query: EncodedSequence,
+                        references: EncodedDNAIterator,
+                        gap_open_penalty: float = 5,
+                        gap_extend_penalty: float = 2,
+                        match_score: float = 1,
+                        mismatch_score: float = -2,
+                        band_width: int = None,
+                        x_drop: float = None,
+                        substitution_matrix: qiime2.Metadata = None,
+                        memory_limit: int = 1024,
+                        n_jobs: int = 1,
+                        max_edit_distance: int = None,
+                        min_kmer_similarity: float = None,
+                        kmer_size: int = 8,
+                        cache_dir: str = None,
+                        cache_size: int = 1024
+                        ) -> CIGARAlignmentsDirectoryFormat:
+    params = locals()
+    result = CIGARAlignmentsDirectoryFormat()
+    with open(result.path / 'query.fasta', 'w') as fh:
+        fh.write(_fasta_record(query, 'query'))
+
+    with open(result.path / 'targets.fasta', 'w') as targets, \
+            open(result.path / 'alignments.tsv', 'w') as fh:
+        results, pruned = _align_many(**params, as_cigar=True,
+                                      targets=targets)
 
-    msa, _, _ = global_pairwise_align_nucleotide(
-        seq1=seq1, seq2=seq2, gap_open_penalty=gap_open_penalty,
+        fh.write('\t'.join(CIGARAlignmentsFormat.HEADER) + '\n')
+        for target_id, score, matches, length, span, cigar in results:
+            if score is None:
+                fh.write(target_id + '\t' * 8 + '\n')
+                continue
+            identity = 100 * matches / length if length else 0.0
+            # the positions are written 1-based and inclusive
+            query_start, query_end, target_start, target_end = span
+            fh.write(f"{target_id}\t{score!r}\t{identity!r}\t{length}\t"
+                     f"{query_start + 1}\t{query_end}\t"
+                     f"{target_start + 1}\t{target_end}\t{cigar}\n")
+    _report_pruned(pruned)
+    return result
+
+
+def _written(references, fh):
+    # each target is written out as it's sent to be aligned, so that they
+    # end up in the order of the alignments
+    for seq in references:
+        fh.write(_fasta_record(seq, ''))
+        yield seq.id, seq
+
+
+def _fasta_record(seq, default_id):
+    header = ' '.join(filter(None, [seq.id or default_id, seq.description]))
+    return '>%s\n%s\n' % (header, seq)
+
+
+def _align_many(query, references, gap_open_penalty, gap_extend_penalty,
+                match_score, mismatch_score, band_width, x_drop,
+                substitution_matrix, memory_limit, n_jobs, max_edit_distance,
+                min_kmer_similarity, kmer_size, cache_dir, cache_size,
+                as_cigar=False, targets=None):
+    # the alignments of nw_align_many and nw_align_many_cigar, which pass on
+    # all of their parameters, so that neither can take one the other
+    # doesn't. With targets, each reference is written there as it's sent to
+    # be aligned. The counter of the pairs that weren't aligned is complete
+    # once all of the alignments have been read.
+    if targets is None:
+        records = ((seq.id, seq) for seq in references)
+    else:
+        records = _written(references, targets)
+    pruned = collections.Counter()
+    results = align_one_vs_many(
+        query, records, n_jobs=n_jobs,
+        max_edit_distance=max_edit_distance,
+        min_kmer_similarity=min_kmer_similarity, kmer_size=kmer_size,
+        pruned=pruned,
+        cache=(cache_dir, cache_size * 1024 ** 2) if cache_dir else None,
+        gap_open_penalty=gap_open_penalty,
+        gap_extend_penalty=gap_extend_penalty, match_score=match_score,
+        mismatch_score=mismatch_score, band_width=band_width, x_drop=x_drop,
+        substitution_matrix=_substitution_matrix(substitution_matrix),
+        memory_limit=memory_limit * 1024 ** 2, as_cigar=as_cigar
+    )
+    return results, pruned
+
+
+def _report_pruned(pruned):
+    # printed for the screens that were used, and shown with --verbose
+    for screen, description in (('kmer', 'k-mer similarity'),
+                                ('edit_distance', 'edit distance')):
+        if screen in pruned:
+            print('%d pairs were screened out by %s and not aligned.'
+                  % (pruned[screen], description))
+    if 'x_drop' in pruned:
+        print('%d alignments were abandoned by the X-drop rule.'
+              % pruned['x_drop'])
+
+
+def _substitution_matrix(metadata):
+    # the scores between the characters in the ids and the columns, as a
+    # table for the alignment engine
+    if metadata is None:
+        return None
+    scores = metadata.to_dataframe()
+    if set(scores.columns) != set(scores.index):
+        raise ValueError('The substitution matrix must have a column for '
+                         'each of its rows, and no others.')
+    scores = scores[scores.index]
+    if not all(pd.api.types.is_numeric_dtype(dtype)
+               for dtype in scores.dtypes) or scores.isna().any(axis=None):
+        raise ValueError('The substitution matrix must only have numbers '
+                         'in it.')
+    return iupac_substitution_table(list(scores.index), scores.to_numpy())
+
+
+def _report_plan(names, strategy, band_width, identities, estimated,
+                 filled, seconds):
+    # shown with --verbose, so that the choice can be checked against what
+    # it cost
+    details = ['band width %d' % band_width] if band_width else []
+    details += ['estimated identity %.1f%%' % (100 * identity)
+                for identity in identities if identity is not None]
+    print('Aligned %s with the %s strategy%s: %d cells were estimated to be '
+          'filled, and %d were, in %.2f s.'
+          % (' and '.join(names), strategy,
+             ' (%s)' % ', '.join(details) if details else '', estimated,
+             filled, seconds))
+
+
+def _report_x_drop():
+    print('The alignment was abandoned by the X-drop rule, and is cut short '
+          'after its best scoring position, with what is left of both '
+          'sequences against gaps.')
+
+
+def edit_distance(query: EncodedSequence,
+                  references: EncodedDNAIterator,
+                  n_jobs: int = 1) -> qiime2.Metadata:
+    records = ((seq.id, seq) for seq in references)
+    result = pd.DataFrame(
+        edit_distances_one_vs_many(query, records, n_jobs=n_jobs),
+        columns=['id', 'edit_distance']).set_index('id')
+    return qiime2.Metadata(result)
+
+
+def nw_distance_matrix(sequences: EncodedDNAIterator,
+                       gap_open_penalty: float = 5,
+                       gap_extend_penalty: float = 2,
+                       match_score: float = 1,
+                       mismatch_score: float = -2,
+                       band_width: int = None,
+                       x_drop: float = None,
+                       substitution_matrix: qiime2.Metadata = None,
+                       n_jobs: int = 1,
+                       min_kmer_similarity: float = None,
+                       kmer_size: int = 8) -> DistanceMatrix:
+    ids = []
+    codes = []
+    for seq in sequences:
+        ids.append(seq.id)
+        try:
+            codes.append(seq.codes)
+        except ValueError as e:
+            raise ValueError('Sequence %r: %s' % (ids[-1], e)) from e
+
+    pruned = collections.Counter()
+    distances = distances_all_vs_all(
+        codes, n_jobs=n_jobs, min_kmer_similarity=min_kmer_similarity,
+        kmer_size=kmer_size, pruned=pruned,
+        gap_open_penalty=gap_open_penalty,
         gap_extend_penalty=gap_extend_penalty, match_score=match_score,
-        mismatch_score=mismatch_score
+        mismatch_score=mismatch_score, band_width=band_width, x_drop=x_drop,
+        substitution_matrix=_substitution_matrix(substitution_matrix)
     )
+    _report_pruned(pruned)
+    return DistanceMatrix(distances, ids)
 
-    return msa
 
 # want sequence file as input
 #
-def seqcount(sequences: DNAIterator) -> int:
+def seqcount(sequences: DNAFASTAFile, n_jobs: int = 1,
+             checkpoint: str = None) -> int:
+    if checkpoint is None:
+        return sum(scan(sequences.path, count_records, n_jobs))
+
+    # only up to the end the file has now, whatever is appended meanwhile
+    end = len(map_file(sequences.path))
+    checkpoint = ScanCheckpoint(checkpoint)
+    start, count = checkpoint.resume(sequences.path)
+    if start:
+        print('Resumed counting from byte %d of %d, with %d sequences '
+              'counted before it.' % (start, end, count))
+    count = (count or 0) + sum(scan(sequences.path, count_records, n_jobs,
+                                    start, end))
+    checkpoint.save(sequences.path, end, count)
+    return count
+
+
+def seqstats(sequences: DNAFASTAFile,
+             n_jobs: int = 1) -> SequenceStatsDirectoryFormat:
+    stats, histogram = summarize_tallies(
+        scan(sequences.path, tally_sequences, n_jobs))
 
-    # outputstr = "number of sequences: %d" % count
-    # click.secho(outputstr,fg='green', bg='black')
-    # click.echo("hello")
-    seqs = list(sequences)  # consumes the iterator
-    return len(seqs)
\ No newline at end of file
+    result = SequenceStatsDirectoryFormat()
+    with open(result.path / 'stats.tsv', 'w') as fh:
+        fh.write('\t'.join(SequenceStatsFormat.HEADER) + '\n')
+        for name in SequenceStatsFormat.STATISTICS:
+            value = stats[name]
+            fh.write(f"{name}\t{'' if value is None else repr(value)}\n")
+    with open(result.path / 'length-histogram.tsv', 'w') as fh:
+        fh.write('\t'.join(SequenceLengthsFormat.HEADER) + '\n')
+        for length, count in histogram:
+            fh.write(f"{length}\t{count}\n")
+    return result
@@ -0,0 +1,67 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import collections
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+
+# State set up once in each worker process by the pool initializer, so that
+# it doesn't have to be sent along with every chunk.
+worker_state = {}
+
+
+def chunks(iterable, size):
+    """Yield the items of ``iterable`` in lists of ``size``, the last of
+    which may be shorter."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def init_worker(state, setup=None):
+    """Set up ``worker_state`` in a process of the pool.
+
+    ``worker_state`` is replaced by the items of ``state``, and ``setup``,
+    if it's given, is then called with no arguments, for whatever has to be
+    built in each process rather than sent to it.
+    """
+    worker_state.clear()
+    worker_state.update(state)
+    if setup is not None:
+        setup()
+
+
+def imap(function, chunks, n_jobs, state, setup=None):
+    """Lazily map ``function`` over ``chunks`` in a pool of processes.
+
+    Each process is set up by ``init_worker`` with ``state`` and ``setup``,
+    which, like ``function``, must be a module-level function, so that it
+    can be sent to the processes. Results are yielded in order, as soon as
+    they're available. Only a few chunks per process are queued at any
+    time, so the input is consumed no faster than the results are, and
+    neither is ever held in memory as a whole. With ``n_jobs=1`` everything
+    runs in the calling process.
+    """
+    if n_jobs == 1:
+        init_worker(state, setup)
+        yield from map(function, chunks)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=init_worker,
+                             initargs=(state, setup)) as executor:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(function, chunk))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,262 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import collections
+import os
+
+import numpy as np
+
+from ._pool import imap, worker_state
+
+# Files are scanned this many bytes at a time, which keeps the temporary
+# arrays of each block in the CPU cache's reach while amortizing the NumPy
+# calls over enough bytes.
+_BLOCK_SIZE = 4 * 1024 ** 2
+
+# Files are split into this many ranges for each process scanning them, so
+# that a process getting through its ranges faster than the others picks up
+# some of theirs, but never into ranges smaller than this many bytes.
+_RANGES_PER_JOB = 4
+_MIN_RANGE_SIZE = 64 * 1024 ** 2
+
+_HEADER = ord('>')
+_NEWLINE = ord('\n')
+_RETURN = ord('\r')
+
+# Setting this bit turns upper case letters into lower case ones, and no
+# other byte into a lower case letter, so that bases are counted in either
+# case with one comparison each.
+_LOWER_CASE = 0x20
+_GC_BASES = tuple(b'gc')
+_AT_BASES = tuple(b'at')
+
+
+def map_file(path):
+    """Return the bytes of a file as a read-only, memory-mapped uint8 array.
+
+    Only the pages that are looked at are read from disk, by the operating
+    system, without going through Python objects at all.
+    """
+    # an empty file can't be mapped
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode='r')
+
+
+def count_records(path, start=0, end=None):
+    """Return the number of records of a FASTA file whose header lines start
+    between the bytes ``start`` and ``end`` of it.
+
+    A record starts with a '>' at the start of the file or just after a
+    newline, so CRLF line endings and a missing newline at the end of the
+    file make no difference, and a '>' elsewhere in a header is no record.
+    The file is memory-mapped and scanned a block at a time, with the '>' of
+    each block found by a single vectorized comparison, so that counting is
+    about as fast as the file can be read.
+    """
+    data = map_file(path)
+    end = len(data) if end is None else min(end, len(data))
+    count = 0
+    for block in range(start, end, _BLOCK_SIZE):
+        positions = block + np.flatnonzero(
+            data[block:min(block + _BLOCK_SIZE, end)] == _HEADER)
+        # the byte before the start of the file is never looked at
+        count += int(np.count_nonzero(
+            (positions == 0) | (data[positions - 1] == _NEWLINE)))
+    return count
+
+
+def tally_sequences(path, start=0, end=None):
+    """Tally the lengths and the bases of the records of a FASTA file whose
+    header lines start between the bytes ``start`` and ``end`` of it.
+
+    The file is memory-mapped and scanned a block at a time, as by
+    ``count_records``. Only the newlines of a block are looked at one by
+    one, to split it into lines, with the lengths of the sequence lines
+    summed into their records; the bases are counted over the whole block
+    with vectorized comparisons, less those of the header lines. Lines and
+    records running over the end of a block are carried over to the next.
+    Line endings, CRLF or not, are not counted as part of the sequences.
+
+    Returns a ``collections.Counter`` of the number of records of each
+    length, the number of G and C bases and the number of bases other than
+    A, C, G and T, which ``summarize_tallies`` turns into statistics. The
+    tallies of ranges of a file add up to the tally of the whole of it.
+    """
+    data = map_file(path)
+    end = len(data) if end is None else min(end, len(data))
+    lengths = collections.Counter()
+    gc = non_acgt = 0
+    # whether the block starts at the start of a line, whether the line it
+    # starts in is a header line, and the length so far of the record it
+    # starts in, or None if it starts before the first one
+    at_line_start = start == 0 or data[start - 1] == _NEWLINE
+    in_header = False
+    current = None
+    for block in range(start, end, _BLOCK_SIZE):
+        chunk = np.asarray(data[block:min(block + _BLOCK_SIZE, end)])
+        newlines = np.flatnonzero(chunk == _NEWLINE)
+        starts = np.concatenate([[0], newlines + 1])
+        ends = np.append(newlines, len(chunk))
+        # the lines starting records, and the header lines, which include
+        # the rest of one started in the block before
+        record_starts = \
+            chunk[np.minimum(starts, len(chunk) - 1)] == _HEADER
+        record_starts[-1] &= starts[-1] < len(chunk)
+        headers = record_starts.copy()
+        if not at_line_start:
+            record_starts[0] = False
+            headers[0] = in_header
+        at_line_start = chunk[-1] == _NEWLINE
+        in_header = bool(headers[-1])
+
+        # the lines of the block, less their carriage returns, and the
+        # records they belong to, 0 being the one the block starts in
+        line_lengths = ends - starts - np.bincount(
+            np.searchsorted(newlines, np.flatnonzero(chunk == _RETURN)),
+            minlength=len(starts))
+        records = np.cumsum(record_starts)
+        n_headers = int(records[-1])
+        # anything before the first header is no part of a record
+        skipped = headers | ((records == 0) & (current is None))
+        sequence_lengths = np.where(skipped, 0, line_lengths)
+
+        lower = chunk | _LOWER_CASE
+        skipped_lower = _gather(lower, starts[skipped], ends[skipped])
+        block_gc = sum(_count(lower, base) - _count(skipped_lower, base)
+                       for base in _GC_BASES)
+        block_at = sum(_count(lower, base) - _count(skipped_lower, base)
+                       for base in _AT_BASES)
+        gc += block_gc
+        non_acgt += int(sequence_lengths.sum()) - block_gc - block_at
+
+        record_lengths = np.bincount(records, weights=sequence_lengths,
+                                     minlength=n_headers + 1).astype(np.int64)
+        if n_headers == 0:
+            if current is not None:
+                current += int(record_lengths[0])
+            continue
+        if current is not None:
+            lengths[current + int(record_lengths[0])] += 1
+        values, counts = np.unique(record_lengths[1:-1], return_counts=True)
+        lengths.update(dict(zip(values.tolist(), counts.tolist())))
+        current = int(record_lengths[-1])
+    if current is not None:
+        lengths[current] += 1
+    return lengths, gc, non_acgt
+
+
+def _count(data, value):
+    return int(np.count_nonzero(data == value))
+
+
+def _gather(data, starts, ends):
+    # the bytes from each start to the matching end, one after the other
+    sizes = ends - starts
+    offsets = np.cumsum(sizes) - sizes
+    return data[np.repeat(starts - offsets, sizes) + np.arange(sizes.sum())]
+
+
+def summarize_tallies(tallies):
+    """Add up the tallies of ``tally_sequences`` and summarize them.
+
+    Returns a dict of the statistics: the 'count' of records, their
+    'total_length', 'min_length', 'max_length' and 'mean_length', their
+    'n50' (the length of the shortest of the longest records that together
+    hold at least half of the bases), the 'gc_fraction' of the A, C, G and T
+    bases and the 'non_acgt_count' of other bases. The lengths and the
+    fraction are None without any records or any bases. Also returns the
+    number of records of each length, as a list of (length, count) pairs
+    sorted by length.
+    """
+    lengths = collections.Counter()
+    gc = non_acgt = 0
+    for tally_lengths, tally_gc, tally_non_acgt in tallies:
+        lengths.update(tally_lengths)
+        gc += tally_gc
+        non_acgt += tally_non_acgt
+    histogram = sorted(lengths.items())
+    values = np.array([length for length, _ in histogram], dtype=np.int64)
+    counts = np.array([count for _, count in histogram], dtype=np.int64)
+    count = int(counts.sum())
+    total = int((values * counts).sum())
+    stats = dict(count=count, total_length=total, min_length=None,
+                 max_length=None, mean_length=None, n50=None,
+                 gc_fraction=None, non_acgt_count=non_acgt)
+    if count:
+        # the longest records first, until they hold half of the bases
+        held = np.cumsum((values * counts)[::-1])
+        stats.update(
+            min_length=int(values[0]), max_length=int(values[-1]),
+            mean_length=total / count,
+            n50=int(values[::-1][np.searchsorted(held, total / 2)]))
+    if total - non_acgt:
+        stats['gc_fraction'] = gc / (total - non_acgt)
+    return stats, histogram
+
+
+def record_ranges(path, n, start=0, end=None):
+    """Split the bytes of a FASTA file from ``start`` to ``end`` into at most
+    ``n`` ranges of about the same size, each but the first starting at the
+    header of a record.
+
+    Returns the (start, end) byte offsets of the ranges, in the order they
+    come in the file. Every record starting in the bytes split is in exactly
+    one of them, whole.
+    """
+    data = map_file(path)
+    end = len(data) if end is None else min(end, len(data))
+    starts = [start]
+    for k in range(1, n):
+        next_start = _next_record(
+            data, max(start + (end - start) * k // n, starts[-1] + 1))
+        if next_start >= end:
+            break
+        starts.append(next_start)
+    return list(zip(starts, starts[1:] + [end]))
+
+
+def _next_record(data, position):
+    # the offset of the first header at or after position, or the size of
+    # the file if there is none
+    for block in range(position, len(data), _BLOCK_SIZE):
+        positions = block + np.flatnonzero(
+            data[block:block + _BLOCK_SIZE] == _HEADER)
+        headers = positions[(positions == 0) |
+                            (data[positions - 1] == _NEWLINE)]
+        if len(headers):
+            return int(headers[0])
+    return len(data)
+
+
+def scan(path, function, n_jobs=1, start=0, end=None):
+    """Apply ``function`` to ranges of a FASTA file in a pool of ``n_jobs``
+    processes.
+
+    The bytes of the file from ``start`` to ``end``, all of them by default,
+    are split by ``record_ranges``, and ``function`` is called with the path
+    and the start and end of each range; it must be a module-level function,
+    so that it can be sent to the processes. Each process maps the file for
+    itself, so nothing but the offsets and the results is sent between
+    them. The results are yielded in the order of the ranges, for the caller
+    to merge. With ``n_jobs=1``, the bytes are scanned in one piece in the
+    calling process.
+    """
+    if end is None:
+        end = os.path.getsize(path)
+    n = 1
+    if n_jobs > 1:
+        n = min(n_jobs * _RANGES_PER_JOB,
+                max(1, (end - start) // _MIN_RANGE_SIZE))
+    ranges = record_ranges(path, n, start, end)
+    yield from imap(_scan_range, ranges, min(n_jobs, len(ranges)),
+                    {'path': path, 'function': function})
+
+
+def _scan_range(file_range):
+    return worker_state['function'](worker_state['path'], *file_range)
@@ -0,0 +1,145 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import collections.abc
+
+import numpy as np
+from skbio import DNA
+
+from ._alignment import encode, _ALPHABET, _ENCODING
+
+# The bit offsets of the four 2-bit codes packed into each byte.
+_SHIFTS = np.arange(0, 8, 2, dtype=np.uint8)
+
+
+class EncodedSequence:
+    """A DNA sequence held as a compact array of codes.
+
+    A sequence of only A, C, G and T is packed four bases to the byte, as
+    the 2-bit codes the alignment engine works on; one with degenerate
+    bases, or anything else, in it is kept as one byte per character.
+    Either way, this takes far less memory than ``skbio.DNA``, and the codes
+    are ready for the engine without going through Python strings. Packed
+    sequences read back in upper case.
+    """
+
+    __slots__ = ('id', 'description', '_data', '_length', '_packed')
+
+    def __init__(self, sequence, id=None, description=''):
+        if isinstance(sequence, str):
+            sequence = sequence.encode('ascii')
+        raw = np.frombuffer(sequence, dtype=np.uint8)
+        codes = _ENCODING[raw]
+        self.id = id
+        self.description = description
+        self._length = len(raw)
+        self._packed = bool((codes < len(_ALPHABET)).all())
+        # as bytes, which cost much less than an array to hold
+        self._data = _pack(codes).tobytes() if self._packed else bytes(raw)
+
+    @property
+    def codes(self):
+        """The uint8 code array of the sequence, as ``encode`` gives it
+        with degenerate bases allowed."""
+        if not self._packed:
+            # raises, naming the characters that aren't IUPAC bases
+            return encode(str(self), degenerate=True)
+        return _unpack(self._data, self._length)
+
+    def __len__(self):
+        return self._length
+
+    def __str__(self):
+        if not self._packed:
+            return self._data.decode('ascii')
+        return np.frombuffer(_ALPHABET, dtype=np.uint8)[
+            self.codes].tobytes().decode('ascii')
+
+    def __repr__(self):
+        return '<%s %r, length %d>' % (type(self).__name__, self.id,
+                                       self._length)
+
+    def to_dna(self):
+        """Return the sequence as ``skbio.DNA``, with its id and
+        description as metadata."""
+        metadata = None
+        if self.id is not None:
+            metadata = {'id': self.id, 'description': self.description}
+        return DNA(str(self), metadata=metadata)
+
+
+class EncodedDNAIterator(collections.abc.Iterable):
+    """A view of many DNA sequences as ``EncodedSequence`` objects, read
+    one at a time."""
+
+    def __init__(self, generator):
+        self.generator = generator
+
+    def __iter__(self):
+        yield from self.generator
+
+
+class DNAFASTAFile:
+    """A view of a FASTA file of DNA sequences as its path, for actions
+    that scan the whole file without reading its records into objects."""
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def __repr__(self):
+        return '<%s %r>' % (type(self).__name__, self.path)
+
+
+class PairwiseAlignmentIterator(collections.abc.Iterable):
+    """A view of pairwise alignments of a query against many targets as
+    (target id, ``TabularMSA``) pairs, rebuilt one at a time; the alignment
+    is None for targets that weren't aligned."""
+
+    def __init__(self, generator):
+        self.generator = generator
+
+    def __iter__(self):
+        yield from self.generator
+
+
+def _pack(codes):
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    return np.bitwise_or.reduce(padded.reshape(-1, 4) << _SHIFTS, axis=1)
+
+
+def _unpack(packed, length):
+    packed = np.frombuffer(packed, dtype=np.uint8)
+    return ((packed[:, None] >> _SHIFTS) & 3).reshape(-1)[:length]
+
+
+def read_fasta(fh):
+    """Yield an ``EncodedSequence`` for each record of a FASTA file.
+
+    As with scikit-bio, the id of a record is the first word of its header
+    line, and the description the rest of it. Sequences may be split over
+    any number of lines.
+    """
+    header = None
+    lines = []
+    for line in fh:
+        line = line.strip()
+        if line.startswith('>'):
+            if header is not None:
+                yield _record(header, lines)
+            header = line[1:]
+            lines = []
+        elif line:
+            lines.append(line)
+    if header is not None:
+        yield _record(header, lines)
+
+
+def _record(header, lines):
+    id_, description = (header.split(None, 1) + ['', ''])[:2]
+    return EncodedSequence(''.join(lines), id=id_, description=description)
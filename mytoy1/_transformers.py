@@ -1,6 +1,15 @@
+import pandas as pd
+import qiime2
 from skbio import DNA
+from q2_types.feature_data import DNAFASTAFormat, DNASequencesDirectoryFormat
 
-from mytoy1 import SingleRecordDNAFASTAFormat, MySequenceCountFormat
+from mytoy1 import (SingleRecordDNAFASTAFormat, MySequenceCountFormat,
+                    PairwiseAlignmentsFormat, CIGARAlignmentsDirectoryFormat,
+                    SequenceStatsDirectoryFormat,
+                    EncodedSequence, EncodedDNAIterator, DNAFASTAFile,
+                    PairwiseAlignmentIterator)
+from ._alignment import from_cigar, to_msa
+from ._sequences import read_fasta
 
 from .plugin_setup import plugin
 
@@ -17,4 +26,82 @@ def _2(myint: int) -> MySequenceCountFormat:
     ff = MySequenceCountFormat()
     with ff.open() as fh:
         fh.write(f"Sequences contained: {myint}\n")
-    return ff
\ No newline at end of file
+    return ff
+
+
+@plugin.register_transformer
+def _3(ff: PairwiseAlignmentsFormat) -> pd.DataFrame:
+    # the aligned sequences are read as strings, whatever they look like
+    return pd.read_csv(str(ff), sep='\t', index_col='id',
+                       dtype={'id': str, 'aligned_query': str,
+                              'aligned_target': str})
+
+
+@plugin.register_transformer
+def _4(ff: PairwiseAlignmentsFormat) -> qiime2.Metadata:
+    return qiime2.Metadata(_3(ff))
+
+
+@plugin.register_transformer
+def _5(ff: SingleRecordDNAFASTAFormat) -> EncodedSequence:
+    with ff.open() as fh:
+        return next(read_fasta(fh))
+
+
+@plugin.register_transformer
+def _6(ff: DNAFASTAFormat) -> EncodedDNAIterator:
+    # the file is only read as the sequences are iterated over
+    def _read():
+        with ff.open() as fh:
+            yield from read_fasta(fh)
+    return EncodedDNAIterator(_read())
+
+
+@plugin.register_transformer
+def _7(ff: CIGARAlignmentsDirectoryFormat) -> pd.DataFrame:
+    return pd.read_csv(ff.path / 'alignments.tsv', sep='\t', index_col='id',
+                       dtype={'id': str, 'cigar': str})
+
+
+@plugin.register_transformer
+def _8(ff: CIGARAlignmentsDirectoryFormat) -> qiime2.Metadata:
+    return qiime2.Metadata(_7(ff))
+
+
+@plugin.register_transformer
+def _9(ff: CIGARAlignmentsDirectoryFormat) -> PairwiseAlignmentIterator:
+    # the alignments are rebuilt from the CIGAR strings as they are iterated
+    # over, reading the targets alongside them
+    def _read():
+        with open(ff.path / 'query.fasta') as fh:
+            query = next(read_fasta(fh)).to_dna()
+        with open(ff.path / 'alignments.tsv') as alignments, \
+                open(ff.path / 'targets.fasta') as targets:
+            next(alignments)
+            for line, target in zip(alignments, read_fasta(targets)):
+                fields = line.rstrip('\n').split('\t')
+                if not any(fields[1:]):
+                    yield fields[0], None
+                    continue
+                idx1, idx2 = from_cigar(fields[8], int(fields[4]) - 1,
+                                        int(fields[6]) - 1)
+                yield fields[0], to_msa(query, target.to_dna(), idx1, idx2)
+    return PairwiseAlignmentIterator(_read())
+
+
+@plugin.register_transformer
+def _10(ff: DNASequencesDirectoryFormat) -> DNAFASTAFile:
+    # nothing is read here, or turned into sequence objects at all
+    return DNAFASTAFile(ff.path / 'dna-sequences.fasta')
+
+
+@plugin.register_transformer
+def _11(ff: SequenceStatsDirectoryFormat) -> pd.DataFrame:
+    # the statistics, indexed by their names
+    return pd.read_csv(ff.path / 'stats.tsv', sep='\t', index_col='id',
+                       dtype={'id': str, 'value': float})
+
+
+@plugin.register_transformer
+def _12(ff: SequenceStatsDirectoryFormat) -> qiime2.Metadata:
+    return qiime2.Metadata(_11(ff))
@@ -6,15 +6,29 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import itertools
+import re
+
 from skbio import DNA
 from skbio.io import UnrecognizedFormatError
 
 from qiime2.plugin import SemanticType, TextFileFormat, ValidationError, model
+from q2_types.feature_data import DNAFASTAFormat
 
 SingleDNASequence = SemanticType("SingleDNASequence")
 
 TotalSeqCount = SemanticType("TotalSeqCount")
 
+PairwiseAlignments = SemanticType("PairwiseAlignments")
+
+CIGARAlignments = SemanticType("CIGARAlignments")
+
+SequenceStats = SemanticType("SequenceStats")
+
+# The number of records the tabular formats check at each validation level;
+# all of them at 'max'.
+_VALIDATION_LEVEL_TO_N_RECORDS = {'min': 10, 'max': None}
+
 
 class SingleRecordDNAFASTAFormat(TextFileFormat):
 
@@ -91,3 +105,243 @@ SingleRecordSeqCountDirectoryFormat = model.SingleFileDirectoryFormat(
     'SingleRecordSeqCountDirectoryFormat', 'seqcount.txt',
     MySequenceCountFormat)
 
+
+class PairwiseAlignmentsFormat(TextFileFormat):
+    """One pairwise alignment of a query against a target per line.
+
+    A tab-separated file with a header line, giving the target id, the
+    alignment score, the percent identity, the length of the alignment and
+    the aligned (gapped) query and target sequences. Targets that weren't
+    aligned have all but their id left empty.
+    """
+    HEADER = ['id', 'score', 'percent_identity', 'aligned_length',
+              'aligned_query', 'aligned_target']
+
+    def _validate_(self, level):
+        n_records = _VALIDATION_LEVEL_TO_N_RECORDS[level]
+        with self.open() as fh:
+            header = fh.readline().rstrip('\n').split('\t')
+            if header != self.HEADER:
+                raise ValidationError(
+                    "Expected header %r, got: %r"
+                    % ('\t'.join(self.HEADER), '\t'.join(header)))
+            for line_number, line in enumerate(
+                    itertools.islice(fh, n_records), start=2):
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) != len(self.HEADER):
+                    raise ValidationError(
+                        "Expected %d fields on line %d, found %d."
+                        % (len(self.HEADER), line_number, len(fields)))
+                if not any(fields[1:]):
+                    continue
+                try:
+                    float(fields[1])
+                    float(fields[2])
+                    aligned_length = int(fields[3])
+                except ValueError:
+                    raise ValidationError(
+                        "Could not parse the score, percent identity and "
+                        "aligned length on line %d." % line_number)
+                if not (len(fields[4]) == len(fields[5]) == aligned_length):
+                    raise ValidationError(
+                        "The aligned sequences on line %d are not %d "
+                        "positions long." % (line_number, aligned_length))
+
+
+PairwiseAlignmentsDirectoryFormat = model.SingleFileDirectoryFormat(
+    'PairwiseAlignmentsDirectoryFormat', 'alignments.tsv',
+    PairwiseAlignmentsFormat)
+
+
+class CIGARAlignmentsFormat(TextFileFormat):
+    """One pairwise alignment of a query against a target per line, as a
+    CIGAR string.
+
+    A tab-separated file with a header line, giving the target id, the
+    alignment score, the percent identity, the length of the alignment, the
+    first and last positions of the query and the target in it (1-based and
+    inclusive), and its CIGAR string, with M for aligned positions, I for
+    query positions against gaps and D for target positions against gaps.
+    Targets that weren't aligned have all but their id left empty.
+    """
+    HEADER = ['id', 'score', 'percent_identity', 'aligned_length',
+              'query_start', 'query_end', 'target_start', 'target_end',
+              'cigar']
+
+    _CIGAR = re.compile(r'(?:\d+[MID])*')
+    _OPERATION = re.compile(r'(\d+)([MID])')
+
+    def _validate_(self, level):
+        n_records = _VALIDATION_LEVEL_TO_N_RECORDS[level]
+        with self.open() as fh:
+            header = fh.readline().rstrip('\n').split('\t')
+            if header != self.HEADER:
+                raise ValidationError(
+                    "Expected header %r, got: %r"
+                    % ('\t'.join(self.HEADER), '\t'.join(header)))
+            for line_number, line in enumerate(
+                    itertools.islice(fh, n_records), start=2):
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) != len(self.HEADER):
+                    raise ValidationError(
+                        "Expected %d fields on line %d, found %d."
+                        % (len(self.HEADER), line_number, len(fields)))
+                if not any(fields[1:]):
+                    continue
+                try:
+                    float(fields[1])
+                    float(fields[2])
+                    aligned_length, query_start, query_end, target_start, \
+                        target_end = map(int, fields[3:8])
+                except ValueError:
+                    raise ValidationError(
+                        "Could not parse the score, percent identity, "
+                        "aligned length and positions on line %d."
+                        % line_number)
+                if not self._CIGAR.fullmatch(fields[8]):
+                    raise ValidationError(
+                        "Could not parse the CIGAR string on line %d: %r"
+                        % (line_number, fields[8]))
+                lengths = {'M': 0, 'I': 0, 'D': 0}
+                for length, operation in self._OPERATION.findall(fields[8]):
+                    lengths[operation] += int(length)
+                if sum(lengths.values()) != aligned_length:
+                    raise ValidationError(
+                        "The CIGAR string on line %d is not %d positions "
+                        "long." % (line_number, aligned_length))
+                if query_end - query_start + 1 != \
+                        lengths['M'] + lengths['I'] or \
+                        target_end - target_start + 1 != \
+                        lengths['M'] + lengths['D'] or \
+                        min(query_start, target_start) < 1:
+                    raise ValidationError(
+                        "The positions on line %d don't match the CIGAR "
+                        "string." % line_number)
+
+
+class CIGARAlignmentsDirectoryFormat(model.DirectoryFormat):
+    """Pairwise alignments of a query against many targets as CIGAR strings,
+    with the query and the targets stored once each, the targets in the
+    order of the alignments, so that the alignments can be rebuilt."""
+    alignments = model.File('alignments.tsv', format=CIGARAlignmentsFormat)
+    query = model.File('query.fasta', format=SingleRecordDNAFASTAFormat)
+    targets = model.File('targets.fasta', format=DNAFASTAFormat)
+
+    def _validate_(self, level):
+        n_records = _VALIDATION_LEVEL_TO_N_RECORDS[level]
+        with open(self.path / 'alignments.tsv') as alignments, \
+                open(self.path / 'targets.fasta') as targets:
+            next(alignments)
+            ids = (line.split('\t', 1)[0].rstrip('\n')
+                   for line in alignments)
+            target_ids = ((line[1:].split() or [''])[0] for line in targets
+                          if line.startswith('>'))
+            for record_number, (id_, target_id) in enumerate(
+                    itertools.islice(itertools.zip_longest(ids, target_ids),
+                                     n_records), start=1):
+                if id_ != target_id:
+                    raise ValidationError(
+                        "Alignment %d is of %r, but target %d is %r."
+                        % (record_number, id_, record_number, target_id))
+
+
+class SequenceStatsFormat(TextFileFormat):
+    """Summary statistics of a set of sequences, one per line.
+
+    A tab-separated file with a header line, giving the name of each of the
+    statistics in ``STATISTICS``, in that order, and its value. The lengths
+    and the GC fraction are left empty where they are undefined, for a set
+    without any sequences or bases.
+    """
+    HEADER = ['id', 'value']
+    STATISTICS = ['count', 'total_length', 'min_length', 'max_length',
+                  'mean_length', 'n50', 'gc_fraction', 'non_acgt_count']
+    # the statistics that are always there, as integers
+    COUNTS = ['count', 'total_length', 'non_acgt_count']
+
+    def _validate_(self, level):
+        with self.open() as fh:
+            header = fh.readline().rstrip('\n').split('\t')
+            if header != self.HEADER:
+                raise ValidationError(
+                    "Expected header %r, got: %r"
+                    % ('\t'.join(self.HEADER), '\t'.join(header)))
+            lines = [line.rstrip('\n').split('\t') for line in fh]
+        names = [fields[0] for fields in lines]
+        if names != self.STATISTICS:
+            raise ValidationError(
+                "Expected the statistics %s, in that order, got: %s"
+                % (', '.join(self.STATISTICS), ', '.join(names)))
+        for line_number, fields in enumerate(lines, start=2):
+            if len(fields) != len(self.HEADER):
+                raise ValidationError(
+                    "Expected %d fields on line %d, found %d."
+                    % (len(self.HEADER), line_number, len(fields)))
+            name, value = fields
+            if not value and name not in self.COUNTS:
+                continue
+            try:
+                int(value) if name in self.COUNTS else float(value)
+            except ValueError:
+                raise ValidationError(
+                    "Could not parse the %s on line %d: %r"
+                    % (name, line_number, value))
+
+
+class SequenceLengthsFormat(TextFileFormat):
+    """The number of sequences of each length in a set of sequences.
+
+    A tab-separated file with a header line, giving each length found in
+    the set, in increasing order, and the number of sequences of that
+    length.
+    """
+    HEADER = ['length', 'count']
+
+    def _validate_(self, level):
+        n_records = _VALIDATION_LEVEL_TO_N_RECORDS[level]
+        with self.open() as fh:
+            header = fh.readline().rstrip('\n').split('\t')
+            if header != self.HEADER:
+                raise ValidationError(
+                    "Expected header %r, got: %r"
+                    % ('\t'.join(self.HEADER), '\t'.join(header)))
+            previous = -1
+            for line_number, line in enumerate(
+                    itertools.islice(fh, n_records), start=2):
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) != len(self.HEADER):
+                    raise ValidationError(
+                        "Expected %d fields on line %d, found %d."
+                        % (len(self.HEADER), line_number, len(fields)))
+                try:
+                    length, count = map(int, fields)
+                except ValueError:
+                    raise ValidationError(
+                        "Could not parse the length and count on line %d."
+                        % line_number)
+                if length <= previous or count < 1:
+                    raise ValidationError(
+                        "The lengths must increase from line to line, with "
+                        "a count of at least 1 each, but line %d has a "
+                        "length of %d and a count of %d."
+                        % (line_number, length, count))
+                previous = length
+
+
+class SequenceStatsDirectoryFormat(model.DirectoryFormat):
+    """Summary statistics of a set of sequences, with the number of
+    sequences of each length, which must add up to their count."""
+    stats = model.File('stats.tsv', format=SequenceStatsFormat)
+    lengths = model.File('length-histogram.tsv', format=SequenceLengthsFormat)
+
+    def _validate_(self, level):
+        with open(self.path / 'stats.tsv') as fh:
+            count = int(next(line for line in fh
+                             if line.startswith('count\t')).split('\t')[1])
+        with open(self.path / 'length-histogram.tsv') as fh:
+            next(fh)
+            histogram_count = sum(int(line.split('\t')[1]) for line in fh)
+        if histogram_count != count:
+            raise ValidationError(
+                "The length histogram has %d sequences, but the count is %d."
+                % (histogram_count, count))
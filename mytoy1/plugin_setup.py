@@ -6,17 +6,28 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 import importlib
-from qiime2.plugin import Citations, Plugin, Float, Range
+from qiime2.plugin import (Bool, Choices, Citations, Plugin, Float, Int,
+                           List, Metadata, Range, Str)
 from q2_types.feature_table import FeatureTable, Frequency
 from mytoy1 import __version__
-from mytoy1._methods import nw_align, duplicate_table, seqcount
+from mytoy1._methods import (nw_align, nw_score, nw_sweep, nw_align_many,
+                             nw_align_many_cigar, nw_distance_matrix,
+                             edit_distance, duplicate_table, seqcount,
+                             seqstats)
+from q2_types.distance_matrix import DistanceMatrix
 from q2_types.feature_data import FeatureData, AlignedSequence, Sequence
+from q2_types.metadata import ImmutableMetadata
 
 from mytoy1 import (
     SingleDNASequence, SingleRecordDNAFASTAFormat,
     SingleRecordDNAFASTADirectoryFormat,
     TotalSeqCount, MySequenceCountFormat,
-    SingleRecordSeqCountDirectoryFormat
+    SingleRecordSeqCountDirectoryFormat,
+    PairwiseAlignments, PairwiseAlignmentsFormat,
+    PairwiseAlignmentsDirectoryFormat,
+    CIGARAlignments, CIGARAlignmentsFormat, CIGARAlignmentsDirectoryFormat,
+    SequenceStats, SequenceStatsFormat, SequenceLengthsFormat,
+    SequenceStatsDirectoryFormat
 )
 
 citations = Citations.load("citations.bib", package="mytoy1")
@@ -48,46 +59,361 @@ plugin.methods.register_function(
     citations=[]
 )
 
+# The scoring parameters are shared by all of the alignment actions.
+nw_parameters = {
+    'gap_open_penalty': Float % Range(0, None, inclusive_start=False),
+    'gap_extend_penalty': Float % Range(0, None, inclusive_start=False),
+    'match_score': Float % Range(0, None, inclusive_start=False),
+    'mismatch_score': Float % Range(None, 0, inclusive_end=True),
+    'band_width': Int % Range(1, None),
+    'x_drop': Float % Range(0, None, inclusive_start=False),
+    'substitution_matrix': Metadata}
+
+nw_parameter_descriptions = {
+    'gap_open_penalty': ('The penalty incurred for opening a new gap. By '
+                         'convention this is a positive number.'),
+    'gap_extend_penalty': ('The penalty incurred for extending an existing '
+                           'gap. By convention this is a positive number.'),
+    'match_score': ('The score for matching characters at an alignment '
+                    'position. By convention, this is a positive number.'),
+    'mismatch_score': ('The score for mismatching characters at an '
+                       'alignment position. By convention, this is a '
+                       'negative number.'),
+    'band_width': ('Only fill the cells of the dynamic programming '
+                   'matrix that are within this many cells of the '
+                   'diagonals through its corners. If the scores on the '
+                   'edge of the band show that a better alignment could '
+                   'leave it, the band is widened and the alignment '
+                   'recomputed, so the result is the same as without a '
+                   'band. This saves time and memory for near-identical '
+                   'sequences. By default, the full matrix is filled.'),
+    'x_drop': ('If given, cells of the dynamic programming matrix scoring '
+               'more than this below the best score found so far are '
+               'dropped, and filling stops once a whole anti-diagonal has '
+               'been. An alignment that falls this far behind and never '
+               'recovers is abandoned, and cut short after its best '
+               'scoring position. This saves time on sequences that are '
+               'unrelated or only partly related, but may change the '
+               'alignment of others slightly; it should be well above the '
+               'scores reached by chance. Unrelated sequences are abandoned '
+               'soonest in global mode, where leading gaps are penalized.'),
+    'substitution_matrix': ('A table of substitution scores, with a row '
+                            'and a column for each of A, C, G and T and any '
+                            'of the IUPAC degenerate bases. If given, it is '
+                            'used instead of match-score and '
+                            'mismatch-score. Degenerate bases that are not '
+                            'in it, or in sequences aligned without it, '
+                            'score the average of the scores of the bases '
+                            'they stand for.')}
+
+# Actions that build alignments, rather than only scoring them, can also
+# limit the memory used by the traceback, and cache the alignments.
+nw_align_parameters = {
+    **nw_parameters,
+    'memory_limit': Int % Range(1, None),
+    'cache_dir': Str,
+    'cache_size': Int % Range(1, None)}
+
+nw_align_parameter_descriptions = {
+    **nw_parameter_descriptions,
+    'memory_limit': ('The memory, in MB, available for the traceback '
+                     'matrix, which takes two bits per filled cell. For '
+                     'longer sequences, only a few checkpoints of the '
+                     'matrix are kept and the parts needed for the '
+                     'traceback are recomputed from them. This gives the '
+                     'same alignment with far less memory, but takes '
+                     'about twice as long.'),
+    'cache_dir': ('If given, alignments are looked up in, and added to, a '
+                  'cache in this directory, keyed by the two sequences and '
+                  'the four scoring parameters. The cache can be shared by '
+                  'any number of runs, including concurrent ones.'),
+    'cache_size': ('The size, in MB, the cache in cache-dir may grow to. '
+                   'Beyond that, the least recently used alignments are '
+                   'evicted.')}
+
+# Actions aligning many pairs can skip those that share too few k-mers.
+kmer_screen_parameters = {
+    'min_kmer_similarity': Float % Range(0, 1, inclusive_end=True),
+    'kmer_size': Int % Range(1, 16)}
+
+kmer_screen_parameter_descriptions = {
+    'min_kmer_similarity': ('If given, pairs of sequences whose k-mer '
+                            'similarity (the number of distinct k-mers they '
+                            'share over the number found in either) is below '
+                            'this are screened out, and are not aligned. The '
+                            'number of pairs screened out is reported.'),
+    'kmer_size': 'The length of the k-mers compared by min-kmer-similarity.'}
+
+# Actions aligning one sequence against many share everything but the
+# format of their output.
+nw_align_many_parameters = {
+    **nw_align_parameters,
+    **kmer_screen_parameters,
+    'n_jobs': Int % Range(1, None),
+    'max_edit_distance': Int % Range(0, None)}
+
+nw_align_many_input_descriptions = {
+    'query': 'The sequence to align.',
+    'references': 'The sequences to align the query against.'}
+
+nw_align_many_parameter_descriptions = {
+    **nw_align_parameter_descriptions,
+    **kmer_screen_parameter_descriptions,
+    'n_jobs': 'The number of processes to align with.',
+    'max_edit_distance': ('If given, reference sequences more than this many '
+                          'substitutions, insertions and deletions away from '
+                          'the query are screened out with a fast edit '
+                          'distance computation, and are not aligned.')}
+
 plugin.methods.register_function(
     function=nw_align,
     inputs={'seq1': SingleDNASequence,
             'seq2': SingleDNASequence},
     parameters={
-        'gap_open_penalty': Float % Range(0, None, inclusive_start=False),
-        'gap_extend_penalty': Float % Range(0, None, inclusive_start=False),
-        'match_score': Float % Range(0, None, inclusive_start=False),
-        'mismatch_score': Float % Range(None, 0, inclusive_end=True)},
+        **nw_align_parameters,
+        'mode': Str % Choices('global', 'semi-global', 'local'),
+        'strand': Str % Choices('forward', 'both'),
+        'anchored': Bool,
+        'n_jobs': Int % Range(1, None)},
     outputs={'aligned_sequences': FeatureData[AlignedSequence]},
     input_descriptions={'seq1': 'The first sequence to align.',
                         'seq2': 'The second sequence to align.'},
     parameter_descriptions={
-        'gap_open_penalty': ('The penalty incurred for opening a new gap. By '
-                             'convention this is a positive number.'),
-        'gap_extend_penalty': ('The penalty incurred for extending an existing '
-                               'gap. By convention this is a positive number.'),
-        'match_score': ('The score for matching characters at an alignment '
-                        'position. By convention, this is a positive number.'),
-        'mismatch_score': ('The score for mismatching characters at an '
-                           'alignment position. By convention, this is a '
-                           'negative number.')},
+        **nw_align_parameter_descriptions,
+        'mode': ('How the ends of the sequences are aligned. In semi-global '
+                 'mode, terminal gaps are not penalized, so that either '
+                 'sequence can overhang the other for free, e.g. a '
+                 'reference around an amplicon. In global mode, they are '
+                 'penalized like any other gap. In local mode, only the '
+                 'best aligning parts of the two sequences are aligned, '
+                 'with Smith-Waterman, and the rest of them is left out. '
+                 'Neither x-drop nor band-width can be used in local '
+                 'mode.'),
+        'strand': ('With both, seq1 is aligned against seq2 and its '
+                   'reverse complement, in a single pass over the dynamic '
+                   'programming matrices where possible, and the better '
+                   'of the two alignments is kept. If that is the reverse '
+                   'complement, it is noted in the description of seq2 '
+                   'and reported.'),
+        'anchored': ('Align through anchors, for long sequences such as '
+                     'whole genomes: exact matches of 15 bases found in '
+                     'both sequences, once each, are chained in the order '
+                     'they have in both and kept as they are, and only the '
+                     'parts of the sequences between them are aligned. '
+                     'This can align sequences of millions of bases, but '
+                     "can't follow rearrangements, and can't be used in "
+                     'local mode or with x-drop.'),
+        'n_jobs': ('The number of processes aligning the parts of the '
+                   'sequences between anchors, with anchored.')},
     output_descriptions={
         'aligned_sequences': 'The pairwise aligned sequences.'
     },
     name='Pairwise global sequence alignment.',
-    description=("Align two DNA sequences using Needleman-Wunsch (NW). "
-                 "This is a Python implementation of NW, so it is very slow! "
-                 "This action is for demonstration purposes only. 🐌"),
+    description=("Align two DNA sequences using Needleman-Wunsch (NW) with "
+                 "affine gap penalties, or Smith-Waterman in local mode. By "
+                 "default, terminal gaps are not penalized. The dynamic "
+                 "programming matrix is filled one anti-diagonal at a time "
+                 "with vectorized NumPy operations, whatever the mode. "
+                 "Unless band-width or anchored is given, the strategy is "
+                 "chosen from the lengths of the sequences, their identity "
+                 "as estimated from the k-mers they share, and "
+                 "memory-limit: the full matrix, a band around its "
+                 "diagonal, or a traceback recomputed from checkpoints, all "
+                 "of which give the same alignment, or, for sequences too "
+                 "long for any of these that are at least 90% identical, "
+                 "anchors. The strategy, and the number of cells it was "
+                 "estimated to fill and did fill, are reported."),
+    citations=[citations['Needleman1970'], citations['Smith1981']]
+)
+
+plugin.methods.register_function(
+    function=nw_score,
+    inputs={'seq1': SingleDNASequence,
+            'seq2': SingleDNASequence},
+    parameters=nw_parameters,
+    outputs={'alignment_score': ImmutableMetadata},
+    input_descriptions={'seq1': 'The first sequence to align.',
+                        'seq2': 'The second sequence to align.'},
+    parameter_descriptions=nw_parameter_descriptions,
+    output_descriptions={
+        'alignment_score': ('The score, the percent identity and the length '
+                            'of the alignment, including gaps, indexed by '
+                            'the id of the second sequence.')
+    },
+    name='Pairwise global alignment score.',
+    description=("Score the alignment of two DNA sequences, as nw-align "
+                 "would align them, without building the alignment itself. "
+                 "Only a few diagonals of the dynamic programming matrix are "
+                 "kept in memory at any time."),
+    citations=[citations['Needleman1970']]
+)
+
+plugin.methods.register_function(
+    function=nw_sweep,
+    inputs={'seq1': SingleDNASequence,
+            'seq2': SingleDNASequence},
+    parameters={
+        'gap_open_penalties': List[nw_parameters['gap_open_penalty']],
+        'gap_extend_penalties': List[nw_parameters['gap_extend_penalty']],
+        'match_scores': List[nw_parameters['match_score']],
+        'mismatch_scores': List[nw_parameters['mismatch_score']]},
+    outputs={'alignment_scores': ImmutableMetadata},
+    input_descriptions={'seq1': 'The first sequence to align.',
+                        'seq2': 'The second sequence to align.'},
+    parameter_descriptions={
+        'gap_open_penalties': ('The gap open penalties to try. By default, '
+                               'only that of nw-align.'),
+        'gap_extend_penalties': ('The gap extend penalties to try. By '
+                                 'default, only that of nw-align.'),
+        'match_scores': ('The match scores to try. By default, only that '
+                         'of nw-align.'),
+        'mismatch_scores': ('The mismatch scores to try. By default, only '
+                            'that of nw-align.')},
+    output_descriptions={
+        'alignment_scores': ('The four scoring parameters of each '
+                             'combination, with the score, the percent '
+                             'identity and the length of the alignment, '
+                             'including gaps, that nw-score gives for '
+                             'them, one row per combination.')
+    },
+    name='Pairwise global alignment scores over a grid of parameters.',
+    description=("Score the alignment of two DNA sequences, as nw-score "
+                 "would, with every combination of the given gap open "
+                 "penalties, gap extend penalties, match scores and "
+                 "mismatch scores. The sequences are encoded once, and the "
+                 "dynamic programming matrices of all the combinations are "
+                 "filled together, one anti-diagonal at a time, so that "
+                 "trying many combinations costs little more than trying "
+                 "one. Terminal gaps are not penalized, as by default in "
+                 "nw-align."),
+    citations=[citations['Needleman1970']]
+)
+
+plugin.methods.register_function(
+    function=nw_align_many,
+    inputs={'query': SingleDNASequence,
+            'references': FeatureData[Sequence]},
+    parameters=nw_align_many_parameters,
+    outputs={'alignments': PairwiseAlignments},
+    input_descriptions=nw_align_many_input_descriptions,
+    parameter_descriptions=nw_align_many_parameter_descriptions,
+    output_descriptions={
+        'alignments': ('The score, percent identity, length and aligned '
+                       'sequences of the alignment of the query against each '
+                       'of the reference sequences. These are left empty for '
+                       'reference sequences that were not aligned, or whose '
+                       'alignment was abandoned by x-drop.')
+    },
+    name='Pairwise global alignment against many sequences.',
+    description=("Align one DNA sequence against each of a set of DNA "
+                 "sequences, as nw-align would align them. The reference "
+                 "sequences are read and aligned in chunks spread over a "
+                 "pool of processes, and the alignments are written out as "
+                 "they are completed."),
     citations=[citations['Needleman1970']]
 )
 
+plugin.methods.register_function(
+    function=nw_align_many_cigar,
+    inputs={'query': SingleDNASequence,
+            'references': FeatureData[Sequence]},
+    parameters=nw_align_many_parameters,
+    outputs={'alignments': CIGARAlignments},
+    input_descriptions=nw_align_many_input_descriptions,
+    parameter_descriptions=nw_align_many_parameter_descriptions,
+    output_descriptions={
+        'alignments': ('The score, percent identity, length, positions and '
+                       'CIGAR string of the alignment of the query against '
+                       'each of the reference sequences, with the query and '
+                       'the reference sequences. These are left empty for '
+                       'reference sequences that were not aligned, or whose '
+                       'alignment was abandoned by x-drop.')
+    },
+    name='Pairwise global alignment against many sequences, as CIGAR '
+         'strings.',
+    description=("Align one DNA sequence against each of a set of DNA "
+                 "sequences, as nw-align-many would align them, but store "
+                 "each alignment as a CIGAR string rather than as two "
+                 "aligned sequences. The query and the reference sequences "
+                 "are stored once each, alongside the alignments, so that "
+                 "these can be rebuilt, which makes the output a fraction "
+                 "of the size for many or long sequences."),
+    citations=[citations['Needleman1970']]
+)
+
+plugin.methods.register_function(
+    function=nw_distance_matrix,
+    inputs={'sequences': FeatureData[Sequence]},
+    parameters={
+        **nw_parameters,
+        **kmer_screen_parameters,
+        'n_jobs': Int % Range(1, None)},
+    outputs={'distance_matrix': DistanceMatrix},
+    input_descriptions={'sequences': 'The sequences to align.'},
+    parameter_descriptions={
+        **nw_parameter_descriptions,
+        **kmer_screen_parameter_descriptions,
+        'n_jobs': 'The number of processes to align with.'},
+    output_descriptions={
+        'distance_matrix': ('The fraction of the positions of the alignment '
+                            'of each pair of sequences, including gaps, that '
+                            'are not matches, or 1 for pairs that were not '
+                            'aligned, or whose alignment was abandoned by '
+                            'x-drop.')
+    },
+    name='Pairwise global alignment distances.',
+    description=("Align each pair of DNA sequences, as nw-align would align "
+                 "them, and compute the distance between them from the "
+                 "identity of the alignment. Each pair is aligned once, and "
+                 "the pairs are spread over a pool of processes in square "
+                 "tiles of the distance matrix."),
+    citations=[citations['Needleman1970']]
+)
+
+plugin.methods.register_function(
+    function=edit_distance,
+    inputs={'query': SingleDNASequence,
+            'references': FeatureData[Sequence]},
+    parameters={'n_jobs': Int % Range(1, None)},
+    outputs={'edit_distances': ImmutableMetadata},
+    input_descriptions={'query': 'The sequence to compare.',
+                        'references': ('The sequences to compare the query '
+                                       'against.')},
+    parameter_descriptions={
+        'n_jobs': 'The number of processes to compute distances with.'},
+    output_descriptions={
+        'edit_distances': ('The edit distance of the query to each of the '
+                           'reference sequences.')
+    },
+    name='Edit distances against many sequences.',
+    description=("Compute the edit distance (the number of substitutions, "
+                 "insertions and deletions needed to turn one sequence into "
+                 "the other) of one DNA sequence to each of a set of DNA "
+                 "sequences. This is minus the score of their global "
+                 "alignment with unit costs and end gaps penalized, and is "
+                 "computed with a bit-parallel algorithm without building "
+                 "an alignment matrix, which makes it much faster than "
+                 "aligning."),
+    citations=[citations['Myers1999']]
+)
+
 # Register semantic types
-plugin.register_semantic_types(SingleDNASequence,TotalSeqCount)
+plugin.register_semantic_types(SingleDNASequence,TotalSeqCount,
+                               PairwiseAlignments, CIGARAlignments,
+                               SequenceStats)
 
 # Register formats
 plugin.register_formats(SingleRecordDNAFASTAFormat,
                         SingleRecordDNAFASTADirectoryFormat,
                         MySequenceCountFormat,
-                        SingleRecordSeqCountDirectoryFormat
+                        SingleRecordSeqCountDirectoryFormat,
+                        PairwiseAlignmentsFormat,
+                        PairwiseAlignmentsDirectoryFormat,
+                        CIGARAlignmentsFormat,
+                        CIGARAlignmentsDirectoryFormat,
+                        SequenceStatsFormat,
+                        SequenceLengthsFormat,
+                        SequenceStatsDirectoryFormat
                         )
 
 # Define and register new ArtifactClass
@@ -99,13 +425,44 @@ plugin.register_artifact_class(TotalSeqCount,
                                SingleRecordSeqCountDirectoryFormat,
                                description="Total DNA sequence count.")
 
+plugin.register_artifact_class(PairwiseAlignments,
+                               PairwiseAlignmentsDirectoryFormat,
+                               description=("Pairwise alignments of a query "
+                                            "sequence against many target "
+                                            "sequences."))
+
+plugin.register_artifact_class(CIGARAlignments,
+                               CIGARAlignmentsDirectoryFormat,
+                               description=("Pairwise alignments of a query "
+                                            "sequence against many target "
+                                            "sequences, as CIGAR strings, "
+                                            "with the sequences."))
+
+plugin.register_artifact_class(SequenceStats,
+                               SequenceStatsDirectoryFormat,
+                               description=("Summary statistics of a set of "
+                                            "DNA sequences, with the number "
+                                            "of sequences of each length."))
+
 plugin.methods.register_function(
     function=seqcount,
     inputs={'sequences': FeatureData[Sequence]},
-    parameters={},
+    parameters={'n_jobs': Int % Range(1, None),
+                'checkpoint': Str},
     outputs={'seq_count': TotalSeqCount},
     input_descriptions={'sequences': 'File containing the sequences to be counted'},
-    parameter_descriptions={},
+    parameter_descriptions={
+        'n_jobs': ('The number of processes to count with, each scanning '
+                   'a part of the file. Files smaller than 64 MB are '
+                   'scanned in one piece.'),
+        'checkpoint': ('If given, the path of a file in which to record how '
+                       'far the count got. If the sequences are counted '
+                       'again with the same checkpoint after more have been '
+                       'appended to them, only the appended part is '
+                       'scanned. The checkpoint is checked against the '
+                       'start of the sequences and the part before where '
+                       'the count stopped, and the sequences are counted '
+                       'from the start if they have changed.')},
     #output_descriptions={
     #    'aligned_sequences': 'The pairwise aligned sequences.'
     #},
@@ -114,5 +471,28 @@ plugin.methods.register_function(
     #citations=[citations['Needleman1970']]
 )
 
-importlib.import_module('mytoy1._transformers')
+plugin.methods.register_function(
+    function=seqstats,
+    inputs={'sequences': FeatureData[Sequence]},
+    parameters={'n_jobs': Int % Range(1, None)},
+    outputs={'stats': SequenceStats},
+    input_descriptions={'sequences': 'The sequences to summarize.'},
+    parameter_descriptions={
+        'n_jobs': ('The number of processes to scan with, each scanning a '
+                   'part of the file. Files smaller than 64 MB are scanned '
+                   'in one piece.')},
+    output_descriptions={
+        'stats': ('The number of sequences, their total, smallest, largest '
+                  'and mean length, their N50, the fraction of their A, C, '
+                  'G and T bases that are G or C and the number of other '
+                  'bases, with the number of sequences of each length.')
+    },
+    name='Sequence statistics.',
+    description=("Summarize a set of DNA sequences in a single pass over "
+                 "the FASTA file, without reading the sequences into "
+                 "objects: the file is memory-mapped and the lengths and "
+                 "the bases of the sequences are counted a block at a time "
+                 "with vectorized NumPy operations.")
+)
 
+importlib.import_module('mytoy1._transformers')
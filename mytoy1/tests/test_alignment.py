@@ -0,0 +1,597 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import collections
+import warnings
+from unittest import mock
+
+import numpy as np
+import numpy.testing as npt
+
+from qiime2.plugin.testing import TestPluginBase
+from skbio import DNA
+from skbio.alignment import (global_pairwise_align_nucleotide,
+                             local_pairwise_align_nucleotide)
+
+from mytoy1._alignment import (
+    cigar, encode, from_cigar, global_align, global_align_batch,
+    global_align_strands, global_score, global_score_batch, global_score_sweep,
+    iupac_substitution_table,
+    reverse_complement, substitution_table, to_msa, XDropped, _band,
+    _batches, _fill, _score_dtype, _traceback, _FREE_END_GAPS,
+    _CheckpointedTraceback, _Diagonals, _Traceback)
+
+
+class EncodeTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_encode(self):
+        observed = encode(DNA('ACGTTGCA'))
+        npt.assert_array_equal(observed, [0, 1, 2, 3, 3, 2, 1, 0])
+        self.assertEqual(observed.dtype, np.uint8)
+
+    def test_encode_non_acgt(self):
+        with self.assertRaisesRegex(ValueError, 'N, W'):
+            encode(DNA('ACGTNWN'))
+
+
+class GlobalAlignTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def _align(self, seq1, seq2, **kwargs):
+        params = dict(gap_open_penalty=5, gap_extend_penalty=2,
+                      match_score=1, mismatch_score=-2)
+        params.update(kwargs)
+        score, idx1, idx2 = global_align(encode(seq1), encode(seq2),
+                                         **params)
+        return to_msa(seq1, seq2, idx1, idx2), score
+
+    def test_score(self):
+        _, observed = self._align(DNA('AAAAAAAAGGTGGCCTTTTTTTT'),
+                                  DNA('AAAAAAAAGGGGCCTTTTTTTT'))
+        self.assertEqual(observed, 17.0)
+
+    def test_metadata_retained(self):
+        seq1 = DNA('ACGT', metadata={'id': 'seq1'})
+        seq2 = DNA('AGT', metadata={'id': 'seq2'})
+        msa, _ = self._align(seq1, seq2)
+        self.assertEqual(msa[0].metadata, {'id': 'seq1'})
+        self.assertEqual(msa[1].metadata, {'id': 'seq2'})
+
+    def test_empty_sequence(self):
+        msa, score = self._align(DNA(''), DNA('ACG'))
+        self.assertEqual(str(msa[0]), '---')
+        self.assertEqual(str(msa[1]), 'ACG')
+        self.assertEqual(score, 0.0)
+
+    def test_matches_skbio(self):
+        # the engine reimplements the scikit-bio recurrence, so results
+        # should be identical for any input
+        rng = np.random.default_rng(42)
+        for _ in range(25):
+            seq1 = ''.join(rng.choice(list('ACGT'), rng.integers(1, 40)))
+            seq2 = list(seq1)
+            for _ in range(rng.integers(0, 8)):
+                pos = rng.integers(0, len(seq2) + 1)
+                seq2.insert(pos, rng.choice(list('ACGT')))
+            seq2 = ''.join(seq2)
+            params = dict(gap_open_penalty=rng.choice([0.5, 2, 5]),
+                          gap_extend_penalty=rng.choice([0.5, 1, 2]),
+                          match_score=rng.choice([1, 2]),
+                          mismatch_score=rng.choice([-1, -2, -3]))
+
+            observed, observed_score = self._align(DNA(seq1), DNA(seq2),
+                                                   **params)
+            expected, expected_score, _ = global_pairwise_align_nucleotide(
+                DNA(seq1), DNA(seq2), **params)
+
+            self.assertEqual(observed, expected)
+            self.assertAlmostEqual(observed_score, expected_score)
+
+
+class ModeTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def _pairs(self, seed):
+        rng = np.random.default_rng(seed)
+        for _ in range(20):
+            seq1 = ''.join(rng.choice(list('ACGT'), rng.integers(1, 30)))
+            seq2 = list(seq1)
+            for _ in range(rng.integers(0, 8)):
+                seq2.insert(rng.integers(0, len(seq2) + 1),
+                            rng.choice(list('ACGT')))
+            params = dict(gap_open_penalty=rng.choice([0.5, 2, 5]),
+                          gap_extend_penalty=rng.choice([0.5, 1, 2]),
+                          match_score=rng.choice([1, 2]),
+                          mismatch_score=rng.choice([-1, -2, -3]))
+            yield DNA(seq1), DNA(''.join(seq2)), params
+
+    def _check(self, mode, expected_f, seed, **kwargs):
+        for seq1, seq2, params in self._pairs(seed):
+            score, idx1, idx2 = global_align(encode(seq1), encode(seq2),
+                                             mode=mode, **params, **kwargs)
+            expected, expected_score, _ = expected_f(seq1, seq2, **params)
+            self.assertEqual(to_msa(seq1, seq2, idx1, idx2), expected)
+            self.assertAlmostEqual(score, expected_score)
+
+    def test_global_matches_skbio(self):
+        def expected_f(seq1, seq2, **params):
+            return global_pairwise_align_nucleotide(
+                seq1, seq2, penalize_terminal_gaps=True, **params)
+        self._check('global', expected_f, 3)
+        self._check('global', expected_f, 4, band_width=2)
+
+    def test_local_matches_skbio(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', PendingDeprecationWarning)
+            self._check('local', local_pairwise_align_nucleotide, 5)
+            self._check('local', local_pairwise_align_nucleotide, 6,
+                        memory_limit=1)
+
+    def test_empty_sequence(self):
+        codes = encode(DNA('ACG'))
+        empty = encode(DNA(''))
+        self.assertEqual(
+            global_align(empty, codes, 5, 2, 1, -2, mode='global')[0], -9.0)
+        score, idx1, idx2 = global_align(empty, codes, 5, 2, 1, -2,
+                                         mode='local')
+        self.assertEqual((score, len(idx1), len(idx2)), (0.0, 0, 0))
+        for mode in _FREE_END_GAPS:
+            score, idx1, idx2 = global_align(empty, empty, 5, 2, 1, -2,
+                                             mode=mode)
+            self.assertEqual((score, len(idx1), len(idx2)), (0.0, 0, 0))
+
+    def test_invalid(self):
+        codes = encode(DNA('ACG'))
+        with self.assertRaisesRegex(ValueError, 'one of'):
+            global_align(codes, codes, 5, 2, 1, -2, mode='glocal')
+        with self.assertRaisesRegex(ValueError, 'x_drop'):
+            global_align(codes, codes, 5, 2, 1, -2, mode='local', x_drop=5)
+        with self.assertRaisesRegex(ValueError, 'band_width'):
+            global_align(codes, codes, 5, 2, 1, -2, mode='local',
+                         band_width=2)
+
+
+class StrandTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_reverse_complement(self):
+        codes = encode('ACGTRYSWKMBDHVN', degenerate=True)
+        npt.assert_array_equal(
+            reverse_complement(codes),
+            encode('NBDHVKMWSRYACGT', degenerate=True))
+
+    def test_matches_global_align(self):
+        rng = np.random.default_rng(16)
+        codes1 = rng.integers(0, 4, 60).astype(np.uint8)
+        codes2 = reverse_complement(codes1)
+        codes2[::5] = 2
+        strands = [codes2, reverse_complement(codes2)]
+        # in one sweep, and one strand at a time
+        for kwargs in ({}, {'memory_limit': 100}, {'band_width': 10}):
+            observed = global_align_strands(codes1, strands, 5, 2, 1, -2,
+                                            **kwargs)
+            for codes, (score, idx1, idx2) in zip(strands, observed):
+                expected = global_align(codes1, codes, 5, 2, 1, -2)
+                self.assertEqual(score, expected[0])
+                npt.assert_array_equal(idx1, expected[1])
+                npt.assert_array_equal(idx2, expected[2])
+        self.assertGreater(observed[1][0], observed[0][0])
+
+    def test_batch_size(self):
+        # strands too long to batch in _BATCH_CELLS are aligned one at a
+        # time, with their packed tracebacks, whatever the memory limit
+        rng = np.random.default_rng(16)
+        codes1 = rng.integers(0, 4, 60).astype(np.uint8)
+        strands = [codes1, reverse_complement(codes1)]
+        for batch_cells, batches in ((2 ** 24, 1), (100, 0)):
+            with mock.patch('mytoy1._alignment._BATCH_CELLS', batch_cells), \
+                    mock.patch('mytoy1._alignment.global_align_batch',
+                               wraps=global_align_batch) as batch:
+                observed = global_align_strands(codes1, strands, 5, 2, 1,
+                                                -2, memory_limit=2 ** 30)
+            self.assertEqual(batch.call_count, batches)
+            self.assertEqual(observed[0][0],
+                             global_align(codes1, codes1, 5, 2, 1, -2)[0])
+
+    def test_x_drop(self):
+        # the forward strand is abandoned, which doesn't stop the reverse
+        # one from being aligned
+        query = encode(DNA('AAAAAAAAGGTGGCCTTTTTTTT'))
+        read = reverse_complement(query)
+        strands = [read, reverse_complement(read)]
+        forward, reverse = global_align_strands(query, strands, 5, 2, 1, -2,
+                                                x_drop=5)
+        self.assertIsInstance(forward, XDropped)
+        self.assertEqual(forward.result[0], 10.0)
+        expected = global_align(query, strands[1], 5, 2, 1, -2, x_drop=5)
+        self.assertEqual(reverse[0], expected[0])
+
+
+class CIGARTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_cigar(self):
+        idx1 = np.array([-1, -1, 0, 1, 2, 3, 4])
+        idx2 = np.array([0, 1, 2, -1, 3, 4, -1])
+        self.assertEqual(cigar(idx1, idx2), '2D1M1I2M1I')
+        self.assertEqual(cigar(idx1[:0], idx2[:0]), '')
+
+    def test_from_cigar(self):
+        idx1, idx2 = from_cigar('3M1I2M', 5, 7)
+        npt.assert_array_equal(idx1, [5, 6, 7, 8, 9, 10])
+        npt.assert_array_equal(idx2, [7, 8, 9, -1, 10, 11])
+
+    def test_round_trip(self):
+        rng = np.random.default_rng(18)
+        for _ in range(20):
+            codes1 = rng.integers(0, 4, rng.integers(0, 30)).astype(np.uint8)
+            codes2 = rng.integers(0, 4, rng.integers(0, 30)).astype(np.uint8)
+            for mode in ('global', 'local'):
+                _, idx1, idx2 = global_align(codes1, codes2, 5, 2, 1, -2,
+                                             mode=mode)
+                starts = [idx[idx >= 0][:1].sum() for idx in (idx1, idx2)]
+                observed = from_cigar(cigar(idx1, idx2), *starts)
+                npt.assert_array_equal(observed[0], idx1)
+                npt.assert_array_equal(observed[1], idx2)
+
+
+class ScoreTypeTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_score_dtype(self):
+        table = substitution_table(1, -2)[:4, :4]
+        self.assertIs(_score_dtype(table, 5, 2, 100, 100), np.int16)
+        self.assertIs(_score_dtype(table, 5, 2, 10000, 10000), np.int32)
+        self.assertIs(_score_dtype(table, 5.5, 2, 100, 100), np.float64)
+        self.assertIs(_score_dtype(table, 1e7, 2, 100, 100), np.float64)
+
+    def test_integer_matches_float(self):
+        # the same alignment, whether the scores are held as integers or
+        # as floats
+        rng = np.random.default_rng(13)
+        codes1 = rng.integers(0, 4, 300).astype(np.uint8)
+        codes2 = np.concatenate([codes1[:100], codes1[120:], [1, 2]])
+        codes2[::7] = 0
+        expected = global_align(codes1, codes2, 5 + 1e-9, 2, 1, -2)
+        observed = global_align(codes1, codes2, 5, 2, 1, -2)
+        self.assertEqual(observed[0], round(expected[0]))
+        npt.assert_array_equal(observed[1], expected[1])
+        npt.assert_array_equal(observed[2], expected[2])
+
+
+class SubstitutionTableTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_degenerate_averaged(self):
+        table = substitution_table(1, -2)
+        codes = encode('ANRW', degenerate=True)
+        self.assertEqual(table[codes[0], codes[0]], 1)
+        # N is A a quarter of the time
+        self.assertEqual(table[codes[1], codes[0]], 0.25 - 1.5)
+        # R (A or G) and W (A or T) are both A a quarter of the time
+        self.assertEqual(table[codes[2], codes[3]], 0.25 - 1.5)
+        npt.assert_array_equal(table, table.T)
+
+    def test_given_scores_kept(self):
+        scores = np.array([[5, -4, -4, -4, 2],
+                           [-4, 5, -4, -4, -1],
+                           [-4, -4, 5, -4, 2],
+                           [-4, -4, -4, 5, -1],
+                           [2, -1, 2, -1, 3]])
+        table = iupac_substitution_table('ACGTR', scores)
+        codes = encode('ACGTRY', degenerate=True)
+        npt.assert_array_equal(table[np.ix_(codes[:5], codes[:5])], scores)
+        # Y isn't given, so it is the average over C and T
+        self.assertEqual(table[codes[5], codes[0]], -4)
+        self.assertEqual(table[codes[5], codes[1]], 0.5)
+
+    def test_missing_base(self):
+        with self.assertRaisesRegex(ValueError, 'T'):
+            iupac_substitution_table('ACG', np.eye(3))
+
+    def test_not_iupac(self):
+        with self.assertRaisesRegex(ValueError, 'X'):
+            iupac_substitution_table('ACGTX', np.eye(5))
+
+    def test_align_degenerate(self):
+        codes1 = encode('AAAAGGNNTTTT', degenerate=True)
+        codes2 = encode('AAAAGGCATTTT', degenerate=True)
+        score, idx1, idx2 = global_align(codes1, codes2, 5, 2, 1, -2)
+        npt.assert_array_equal(idx1, np.arange(12))
+        npt.assert_array_equal(idx2, np.arange(12))
+        self.assertEqual(score, 10 + 2 * (0.25 - 1.5))
+
+
+class BandedAlignTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_band(self):
+        self.assertEqual(_band(10, 12, 3), (-3, 5))
+        self.assertEqual(_band(12, 10, 3), (-5, 3))
+        # a band covering the whole matrix is no band at all
+        self.assertIsNone(_band(10, 12, 12))
+        self.assertIsNone(_band(10, 12, None))
+
+    def test_banded_traceback_size(self):
+        codes = encode(DNA('ACGT' * 50))
+        band = _band(200, 200, 4)
+        traceback = _Traceback(200, 200, band)
+        _fill(_Diagonals(codes, codes, np.eye(4), 5, 2), band, traceback)
+        # nine cells to a row, at two bits each
+        self.assertEqual(traceback.directions.shape, (201 * 3,))
+
+    def test_banded_matches_full(self):
+        seq1 = DNA('ACCGGTGGAACCGGTAACACCCACAAGGTTCCAAGGTT')
+        seq2 = DNA('ACCGGTAACCGGTTAACACCCACAAGGTCCAAGGTT')
+        params = dict(gap_open_penalty=5, gap_extend_penalty=2,
+                      match_score=1, mismatch_score=-2)
+        expected = global_align(encode(seq1), encode(seq2), **params)
+        for band_width in (2, 5, 50):
+            observed = global_align(encode(seq1), encode(seq2),
+                                    band_width=band_width, **params)
+            self.assertEqual(observed[0], expected[0])
+            npt.assert_array_equal(observed[1], expected[1])
+            npt.assert_array_equal(observed[2], expected[2])
+
+    def test_band_widened(self):
+        # the two sequences are offset by 6 positions in the middle, which a
+        # band of width 1 can't contain, so it has to be widened
+        seq = 'ACGTTGCAACTGGACTTAGCTTGACCATGGCATGCAACTAGAGTCCATGGCAAGTT'
+        seq1 = DNA(seq[:15] + 'GATTAC' + seq[15:40] + seq[46:])
+        seq2 = DNA(seq)
+        params = dict(gap_open_penalty=5, gap_extend_penalty=0.5,
+                      match_score=1, mismatch_score=-2)
+        expected = global_align(encode(seq1), encode(seq2), **params)
+        observed = global_align(encode(seq1), encode(seq2), band_width=1,
+                                **params)
+        self.assertEqual(observed[0], 29.0)
+        self.assertEqual(observed[0], expected[0])
+        npt.assert_array_equal(observed[1], expected[1])
+        npt.assert_array_equal(observed[2], expected[2])
+
+
+class CheckpointedTracebackTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_checkpointed_traceback(self):
+        rng = np.random.default_rng(7)
+        codes1 = rng.integers(0, 4, 80).astype(np.uint8)
+        codes2 = np.concatenate([codes1[:30], codes1[35:], [0, 1, 2]])
+        codes2[10] = (codes2[10] + 1) % 4
+        table = np.where(np.eye(4, dtype=bool), 1.0, -2.0)
+        n = len(codes2)
+        m = len(codes1)
+        for band in (None, _band(n, m, 4)):
+            traceback = _Traceback(n, m, band)
+            _fill(_Diagonals(codes1, codes2, table, 5, 2), band, traceback)
+            expected = _traceback(traceback, n, m)
+            for interval in (1, 2, 7, 50, 1000):
+                diagonals = _Diagonals(codes1, codes2, table, 5, 2)
+                traceback = _CheckpointedTraceback(diagonals, band, interval)
+                _fill(diagonals, band, traceback)
+                observed = _traceback(traceback, n, m)
+                npt.assert_array_equal(observed[0], expected[0])
+                npt.assert_array_equal(observed[1], expected[1])
+
+    def test_memory_limit(self):
+        seq1 = DNA('ACCGGTGGAACCGGTAACACCCACAAGGTTCCAAGGTT')
+        seq2 = DNA('ACCGGTAACCGGTTAACACCCACAAGGTCCAAGGTT')
+        params = dict(gap_open_penalty=5, gap_extend_penalty=2,
+                      match_score=1, mismatch_score=-2)
+        expected = global_align(encode(seq1), encode(seq2), **params)
+        observed = global_align(encode(seq1), encode(seq2), memory_limit=0,
+                                **params)
+        self.assertEqual(observed[0], expected[0])
+        npt.assert_array_equal(observed[1], expected[1])
+        npt.assert_array_equal(observed[2], expected[2])
+
+
+class GlobalScoreTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_score(self):
+        observed = global_score(encode(DNA('AAAAAAAAGGTGGCCTTTTTTTT')),
+                                encode(DNA('AAAAAAAAGGGGCCTTTTTTTT')),
+                                5, 2, 1, -2)
+        self.assertEqual(observed, (17.0, 22, 23))
+
+    def test_empty_sequence(self):
+        observed = global_score(encode(DNA('')), encode(DNA('ACG')),
+                                5, 2, 1, -2)
+        self.assertEqual(observed, (0.0, 0, 3))
+
+    def test_asymmetric_substitution_matrix(self):
+        # C against A costs more than A against C, whichever sequence is
+        # the longer
+        scores = np.full((4, 4), -1) + 2 * np.eye(4)
+        scores[1, 0] = -3
+        table = iupac_substitution_table('ACGT', scores)
+        codes1 = encode('AAAAAAAAA')
+        codes2 = encode('AAAACAAAAA')
+        for codes1, codes2 in ((codes1, codes2), (codes2, codes1)):
+            score, _, _ = global_score(codes1, codes2, 5, 2, 1, -2,
+                                       substitution_matrix=table)
+            expected, _, _ = global_align(codes1, codes2, 5, 2, 1, -2,
+                                          substitution_matrix=table)
+            self.assertEqual(score, expected)
+
+    def test_matches_global_align(self):
+        # the longer sequence is put on the rows either way round, which
+        # must not change the result
+        rng = np.random.default_rng(11)
+        for _ in range(25):
+            codes1 = rng.integers(0, 4, rng.integers(1, 40)).astype(np.uint8)
+            codes2 = np.concatenate(
+                [codes1[:5], rng.integers(0, 4, rng.integers(0, 10)),
+                 codes1[5:]]).astype(np.uint8)
+            for seqs in ((codes1, codes2), (codes2, codes1)):
+                for band_width in (None, 2):
+                    score, idx1, idx2 = global_align(*seqs, 2, 1, 1, -1,
+                                                     band_width=band_width)
+                    present = (idx1 >= 0) & (idx2 >= 0)
+                    matches = (seqs[0][idx1[present]] ==
+                               seqs[1][idx2[present]]).sum()
+                    self.assertEqual(
+                        global_score(*seqs, 2, 1, 1, -1,
+                                     band_width=band_width),
+                        (score, matches, len(idx1)))
+
+
+class XDropTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def setUp(self):
+        super().setUp()
+        self.query = encode(DNA('AAAAAAAAGGTGGCCTTTTTTTT'))
+        # starts as the query does, then has nothing to do with it
+        self.chimera = encode(DNA('AAAAAAAAGGTGGCGAGAGAGAGAGAGA'))
+
+    def test_related(self):
+        rng = np.random.default_rng(3)
+        for _ in range(10):
+            codes1 = rng.integers(0, 4, rng.integers(50, 200)).astype(
+                np.uint8)
+            codes2 = np.concatenate(
+                [codes1[:20], rng.integers(0, 4, rng.integers(0, 3)),
+                 codes1[20:]]).astype(np.uint8)
+            codes2[rng.integers(0, len(codes2), 3)] = 0
+            for memory_limit in (None, 0):
+                expected = global_align(codes1, codes2, 5, 2, 1, -2)
+                observed = global_align(codes1, codes2, 5, 2, 1, -2,
+                                        memory_limit=memory_limit,
+                                        x_drop=30)
+                self.assertEqual(observed[0], expected[0])
+                npt.assert_array_equal(observed[1], expected[1])
+                npt.assert_array_equal(observed[2], expected[2])
+            self.assertEqual(
+                global_score(codes1, codes2, 5, 2, 1, -2, x_drop=30),
+                global_score(codes1, codes2, 5, 2, 1, -2))
+
+    def test_abandoned(self):
+        for memory_limit in (None, 0):
+            with self.assertRaises(XDropped) as cm:
+                global_align(self.query, self.chimera, 5, 2, 1, -2,
+                             memory_limit=memory_limit, x_drop=5)
+            score, idx1, idx2 = cm.exception.result
+            # cut short after the 14 positions the two have in common
+            self.assertEqual(score, 14.0)
+            npt.assert_array_equal(idx1, list(range(23)) + [-1] * 14)
+            npt.assert_array_equal(
+                idx2, list(range(14)) + [-1] * 9 + list(range(14, 28)))
+
+        with self.assertRaises(XDropped) as cm:
+            global_score(self.query, self.chimera, 5, 2, 1, -2, x_drop=5)
+        self.assertEqual(cm.exception.result, (14.0, 14, 37))
+
+    def test_unrelated(self):
+        # an unrelated pair never scores enough for anything to be dropped
+        # before the first row and column run out, and is then abandoned
+        # rather than finished with terminal gaps alone
+        codes = encode(DNA('ACGTACGTAC'))
+        with self.assertRaises(XDropped) as cm:
+            global_score(self.query, codes, 5, 2, 1, -2, x_drop=5)
+        score = cm.exception.result[0]
+        self.assertLessEqual(score, 5)
+        for memory_limit in (None, 0):
+            with self.assertRaises(XDropped) as cm:
+                global_align(self.query, codes, 5, 2, 1, -2,
+                             memory_limit=memory_limit, x_drop=5)
+            self.assertEqual(cm.exception.result[0], score)
+
+    def test_unrelated_global(self):
+        # with leading gaps penalized, nothing keeps an unrelated pair alive
+        # for long
+        rng = np.random.default_rng(8)
+        codes1 = rng.integers(0, 4, 2000).astype(np.uint8)
+        codes2 = rng.integers(0, 4, 2000).astype(np.uint8)
+        cells = collections.Counter()
+        with self.assertRaises(XDropped):
+            global_align(codes1, codes2, 5, 2, 1, -2, x_drop=20,
+                         mode='global', cells=cells)
+        self.assertLess(cells['filled'], 0.01 * 2001 ** 2)
+
+    def test_global(self):
+        # related pairs are aligned in full, as without x_drop
+        rng = np.random.default_rng(9)
+        codes1 = rng.integers(0, 4, 300).astype(np.uint8)
+        codes2 = np.delete(codes1, [50, 51, 200])
+        codes2[rng.integers(0, len(codes2), 10)] = 0
+        expected = global_align(codes1, codes2, 5, 2, 1, -2, mode='global')
+        for memory_limit in (None, 0):
+            observed = global_align(codes1, codes2, 5, 2, 1, -2,
+                                    mode='global', x_drop=20,
+                                    memory_limit=memory_limit)
+            self.assertEqual(observed[0], expected[0])
+            npt.assert_array_equal(observed[1], expected[1])
+            npt.assert_array_equal(observed[2], expected[2])
+
+
+class BatchAlignTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(5)
+        self.pairs = []
+        for _ in range(40):
+            codes1 = rng.integers(0, 4, rng.integers(0, 30)).astype(np.uint8)
+            codes2 = np.concatenate(
+                [codes1[:3], rng.integers(0, 4, rng.integers(0, 6)),
+                 codes1[3 + rng.integers(0, 4):]]).astype(np.uint8)
+            self.pairs.append((codes1, codes2))
+
+    def test_batches(self):
+        pairs = [(np.zeros(m, dtype=np.uint8), np.zeros(n, dtype=np.uint8))
+                 for n, m in ((9, 9), (1, 2), (10, 10), (2, 1))]
+        # sorted by size, and split where the padded traceback gets too big
+        self.assertEqual(list(_batches(pairs, 500)), [[1, 3], [0, 2]])
+        self.assertEqual(list(_batches(pairs, 1)), [[1], [3], [0], [2]])
+
+    def test_matches_global_align(self):
+        for max_cells in (1, 500, None):
+            observed = global_align_batch(self.pairs, 2, 1, 1, -1,
+                                          max_cells=max_cells)
+            for pair, (score, idx1, idx2) in zip(self.pairs, observed):
+                expected = global_align(*pair, 2, 1, 1, -1)
+                self.assertEqual(score, expected[0])
+                npt.assert_array_equal(idx1, expected[1])
+                npt.assert_array_equal(idx2, expected[2])
+
+    def test_matches_global_score(self):
+        for max_cells in (1, 500, None):
+            observed = global_score_batch(self.pairs, 5, 2, 1, -2,
+                                          max_cells=max_cells)
+            expected = [global_score(*pair, 5, 2, 1, -2)
+                        for pair in self.pairs]
+            self.assertEqual(observed, expected)
+
+
+class GlobalScoreSweepTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def setUp(self):
+        super().setUp()
+        self.parameter_sets = [(5, 2, 1, -2), (3, 0.5, 2, -1), (5, 5, 1, -3),
+                               (1, 1, 4, -1), (8, 0.5, 1, -0.5)]
+
+    def test_matches_global_score(self):
+        codes1 = encode('ACGTNACGTRACGGTTGCA', degenerate=True)
+        codes2 = encode('ACGTACGTTACGGTACGCA', degenerate=True)
+        for max_cells in (1, 50, None):
+            observed = global_score_sweep(codes1, codes2,
+                                          self.parameter_sets,
+                                          max_cells=max_cells)
+            expected = [global_score(codes1, codes2, *parameters)
+                        for parameters in self.parameter_sets]
+            self.assertEqual(observed, expected)
+
+    def test_empty(self):
+        codes = encode('ACGT')
+        observed = global_score_sweep(codes[:0], codes, self.parameter_sets)
+        self.assertEqual(observed, [(0.0, 0, 4)] * len(self.parameter_sets))
@@ -0,0 +1,112 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy as np
+import numpy.testing as npt
+
+from qiime2.plugin.testing import TestPluginBase
+
+from mytoy1._alignment import encode, global_align
+from mytoy1._anchors import (anchored_align, chain_anchors, find_anchors,
+                             minimizers)
+
+
+def _mutate(rng, codes, rate):
+    # substitutions, deletions and insertions, each at a third of rate
+    draws = rng.random(len(codes))
+    codes = codes.copy()
+    substituted = (draws >= rate / 3) & (draws < 2 * rate / 3)
+    codes[substituted] = rng.integers(0, 4, substituted.sum())
+    repeats = np.where((draws >= 2 * rate / 3) & (draws < rate), 2, 1)
+    repeats[draws < rate / 3] = 0
+    return np.repeat(codes, repeats).astype(np.uint8)
+
+
+class AnchorTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_minimizers(self):
+        rng = np.random.default_rng(17)
+        codes = rng.integers(0, 4, 200).astype(np.uint8)
+        positions, values = minimizers(codes, 5, 4)
+        # every window of 4 k-mers has one
+        self.assertTrue((np.diff(positions) <= 4).all())
+        self.assertLess(positions[0], 4)
+        self.assertGreater(positions[-1], 200 - 5 - 4)
+        windows = np.lib.stride_tricks.sliding_window_view(codes, 5)
+        npt.assert_array_equal(values,
+                               windows[positions] @ 4 ** np.arange(4, -1, -1))
+
+    def test_minimizers_degenerate(self):
+        codes = encode('ACGTNACGTAC' * 3, degenerate=True)
+        n = encode('N', degenerate=True)[0]
+        positions, _ = minimizers(codes, 4, 2)
+        self.assertGreater(len(positions), 0)
+        for position in positions:
+            self.assertNotIn(n, codes[position:position + 4])
+
+    def test_chain(self):
+        # the anchor at 50 in the second sequence is out of order, and the
+        # ones at 20 and 24 are on the same diagonal and overlap
+        positions1 = np.array([0, 20, 24, 40, 60, 80])
+        positions2 = np.array([5, 25, 29, 50, 45, 90])
+        self.assertEqual(chain_anchors(positions1, positions2, 10),
+                         [[0, 5, 10], [20, 25, 14], [60, 45, 10],
+                          [80, 90, 10]])
+
+    def test_find_anchors(self):
+        rng = np.random.default_rng(18)
+        codes1 = rng.integers(0, 4, 1000).astype(np.uint8)
+        codes2 = np.concatenate([codes1[500:], codes1[:500]])
+        positions1, positions2 = find_anchors(codes1, codes2, 15, 10)
+        self.assertGreater(len(positions1), 50)
+        npt.assert_array_equal(positions2, (positions1 + 500) % 1000)
+
+    def test_matches_global_align(self):
+        # the anchored alignment of related sequences scores as well as the
+        # full one, and lines up all of both sequences in order
+        rng = np.random.default_rng(19)
+        for mode in ('semi-global', 'global'):
+            codes1 = rng.integers(0, 4, 2000).astype(np.uint8)
+            codes2 = np.concatenate([rng.integers(0, 4, 40),
+                                     _mutate(rng, codes1, 0.05)[30:]])
+            expected = global_align(codes1, codes2, 5, 2, 1, -2, mode=mode)
+            score, idx1, idx2 = anchored_align(codes1, codes2, 5, 2, 1, -2,
+                                               mode=mode)
+            self.assertEqual(score, expected[0])
+            npt.assert_array_equal(idx1[idx1 >= 0], np.arange(len(codes1)))
+            npt.assert_array_equal(idx2[idx2 >= 0], np.arange(len(codes2)))
+
+    def test_identical(self):
+        # the chain runs from the first base to near the last, leaving an
+        # empty gap before it, which adds nothing to the score
+        rng = np.random.default_rng(0)
+        codes = rng.integers(0, 4, 200).astype(np.uint8)
+        self.assertEqual(chain_anchors(*find_anchors(codes, codes, 15, 10),
+                                       15)[0][:2], [0, 0])
+        for mode in ('semi-global', 'global'):
+            expected = global_align(codes, codes, 5, 2, 1, -2, mode=mode)
+            observed = anchored_align(codes, codes, 5, 2, 1, -2, mode=mode)
+            self.assertEqual(observed[0], 200.0)
+            self.assertEqual(observed[0], expected[0])
+            npt.assert_array_equal(observed[1], np.arange(200))
+            npt.assert_array_equal(observed[2], np.arange(200))
+
+    def test_no_anchors(self):
+        codes1 = encode('AAAATTT')
+        codes2 = encode('AAAAGGTTT')
+        observed = anchored_align(codes1, codes2, 5, 2, 1, -2)
+        expected = global_align(codes1, codes2, 5, 2, 1, -2)
+        self.assertEqual(observed[0], expected[0])
+        npt.assert_array_equal(observed[1], expected[1])
+        npt.assert_array_equal(observed[2], expected[2])
+
+    def test_local(self):
+        codes = encode('ACGT')
+        with self.assertRaisesRegex(ValueError, 'global or semi-global'):
+            anchored_align(codes, codes, 5, 2, 1, -2, mode='local')
@@ -0,0 +1,88 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy as np
+import numpy.testing as npt
+
+from qiime2.plugin.testing import TestPluginBase
+from skbio import DNA
+
+from mytoy1._alignment import encode
+from mytoy1._cache import AlignmentCache, _ENTRY_OVERHEAD, _pack
+
+
+class AlignmentCacheTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_key(self):
+        codes1 = encode(DNA('ACGT'))
+        codes2 = encode(DNA('AGT'))
+        key = AlignmentCache.key(codes1, codes2, 5, 2, 1, -2)
+        self.assertEqual(key, AlignmentCache.key(codes1, codes2,
+                                                 5.0, 2.0, 1.0, -2.0))
+        self.assertNotEqual(key, AlignmentCache.key(codes2, codes1,
+                                                    5, 2, 1, -2))
+        self.assertNotEqual(key, AlignmentCache.key(codes1, codes2,
+                                                    5, 2, 1, -1))
+        # the same codes, split differently between the two sequences
+        self.assertNotEqual(key, AlignmentCache.key(codes1[:3],
+                                                    np.append(codes1[3:],
+                                                              codes2),
+                                                    5, 2, 1, -2))
+
+    def test_get_put(self):
+        cache = AlignmentCache(self.temp_dir.name, 1024 ** 2)
+        self.assertIsNone(cache.get(b'key'))
+
+        cache.put(b'key', 3.5, np.array([0, -1, 1]), np.array([0, 1, -1]))
+        score, idx1, idx2 = cache.get(b'key')
+        self.assertEqual(score, 3.5)
+        npt.assert_array_equal(idx1, [0, -1, 1])
+        npt.assert_array_equal(idx2, [0, 1, -1])
+        cache.close()
+
+        # and it's still there when opened again
+        cache = AlignmentCache(self.temp_dir.name, 1024 ** 2)
+        self.assertEqual(cache.get(b'key')[0], 3.5)
+        cache.close()
+
+    def test_eviction(self):
+        idx = np.arange(10)
+        cache = AlignmentCache(self.temp_dir.name, 10000)
+        for i in range(200):
+            cache.put(b'key-%d' % i, float(i), idx, idx)
+            # key-0 is kept in use, so it's never the least recently used
+            self.assertIsNotNone(cache.get(b'key-0'))
+        self.assertLessEqual(cache._total(), 10000)
+        self.assertIsNone(cache.get(b'key-1'))
+        self.assertEqual(cache.get(b'key-199')[0], 199.0)
+        cache.close()
+
+    def test_eviction_one_at_a_time(self):
+        idx = np.arange(10)
+        cache = AlignmentCache(self.temp_dir.name, 10000)
+        cache.put(b'key-0', 0.0, idx, idx)
+        size = cache._total()
+        cache.max_size = 3 * size
+        for i in range(1, 4):
+            cache.put(b'key-%d' % i, float(i), idx, idx)
+        # only the oldest entry makes room for the newest
+        self.assertIsNone(cache.get(b'key-0'))
+        for i in range(1, 4):
+            self.assertEqual(cache.get(b'key-%d' % i)[0], float(i))
+
+        # an entry that only fits by itself evicts all the others, but not
+        # itself
+        big = np.arange(1000)
+        cache.max_size = len(_pack(big)) * 2 + _ENTRY_OVERHEAD
+        cache.put(b'big', 5.0, big, big)
+        self.assertEqual(cache.get(b'big')[0], 5.0)
+        self.assertEqual(cache._total(), cache.max_size)
+        for i in range(1, 4):
+            self.assertIsNone(cache.get(b'key-%d' % i))
+        cache.close()
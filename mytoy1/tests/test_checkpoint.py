@@ -0,0 +1,74 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import json
+import os
+from unittest import mock
+
+from qiime2.plugin.testing import TestPluginBase
+
+from mytoy1._checkpoint import ScanCheckpoint
+
+
+class ScanCheckpointTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.temp_dir.name, 'sequences.fasta')
+        self.checkpoint = ScanCheckpoint(
+            os.path.join(self.temp_dir.name, 'checkpoint.json'))
+        self._write(b'>seq-1\nACGT\n>seq-2\nACGT\n')
+
+    def _write(self, data, mode='wb'):
+        with open(self.path, mode) as fh:
+            fh.write(data)
+
+    def test_no_checkpoint(self):
+        self.assertEqual(self.checkpoint.resume(self.path), (0, None))
+
+    def test_resume(self):
+        self.checkpoint.save(self.path, 24, 2)
+        self.assertEqual(self.checkpoint.resume(self.path), (24, 2))
+        self._write(b'>seq-3\nACGT\n', mode='ab')
+        self.assertEqual(self.checkpoint.resume(self.path), (24, 2))
+        # and only the checkpoint is left behind
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)),
+                         ['checkpoint.json', 'sequences.fasta'])
+        with open(self.checkpoint.path) as fh:
+            self.assertEqual(json.load(fh)['offset'], 24)
+
+    def test_corrupt(self):
+        self.checkpoint.save(self.path, 24, 2)
+        with open(self.checkpoint.path) as fh:
+            saved = fh.read()
+        for data in (saved[:len(saved) // 2], '', '\xff', '[]',
+                     json.dumps({'offset': 24}),
+                     json.dumps({'offset': '24', 'result': 2,
+                                 'hashes': []})):
+            with open(self.checkpoint.path, 'w') as fh:
+                fh.write(data)
+            self.assertEqual(self.checkpoint.resume(self.path), (0, None))
+
+    def test_changed(self):
+        self.checkpoint.save(self.path, 24, 2)
+        for data in (b'>seq-1\nACGT\n>seq-2\nACGA\n>seq-3\nACGT\n',
+                     b'>seq-0\nACGT\n>seq-2\nACGT\n>seq-3\nACGT\n',
+                     b'>seq-1\nACGT\n'):
+            self._write(data)
+            self.assertEqual(self.checkpoint.resume(self.path), (0, None))
+
+    def test_changed_between_hashed_blocks(self):
+        # only the start of the file and the block before the offset are
+        # checked
+        with mock.patch('mytoy1._checkpoint._HASHED_SIZE', 4):
+            self.checkpoint.save(self.path, 24, 2)
+            self._write(b'>seq-1\nACGT\n>seq-9\nACGT\n')
+            self.assertEqual(self.checkpoint.resume(self.path), (24, 2))
+            self._write(b'>seq-1\nACGT\n>seq-9\nACGA\n')
+            self.assertEqual(self.checkpoint.resume(self.path), (0, None))
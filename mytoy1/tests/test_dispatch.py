@@ -0,0 +1,134 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import collections
+from unittest import mock
+
+import numpy as np
+
+from qiime2.plugin.testing import TestPluginBase
+
+from mytoy1._alignment import global_align
+from mytoy1._dispatch import band_cells, estimate_identity, plan_alignment
+
+
+def _mutate(rng, codes, rate):
+    # substitutions, with a quarter as many deletions
+    codes = codes.copy()
+    substituted = rng.random(len(codes)) < rate
+    codes[substituted] = rng.integers(0, 4, substituted.sum())
+    return codes[rng.random(len(codes)) >= rate / 4]
+
+
+class EstimateIdentityTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def setUp(self):
+        super().setUp()
+        self.rng = np.random.default_rng(19)
+        self.codes = self.rng.integers(0, 4, 5000).astype(np.uint8)
+
+    def test_identical(self):
+        self.assertEqual(estimate_identity(self.codes, self.codes), 1.0)
+        # a part of a sequence is found in it in full
+        self.assertEqual(estimate_identity(self.codes[1000:2000],
+                                           self.codes), 1.0)
+
+    def test_related(self):
+        related = _mutate(self.rng, self.codes, 0.05)
+        self.assertAlmostEqual(estimate_identity(self.codes, related), 0.95,
+                               delta=0.02)
+
+    def test_unrelated(self):
+        unrelated = self.rng.integers(0, 4, 5000).astype(np.uint8)
+        self.assertLess(estimate_identity(self.codes, unrelated), 0.5)
+
+    def test_too_short(self):
+        self.assertIsNone(estimate_identity(self.codes[:20], self.codes))
+
+
+class PlanAlignmentTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(19)
+        self.codes1 = rng.integers(0, 4, 6000).astype(np.uint8)
+        self.codes2 = _mutate(rng, self.codes1, 0.02)
+
+    def test_band_cells(self):
+        for n, m, band_width in ((30, 40, None), (30, 40, 3), (40, 30, 3),
+                                 (30, 40, 100), (0, 5, None)):
+            cells = collections.Counter()
+            global_align(np.zeros(m, dtype=np.uint8),
+                         np.zeros(n, dtype=np.uint8), 5, 2, 1, -2,
+                         band_width=band_width, cells=cells)
+            if n:
+                self.assertEqual(band_cells(n, m, band_width),
+                                 cells['filled'])
+
+    def test_small(self):
+        # not worth estimating anything
+        self.assertEqual(
+            plan_alignment(self.codes1[:100], self.codes2[:100], 5, 1, -2),
+            ('full', None, None, 101 * 101))
+
+    def test_banded(self):
+        strategy, band_width, identity, estimated = plan_alignment(
+            self.codes1, self.codes2, 5, 1, -2)
+        self.assertEqual(strategy, 'banded')
+        self.assertGreater(identity, 0.95)
+        # the band is wide enough not to be widened
+        cells = collections.Counter()
+        observed = global_align(self.codes1, self.codes2, 5, 2, 1, -2,
+                                band_width=band_width, cells=cells)
+        self.assertEqual(cells['filled'], estimated)
+        expected = global_align(self.codes1, self.codes2, 5, 2, 1, -2)
+        self.assertEqual(observed[0], expected[0])
+
+    def test_unrelated(self):
+        rng = np.random.default_rng(20)
+        unrelated = rng.integers(0, 4, 6000).astype(np.uint8)
+        strategy, band_width, _, _ = plan_alignment(self.codes1, unrelated,
+                                                    5, 1, -2)
+        self.assertEqual(strategy, 'full')
+        self.assertIsNone(band_width)
+
+    def test_local(self):
+        self.assertEqual(
+            plan_alignment(self.codes1, self.codes2, 5, 1, -2,
+                           mode='local')[:3],
+            ('full', None, None))
+
+    def test_linear_space(self):
+        strategy, band_width, _, _ = plan_alignment(
+            self.codes1, self.codes2, 5, 1, -2, memory_limit=1000)
+        self.assertEqual(strategy, 'linear-space')
+        self.assertIsNotNone(band_width)
+
+    def test_anchored(self):
+        with mock.patch('mytoy1._dispatch._MAX_EXACT_COST', 2 ** 20):
+            self.assertEqual(
+                plan_alignment(self.codes1, self.codes2, 5, 1, -2)[:2],
+                ('anchored', None))
+            # which isn't exact, so never in local mode or with x-drop
+            for kwargs in ({'mode': 'local'}, {'x_drop': 10}):
+                self.assertNotEqual(
+                    plan_alignment(self.codes1, self.codes2, 5, 1, -2,
+                                   **kwargs)[0],
+                    'anchored')
+
+    def test_given(self):
+        self.assertEqual(
+            plan_alignment(self.codes1, self.codes2, 5, 1, -2,
+                           band_width=10)[:3],
+            ('banded', 10, None))
+        self.assertEqual(
+            plan_alignment(self.codes1, self.codes2, 5, 1, -2,
+                           anchored=True)[0],
+            'anchored')
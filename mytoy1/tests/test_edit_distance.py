@@ -0,0 +1,55 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy as np
+
+from qiime2.plugin.testing import TestPluginBase
+from skbio import DNA
+
+from mytoy1._alignment import encode
+from mytoy1._edit_distance import edit_distance
+
+
+def _edit_distance(codes1, codes2):
+    # the textbook DP, one cell at a time
+    previous = list(range(len(codes2) + 1))
+    for i, code1 in enumerate(codes1, start=1):
+        current = [i]
+        for j, code2 in enumerate(codes2, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (code1 != code2)))
+        previous = current
+    return previous[-1]
+
+
+class EditDistanceTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance(encode(DNA('ACGTACGT')),
+                                       encode(DNA('ACTTACGTA'))), 2)
+        self.assertEqual(edit_distance(encode(DNA('')),
+                                       encode(DNA('ACG'))), 3)
+
+    def test_matches_dp(self):
+        rng = np.random.default_rng(3)
+        for _ in range(100):
+            codes1 = rng.integers(0, 4, rng.integers(0, 100)).astype(np.uint8)
+            codes2 = np.concatenate(
+                [codes1[:10], rng.integers(0, 4, rng.integers(0, 10)),
+                 codes1[10 + rng.integers(0, 10):]]).astype(np.uint8)
+            self.assertEqual(edit_distance(codes1, codes2),
+                             _edit_distance(codes1, codes2))
+
+    def test_max_distance(self):
+        codes1 = encode(DNA('ACGTACGTACGT'))
+        codes2 = encode(DNA('ACGAACGTTCGT'))
+        self.assertEqual(edit_distance(codes1, codes2, max_distance=2), 2)
+        self.assertIsNone(edit_distance(codes1, codes2, max_distance=1))
+        # too different in length for the distance to be small enough
+        self.assertIsNone(edit_distance(codes1, codes2[:9], max_distance=2))
@@ -0,0 +1,36 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy.testing as npt
+
+from qiime2.plugin.testing import TestPluginBase
+from skbio import DNA
+
+from mytoy1._alignment import encode
+from mytoy1._kmers import kmer_profile, kmer_similarity
+
+
+class KmerTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_kmer_profile(self):
+        # ACG, CGT, GTA and TAC, as base-4 numbers, with duplicates dropped
+        npt.assert_array_equal(kmer_profile(encode(DNA('ACGTACGT')), 3),
+                               [6, 27, 44, 49])
+        self.assertEqual(len(kmer_profile(encode(DNA('ACG')), 4)), 0)
+
+    def test_kmer_similarity(self):
+        profiles = [kmer_profile(encode(DNA(seq)), 4)
+                    for seq in ('ACGTACGTAA', 'ACGTACGTAC', 'TTTTTTTT', 'AC')]
+        observed = kmer_similarity(profiles[:2], profiles, 4)
+        # the first two share 4 of their 5 k-mers; the last sequence has no
+        # k-mers at all, so it's not similar to anything that has
+        npt.assert_array_almost_equal(observed, [[1, 0.8, 0, 0],
+                                                 [0.8, 1, 0, 0]])
+        self.assertEqual(kmer_similarity(profiles[3:], profiles[3:], 4),
+                         [[1.0]])
@@ -6,9 +6,16 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import contextlib
+import inspect
+import io
+from unittest import mock
+
+import numpy as np
 import pandas as pd
 import pandas.testing as pdt
 
+import qiime2
 from qiime2.plugin.testing import TestPluginBase
 from qiime2.plugin.util import transform
 from q2_types.feature_table import BIOMV100Format
@@ -17,7 +24,13 @@ from mytoy1._methods import duplicate_table
 
 from skbio.alignment import TabularMSA
 from skbio.sequence import DNA
-from mytoy1._methods import nw_align
+from mytoy1._methods import (nw_align, nw_score, nw_sweep, nw_align_many,
+                             nw_align_many_cigar, nw_distance_matrix,
+                             edit_distance, seqcount, seqstats)
+from mytoy1._cache import AlignmentCache
+from mytoy1._scan import count_records
+from mytoy1._sequences import (DNAFASTAFile, EncodedDNAIterator,
+                               EncodedSequence, PairwiseAlignmentIterator)
 from mytoy1._types_and_formats import SingleRecordDNAFASTAFormat
 
 
@@ -53,8 +66,8 @@ class NWAlignTests(TestPluginBase):
 
     def test_simple1(self):
         # test alignment of a pair of sequences
-        sequence1 = DNA('AAAAAAAAGGTGGCCTTTTTTTT')
-        sequence2 = DNA('AAAAAAAAGGGGCCTTTTTTTT')
+        sequence1 = EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT')
+        sequence2 = EncodedSequence('AAAAAAAAGGGGCCTTTTTTTT')
         observed = nw_align(sequence1, sequence2)
 
         aligned_sequence1 = DNA('AAAAAAAAGGTGGCCTTTTTTTT')
@@ -70,11 +83,11 @@ class NWAlignTests(TestPluginBase):
         sequence1 = transform(
             self.get_data_path('seq-1.fasta'),
             from_type=SingleRecordDNAFASTAFormat,
-            to_type=DNA)
+            to_type=EncodedSequence)
         sequence2 = transform(
             self.get_data_path('seq-2.fasta'),
             from_type=SingleRecordDNAFASTAFormat,
-            to_type=DNA)
+            to_type=EncodedSequence)
         observed = nw_align(sequence1, sequence2)
 
         aligned_sequence1 = DNA('ACCGGTGGAACCGG-TAACACCCAC')
@@ -84,8 +97,8 @@ class NWAlignTests(TestPluginBase):
         self.assertNotEqual(observed, expected)
 
     def test_alt_match_score(self):
-        sequence1 = DNA('AAAATTT')
-        sequence2 = DNA('AAAAGGTTT')
+        sequence1 = EncodedSequence('AAAATTT')
+        sequence2 = EncodedSequence('AAAAGGTTT')
         # call with default value for match score
         observed = nw_align(sequence1, sequence2)
 
@@ -112,8 +125,8 @@ class NWAlignTests(TestPluginBase):
         self.assertEqual(observed, expected)
 
     def test_alt_gap_open_penalty(self):
-        sequence1 = DNA('AAAATTT')
-        sequence2 = DNA('AAAAGGTTT')
+        sequence1 = EncodedSequence('AAAATTT')
+        sequence2 = EncodedSequence('AAAAGGTTT')
         observed = nw_align(sequence1, sequence2, gap_open_penalty=0.01)
 
         aligned_sequence1 = DNA('AAAA-T-TT-')
@@ -131,8 +144,8 @@ class NWAlignTests(TestPluginBase):
         self.assertEqual(observed, expected)
 
     def test_alt_gap_extend_penalty(self):
-        sequence1 = DNA('AAAATTT')
-        sequence2 = DNA('AAAAGGTTT')
+        sequence1 = EncodedSequence('AAAATTT')
+        sequence2 = EncodedSequence('AAAAGGTTT')
         observed = nw_align(sequence1, sequence2, gap_open_penalty=0.01)
 
         aligned_sequence1 = DNA('AAAA-T-TT-')
@@ -151,8 +164,8 @@ class NWAlignTests(TestPluginBase):
         self.assertEqual(observed, expected)
 
     def test_alt_mismatch_score(self):
-        sequence1 = DNA('AAAATTT')
-        sequence2 = DNA('AAAAGGTTT')
+        sequence1 = EncodedSequence('AAAATTT')
+        sequence2 = EncodedSequence('AAAAGGTTT')
         observed = nw_align(sequence1, sequence2, gap_open_penalty=0.01)
 
         aligned_sequence1 = DNA('AAAA-T-TT-')
@@ -170,8 +183,593 @@ class NWAlignTests(TestPluginBase):
 
         self.assertEqual(observed, expected)
 
-class seqcounttests(TestPluginBase):
+    def test_memory_limit(self):
+        # aligning two 1.5 kbp sequences needs more than 1 MB of traceback,
+        # so the checkpointed traceback is used
+        sequence1 = transform(
+            self.get_data_path('t-thermophilis-rrna.fasta'),
+            from_type=SingleRecordDNAFASTAFormat,
+            to_type=EncodedSequence)
+        sequence2 = EncodedSequence(str(sequence1)[:500] +
+                                    str(sequence1)[510:])
+        expected = nw_align(sequence1, sequence2)
+        observed = nw_align(sequence1, sequence2, memory_limit=1)
+
+        self.assertEqual(observed, expected)
+
+    def test_anchored(self):
+        sequence1 = transform(
+            self.get_data_path('t-thermophilis-rrna.fasta'),
+            from_type=SingleRecordDNAFASTAFormat,
+            to_type=EncodedSequence)
+        sequence2 = EncodedSequence(str(sequence1)[:500] +
+                                    str(sequence1)[510:900] + 'ACGT' +
+                                    str(sequence1)[900:])
+        expected = nw_align(sequence1, sequence2)
+        observed = nw_align(sequence1, sequence2, anchored=True, n_jobs=2)
+
+        self.assertEqual(observed, expected)
+
+        with self.assertRaisesRegex(ValueError, 'x-drop'):
+            nw_align(sequence1, sequence2, anchored=True, x_drop=5)
+
+    def test_strategy(self):
+        sequence1 = EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT')
+        sequence2 = EncodedSequence('AAAAAAAAGGGGCCTTTTTTTT')
+        for kwargs, expected in (
+                ({}, 'Aligned seq2 with the full strategy: 552 cells were '
+                     'estimated to be filled, and 552 were'),
+                ({'band_width': 2}, 'Aligned seq2 with the banded strategy '
+                                    '(band width 2): 132 cells were '
+                                    'estimated'),
+                ({'memory_limit': 0}, 'Aligned seq2 with the linear-space '
+                                      'strategy')):
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                nw_align(sequence1, sequence2, **kwargs)
+            self.assertIn(expected, stdout.getvalue())
+
+    def test_band_width(self):
+        sequence1 = EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT')
+        sequence2 = EncodedSequence('AAAAAAAAGGGGCCTTTTTTTT')
+        observed = nw_align(sequence1, sequence2, band_width=2)
+
+        aligned_sequence1 = DNA('AAAAAAAAGGTGGCCTTTTTTTT')
+        aligned_sequence2 = DNA('AAAAAAAAGG-GGCCTTTTTTTT')
+        expected = TabularMSA([aligned_sequence1, aligned_sequence2])
+
+        self.assertEqual(observed, expected)
+
+    def test_cache(self):
+        sequence1 = EncodedSequence('AAAATTT')
+        sequence2 = EncodedSequence('AAAAGGTTT')
+        temp_dir = self.temp_dir.name
+        expected = nw_align(sequence1, sequence2, cache_dir=temp_dir)
+        self.assertEqual(nw_align(sequence1, sequence2, cache_dir=temp_dir),
+                         expected)
+
+        # a cached alignment is used as it is, without aligning again
+        cache = AlignmentCache(temp_dir, 1024 ** 2)
+        key = AlignmentCache.key(sequence1.codes, sequence2.codes,
+                                 5, 2, 1, -2)
+        cache.put(key, 0.0, np.array([-1, -1, 0, 1, 2, 3, 4, 5, 6]),
+                  np.arange(9))
+        cache.close()
+        observed = nw_align(sequence1, sequence2, cache_dir=temp_dir)
+
+        aligned_sequence1 = DNA('--AAAATTT')
+        aligned_sequence2 = DNA('AAAAGGTTT')
+        self.assertEqual(observed, TabularMSA([aligned_sequence1,
+                                               aligned_sequence2]))
+
+    def test_x_drop(self):
+        sequence1 = EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT')
+        sequence2 = EncodedSequence('AAAAAAAAGGTGGCGAGAGAGAGAGAGA')
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            observed = nw_align(sequence1, sequence2, x_drop=5)
+
+        aligned_sequence1 = DNA('AAAAAAAAGGTGGCCTTTTTTTT--------------')
+        aligned_sequence2 = DNA('AAAAAAAAGGTGGC---------GAGAGAGAGAGAGA')
+        self.assertEqual(observed, TabularMSA([aligned_sequence1,
+                                               aligned_sequence2]))
+        self.assertIn('abandoned by the X-drop rule', stdout.getvalue())
+
+    def test_mode(self):
+        # an amplicon inside a longer reference
+        sequence1 = EncodedSequence('GGTGGCCTTT')
+        sequence2 = EncodedSequence('AAAAAAAAGGTGGCCTTTCCCCC')
+        observed = nw_align(sequence1, sequence2)
+
+        aligned_sequence1 = DNA('--------GGTGGCCTTT-----')
+        aligned_sequence2 = DNA('AAAAAAAAGGTGGCCTTTCCCCC')
+        self.assertEqual(observed, TabularMSA([aligned_sequence1,
+                                               aligned_sequence2]))
+
+        observed = nw_align(sequence1, sequence2, mode='local')
+
+        aligned_sequence1 = DNA('GGTGGCCTTT')
+        aligned_sequence2 = DNA('GGTGGCCTTT')
+        self.assertEqual(observed, TabularMSA([aligned_sequence1,
+                                               aligned_sequence2]))
+
+        # with terminal gaps penalized, the gap goes inside instead
+        sequence1 = EncodedSequence('AAAATTT')
+        sequence2 = EncodedSequence('AAAAGGTTT')
+        observed = nw_align(sequence1, sequence2, mode='global')
+
+        aligned_sequence1 = DNA('AAAA--TTT')
+        aligned_sequence2 = DNA('AAAAGGTTT')
+        self.assertEqual(observed, TabularMSA([aligned_sequence1,
+                                               aligned_sequence2]))
+
+    def test_strand(self):
+        sequence1 = EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT')
+        sequence2 = EncodedSequence('AAAAAAAAAGGCCACCTTTTTTTT', id='seq-2')
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            observed = nw_align(sequence1, sequence2, strand='both')
+
+        aligned_sequence1 = DNA('AAAAAAAAGGTGGCCTTTTTTTT-')
+        aligned_sequence2 = DNA(
+            'AAAAAAAAGGTGGCCTTTTTTTTT',
+            metadata={'id': 'seq-2', 'description': '(reverse complement)'})
+        self.assertEqual(observed, TabularMSA([aligned_sequence1,
+                                               aligned_sequence2]))
+        self.assertIn('The reverse complement of seq2 aligned better',
+                      stdout.getvalue())
+        # both strands were planned alike, and filled together
+        self.assertIn('Aligned seq2 and the reverse complement of seq2 with '
+                      'the full strategy', stdout.getvalue())
+
+        # and the forward strand when it aligns better
+        observed = nw_align(sequence1, sequence1, strand='both')
+        self.assertEqual(str(observed[1]), 'AAAAAAAAGGTGGCCTTTTTTTT')
+
+    def test_degenerate(self):
+        sequence1 = EncodedSequence('AAAANNTTT')
+        sequence2 = EncodedSequence('AAAAGGTTT')
+        observed = nw_align(sequence1, sequence2)
+
+        aligned_sequence1 = DNA('AAAANNTTT')
+        aligned_sequence2 = DNA('AAAAGGTTT')
+        expected = TabularMSA([aligned_sequence1, aligned_sequence2])
+
+        self.assertEqual(observed, expected)
+
+    def test_substitution_matrix(self):
+        sequence1 = EncodedSequence('AAAATTT')
+        sequence2 = EncodedSequence('AAAAGGTTT')
+        # the same as a match score of 10, as in test_alt_match_score
+        observed = nw_align(sequence1, sequence2,
+                            substitution_matrix=_substitution_matrix(10, -2))
+
+        aligned_sequence1 = DNA('AAAA--TTT')
+        aligned_sequence2 = DNA('AAAAGGTTT')
+        expected = TabularMSA([aligned_sequence1, aligned_sequence2])
+
+        self.assertEqual(observed, expected)
+
+    def test_substitution_matrix_not_square(self):
+        scores = _substitution_matrix(1, -2).to_dataframe()
+        scores = qiime2.Metadata(scores.drop(columns='T'))
+        with self.assertRaisesRegex(ValueError, 'column for each'):
+            nw_align(EncodedSequence('ACGT'), EncodedSequence('ACGT'),
+                     substitution_matrix=scores)
+
+
+class NWScoreTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_simple1(self):
+        sequence1 = EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT')
+        sequence2 = EncodedSequence('AAAAAAAAGGGGCCTTTTTTTT', id='seq-2')
+        observed = nw_score(sequence1, sequence2).to_dataframe()
+
+        expected = pd.DataFrame(
+            {'score': [17.0], 'percent_identity': [100 * 22 / 23],
+             'aligned_length': [23.0]},
+            index=pd.Index(['seq-2'], name='id'))
+
+        pdt.assert_frame_equal(observed, expected)
+
+    def test_alt_match_score(self):
+        # the score agrees with the alignment built by nw_align
+        sequence1 = EncodedSequence('AAAATTT')
+        sequence2 = EncodedSequence('AAAAGGTTT')
+        observed = nw_score(sequence1, sequence2,
+                            match_score=10).to_dataframe()
+
+        self.assertEqual(list(observed.index), ['seq2'])
+        self.assertEqual(observed['score'].iloc[0], 63.0)
+        self.assertEqual(observed['percent_identity'].iloc[0],
+                         100 * 7 / 9)
+        self.assertEqual(observed['aligned_length'].iloc[0], 9)
+
+    def test_substitution_matrix(self):
+        sequence1 = EncodedSequence('AAAATTT')
+        sequence2 = EncodedSequence('AAAAGGTTT')
+        observed = nw_score(
+            sequence1, sequence2,
+            substitution_matrix=_substitution_matrix(10, -2)).to_dataframe()
+
+        self.assertEqual(observed['score'].iloc[0], 63.0)
+
+
+class NWSweepTests(TestPluginBase):
     package = 'mytoy1.tests'
 
+    def test_grid(self):
+        sequence1 = EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT')
+        sequence2 = EncodedSequence('AAAAAAAAGGGGCCTTTTTTTNT')
+        observed = nw_sweep(sequence1, sequence2,
+                            gap_open_penalties=[5, 1],
+                            match_scores=[1, 10],
+                            mismatch_scores=[-2]).to_dataframe()
+
+        self.assertEqual(list(observed.index),
+                         ['combination-%d' % k for k in range(1, 5)])
+        self.assertEqual(list(observed.columns),
+                         ['gap_open_penalty', 'gap_extend_penalty',
+                          'match_score', 'mismatch_score', 'score',
+                          'percent_identity', 'aligned_length'])
+        for _, row in observed.iterrows():
+            expected = nw_score(
+                sequence1, sequence2,
+                gap_open_penalty=row['gap_open_penalty'],
+                gap_extend_penalty=row['gap_extend_penalty'],
+                match_score=row['match_score'],
+                mismatch_score=row['mismatch_score']).to_dataframe()
+            self.assertEqual(list(row.iloc[4:]),
+                             list(expected.iloc[0]))
+        self.assertEqual(
+            list(observed[['gap_open_penalty', 'match_score']].itertuples(
+                index=False, name=None)),
+            [(5.0, 1.0), (5.0, 10.0), (1.0, 1.0), (1.0, 10.0)])
+        self.assertTrue((observed['gap_extend_penalty'] == 2).all())
+
+    def test_defaults(self):
+        sequence1 = EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT')
+        sequence2 = EncodedSequence('AAAAAAAAGGGGCCTTTTTTTT')
+        observed = nw_sweep(sequence1, sequence2).to_dataframe()
+
+        self.assertEqual(len(observed), 1)
+        self.assertEqual(observed['score'].iloc[0], 17.0)
+
+
+class NWAlignManyTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def setUp(self):
+        super().setUp()
+        self.query = EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT')
+        self.references = [
+            EncodedSequence('AAAAAAAAGGGGCCTTTTTTTT', id='ref-1'),
+            EncodedSequence('AAAAGGTTT', id='ref-2'),
+            EncodedSequence('ACGTACGTAC', id='ref-3')]
+
+    def _align_many(self, **kwargs):
+        ff = nw_align_many(self.query,
+                           EncodedDNAIterator(iter(self.references)),
+                           **kwargs)
+        return transform(ff, to_type=pd.DataFrame)
+
+    def test_simple1(self):
+        observed = self._align_many()
+
+        self.assertEqual(list(observed.index), ['ref-1', 'ref-2', 'ref-3'])
+        self.assertEqual(list(observed['score']), [17.0, 3.0, 0.0])
+        self.assertEqual(list(observed['aligned_length']), [23, 23, 33])
+        self.assertEqual(observed.loc['ref-1', 'percent_identity'],
+                         100 * 22 / 23)
+        self.assertEqual(observed.loc['ref-1', 'aligned_target'],
+                         'AAAAAAAAGG-GGCCTTTTTTTT')
+
+    def test_matches_nw_align(self):
+        observed = self._align_many(gap_open_penalty=0.01)
+
+        for reference in self.references:
+            msa = nw_align(self.query, reference, gap_open_penalty=0.01)
+            row = observed.loc[reference.id]
+            self.assertEqual(row['aligned_query'], str(msa[0]))
+            self.assertEqual(row['aligned_target'], str(msa[1]))
+
+    def test_n_jobs(self):
+        expected = self._align_many()
+        observed = self._align_many(n_jobs=2)
+
+        pdt.assert_frame_equal(observed, expected)
+
+    def test_max_edit_distance(self):
+        observed = self._align_many(max_edit_distance=2)
+
+        # ref-1 is one deletion away from the query, the others are too far
+        # to be aligned
+        self.assertEqual(list(observed.index), ['ref-1', 'ref-2', 'ref-3'])
+        self.assertEqual(observed.loc['ref-1', 'score'], 17.0)
+        self.assertTrue(observed.loc[['ref-2', 'ref-3']].isna().all(
+            axis=None))
+
+    def test_min_kmer_similarity(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            observed = self._align_many(min_kmer_similarity=0.3, kmer_size=4)
+
+        self.assertEqual(observed.loc['ref-1', 'score'], 17.0)
+        self.assertTrue(observed.loc[['ref-2', 'ref-3']].isna().all(
+            axis=None))
+        self.assertIn('2 pairs were screened out by k-mer similarity',
+                      stdout.getvalue())
+
+    def test_x_drop(self):
+        self.references.append(
+            EncodedSequence('AAAAAAAAGGTGGCGAGAGAGAGAGAGA', id='ref-4'))
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            observed = self._align_many(x_drop=5)
+
+        self.assertEqual(observed.loc['ref-1', 'score'], 17.0)
+        # ref-3 is unrelated, and only left with terminal gaps
+        self.assertTrue(observed.loc['ref-3'].isna().all())
+        self.assertTrue(observed.loc['ref-4'].isna().all())
+        self.assertIn('2 alignments were abandoned by the X-drop rule',
+                      stdout.getvalue())
+
+    def test_cache(self):
+        expected = self._align_many()
+        for n_jobs in (1, 2, 2):
+            observed = self._align_many(cache_dir=self.temp_dir.name,
+                                        n_jobs=n_jobs)
+            pdt.assert_frame_equal(observed, expected)
+
+    def test_non_acgt_reference(self):
+        self.references.append(EncodedSequence('ACGTX', id='ref-4'))
+
+        with self.assertRaisesRegex(ValueError, "'ref-4'.*X"):
+            self._align_many()
+
+
+class NWAlignManyCIGARTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def setUp(self):
+        super().setUp()
+        self.query = EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT', id='query')
+        self.references = [
+            EncodedSequence('AAAAAAAAGGGGCCTTTTTTTT', id='ref-1'),
+            EncodedSequence('AAAAGGTTT', id='ref-2', description='two'),
+            EncodedSequence('ACGTACGTAC', id='ref-3')]
+
+    def _align_many(self, **kwargs):
+        return nw_align_many_cigar(
+            self.query, EncodedDNAIterator(iter(self.references)), **kwargs)
 
+    def test_simple1(self):
+        ff = self._align_many()
+        ff.validate()
+        observed = transform(ff, to_type=pd.DataFrame)
+
+        self.assertEqual(list(observed['cigar']),
+                         ['10M1I12M', '4I9M10I', '10D23I'])
+        self.assertEqual(list(observed['target_end']), [22, 9, 10])
+        self.assertEqual(list(observed['score']), [17.0, 3.0, 0.0])
+
+    def test_matches_nw_align_many(self):
+        expected = transform(
+            nw_align_many(self.query,
+                          EncodedDNAIterator(iter(self.references))),
+            to_type=pd.DataFrame)
+        observed = transform(self._align_many(),
+                             to_type=PairwiseAlignmentIterator)
+
+        for target_id, msa in observed:
+            self.assertEqual(str(msa[0]),
+                             expected.loc[target_id, 'aligned_query'])
+            self.assertEqual(str(msa[1]),
+                             expected.loc[target_id, 'aligned_target'])
+        self.assertEqual(msa[1].metadata['id'], 'ref-3')
+
+    def test_not_aligned(self):
+        ff = self._align_many(max_edit_distance=2)
+        ff.validate()
+        observed = list(transform(ff, to_type=PairwiseAlignmentIterator))
+
+        self.assertEqual([id_ for id_, _ in observed],
+                         ['ref-1', 'ref-2', 'ref-3'])
+        self.assertEqual(str(observed[0][1][1]), 'AAAAAAAAGG-GGCCTTTTTTTT')
+        self.assertIsNone(observed[1][1])
+        self.assertIsNone(observed[2][1])
+
+    def test_same_parameters(self):
+        expected = inspect.signature(nw_align_many).parameters
+        observed = inspect.signature(nw_align_many_cigar).parameters
+
+        self.assertEqual(observed, expected)
+
+
+class NWDistanceMatrixTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def setUp(self):
+        super().setUp()
+        self.sequences = [
+            EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT', id='seq-1'),
+            EncodedSequence('AAAAAAAAGGGGCCTTTTTTTT', id='seq-2'),
+            EncodedSequence('AAAAGGTTT', id='seq-3'),
+            EncodedSequence('ACGTACGTAC', id='seq-4')]
+
+    def test_simple1(self):
+        observed = nw_distance_matrix(EncodedDNAIterator(iter(self.sequences)))
+
+        self.assertEqual(observed.ids, ('seq-1', 'seq-2', 'seq-3', 'seq-4'))
+        self.assertAlmostEqual(observed['seq-1', 'seq-2'], 1 / 23)
+        self.assertAlmostEqual(observed['seq-2', 'seq-1'], 1 / 23)
+        self.assertEqual(observed['seq-1', 'seq-4'], 1.0)
+
+    def test_matches_nw_score(self):
+        observed = nw_distance_matrix(EncodedDNAIterator(iter(self.sequences)),
+                                      mismatch_score=-1)
+
+        for i, seq1 in enumerate(self.sequences):
+            for seq2 in self.sequences[i + 1:]:
+                identity = nw_score(seq1, seq2, mismatch_score=-1).get_column(
+                    'percent_identity').to_series().iloc[0]
+                self.assertAlmostEqual(
+                    observed[seq1.id, seq2.id],
+                    1 - identity / 100)
+
+    def test_min_kmer_similarity(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            observed = nw_distance_matrix(
+                EncodedDNAIterator(iter(self.sequences)),
+                min_kmer_similarity=0.3, kmer_size=4)
+
+        # only seq-1 and seq-2 share enough 4-mers to be aligned
+        self.assertAlmostEqual(observed['seq-1', 'seq-2'], 1 / 23)
+        self.assertEqual(observed['seq-1', 'seq-3'], 1.0)
+        self.assertEqual(observed['seq-3', 'seq-1'], 1.0)
+        self.assertIn('5 pairs were screened out by k-mer similarity',
+                      stdout.getvalue())
+
+    def test_x_drop(self):
+        self.sequences.append(
+            EncodedSequence('AAAAAAAAGGTGGCGAGAGAGAGAGAGA', id='seq-5'))
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            observed = nw_distance_matrix(
+                EncodedDNAIterator(iter(self.sequences)), x_drop=5)
+
+        self.assertAlmostEqual(observed['seq-1', 'seq-2'], 1 / 23)
+        self.assertEqual(observed['seq-1', 'seq-5'], 1.0)
+        self.assertIn('abandoned by the X-drop rule', stdout.getvalue())
+
+    def test_n_jobs(self):
+        expected = nw_distance_matrix(EncodedDNAIterator(iter(self.sequences)))
+        observed = nw_distance_matrix(EncodedDNAIterator(iter(self.sequences)),
+                                      n_jobs=2)
+
+        self.assertEqual(observed, expected)
+
+
+class EditDistanceTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_simple1(self):
+        query = EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT')
+        references = [
+            EncodedSequence('AAAAAAAAGGGGCCTTTTTTTT', id='ref-1'),
+            EncodedSequence('AAAAGGTTT', id='ref-2'),
+            EncodedSequence('AAAAAAAAGGTGGCCTTTTTTTT', id='ref-3'),
+            EncodedSequence('CAAAAAAAGGTGCCCTTTTTTTTA', id='ref-4')]
+        observed = edit_distance(query, EncodedDNAIterator(iter(references)))
+
+        expected = pd.DataFrame(
+            {'edit_distance': [1.0, 14.0, 0.0, 3.0]},
+            index=pd.Index(['ref-1', 'ref-2', 'ref-3', 'ref-4'], name='id'))
+        pdt.assert_frame_equal(observed.to_dataframe(), expected)
+
+
+class seqcounttests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_seqcount(self):
+        sequences = DNAFASTAFile(
+            self.get_data_path('dna-sequences/dna-sequences.fasta'))
+        self.assertEqual(seqcount(sequences), 4)
+
+    def test_empty(self):
+        sequences = DNAFASTAFile(self.temp_dir.name + '/seqs.fasta')
+        with open(sequences.path, 'w'):
+            pass
+        self.assertEqual(seqcount(sequences), 0)
+
+    def test_n_jobs(self):
+        sequences = DNAFASTAFile(
+            self.get_data_path('dna-sequences/dna-sequences.fasta'))
+        with mock.patch('mytoy1._scan._MIN_RANGE_SIZE', 1):
+            self.assertEqual(seqcount(sequences, n_jobs=2), 4)
+
+    def test_checkpoint(self):
+        temp_dir = self.temp_dir.name
+        sequences = DNAFASTAFile(temp_dir + '/seqs.fasta')
+        checkpoint = temp_dir + '/seqs.checkpoint'
+        with open(sequences.path, 'w') as fh:
+            fh.write('>seq-1\nACGT\n>seq-2\nAC')
+        self.assertEqual(seqcount(sequences, checkpoint=checkpoint), 2)
+
+        # only what was appended is scanned, however it was split
+        with open(sequences.path, 'a') as fh:
+            fh.write('GT\n>seq-3\nACGT\n>seq-4\n')
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), \
+                mock.patch('mytoy1._methods.count_records',
+                           wraps=count_records) as counted:
+            self.assertEqual(
+                seqcount(sequences, checkpoint=checkpoint), 4)
+        self.assertEqual(counted.call_args.args[1:], (21, 43))
+        self.assertIn('Resumed counting from byte 21 of 43',
+                      stdout.getvalue())
+
+        # nor counted twice
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(
+                seqcount(sequences, checkpoint=checkpoint), 4)
+
+        # and counted again in full if the file has changed
+        with open(sequences.path, 'w') as fh:
+            fh.write('>seq-5\nACGT\n' * 5)
+        self.assertEqual(seqcount(sequences, checkpoint=checkpoint), 5)
+
+
+class SeqStatsTests(TestPluginBase):
+    package = 'mytoy1.tests'
 
+    def setUp(self):
+        super().setUp()
+        self.sequences = DNAFASTAFile(self.temp_dir.name + '/seqs.fasta')
+        with open(self.sequences.path, 'wb') as fh:
+            fh.write(b'>seq-1 a>b\r\nACGTN\r\nggcc\r\n>seq-2\r\n>seq-3\r\n'
+                     b'AAAAAAAAAA\r\n>seq-4\r\nACGT')
+
+    def _read(self, result, filename):
+        return pd.read_csv(result.path / filename, sep='\t', dtype=str,
+                           keep_default_na=False)
+
+    def test_seqstats(self):
+        result = seqstats(self.sequences)
+        result.validate(level='max')
+
+        stats = self._read(result, 'stats.tsv')
+        self.assertEqual(dict(zip(stats['id'], stats['value'])), {
+            'count': '4', 'total_length': '23', 'min_length': '0',
+            'max_length': '10', 'mean_length': '5.75', 'n50': '9',
+            'gc_fraction': repr(8 / 22), 'non_acgt_count': '1'})
+        lengths = self._read(result, 'length-histogram.tsv')
+        self.assertEqual(list(zip(lengths['length'], lengths['count'])),
+                         [('0', '1'), ('4', '1'), ('9', '1'), ('10', '1')])
+
+    def test_n_jobs(self):
+        expected = seqstats(self.sequences)
+        with mock.patch('mytoy1._scan._MIN_RANGE_SIZE', 1):
+            observed = seqstats(self.sequences, n_jobs=2)
+        for filename in ('stats.tsv', 'length-histogram.tsv'):
+            pdt.assert_frame_equal(self._read(observed, filename),
+                                   self._read(expected, filename))
+
+    def test_empty(self):
+        with open(self.sequences.path, 'wb'):
+            pass
+        result = seqstats(self.sequences)
+        result.validate(level='max')
+
+        stats = self._read(result, 'stats.tsv')
+        self.assertEqual(list(stats['value']),
+                         ['0', '0', '', '', '', '', '', '0'])
+
+
+def _substitution_matrix(match_score, mismatch_score):
+    scores = pd.DataFrame(
+        np.where(np.eye(4, dtype=bool), match_score, mismatch_score),
+        index=pd.Index(list('ACGT'), name='id'), columns=list('ACGT'))
+    return qiime2.Metadata(scores.astype(float))
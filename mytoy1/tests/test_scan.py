@@ -0,0 +1,173 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import collections
+import os
+from unittest import mock
+
+from qiime2.plugin.testing import TestPluginBase
+
+from mytoy1._scan import (count_records, record_ranges, scan,
+                          summarize_tallies, tally_sequences)
+
+
+class CountRecordsTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def _write(self, data):
+        path = os.path.join(self.temp_dir.name, 'sequences.fasta')
+        with open(path, 'wb') as fh:
+            fh.write(data)
+        return path
+
+    def test_count_records(self):
+        self.assertEqual(
+            count_records(self.get_data_path('dna-sequences.fasta')), 3)
+
+    def test_line_endings(self):
+        for data in (b'>seq-1\nACGT\n>seq-2\nAC\nGT\n',
+                     b'>seq-1\r\nACGT\r\n>seq-2\r\nAC\r\nGT\r\n',
+                     b'>seq-1\nACGT\n>seq-2\nAC\nGT',
+                     b'>seq-1\nACGT\n\n>seq-2\n'):
+            self.assertEqual(count_records(self._write(data)), 2)
+
+    def test_header_characters(self):
+        # a '>' anywhere but at the start of a line is no header
+        path = self._write(b'>seq-1 a>b\nACGT\n>seq-2 >\nACGT\n')
+        self.assertEqual(count_records(path), 2)
+
+    def test_empty(self):
+        self.assertEqual(count_records(self._write(b'')), 0)
+        self.assertEqual(count_records(self._write(b'>seq-1')), 1)
+
+    def test_blocks(self):
+        path = self._write(b'>seq-1\nACGT\n>seq-2\nACGT\n>seq-3\nACGT\n')
+        # headers on either side of the edges of the blocks
+        for block_size in (1, 2, 5, 6, 7, 1024):
+            with mock.patch('mytoy1._scan._BLOCK_SIZE', block_size):
+                self.assertEqual(count_records(path), 3)
+
+    def test_range(self):
+        path = self._write(b'>seq-1\nACGT\n>seq-2\nACGT\n>seq-3\nACGT\n')
+        self.assertEqual(count_records(path, 0, 12), 1)
+        self.assertEqual(count_records(path, 1, 13), 1)
+        self.assertEqual(count_records(path, 12, 25), 2)
+        self.assertEqual(count_records(path, 13), 1)
+
+
+class TallySequencesTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.temp_dir.name, 'sequences.fasta')
+
+    def _write(self, data):
+        with open(self.path, 'wb') as fh:
+            fh.write(data)
+        return self.path
+
+    def test_tally(self):
+        for data in (b'>seq-1 a>b\nACGTN\nggcc\n>seq-2\n>seq-3\nAAAA\n',
+                     b'>seq-1 a>b\r\nACGTN\r\nggcc\r\n>seq-2\r\n>seq-3\r\n'
+                     b'AAAA',
+                     b'>seq-1 a>b\nACGTNggcc\n>seq-2\n>seq-3\nA\nA\nA\nA'):
+            path = self._write(data)
+            # records, lines and line endings on either side of the edges
+            # of the blocks
+            for block_size in (1, 2, 3, 5, 1024):
+                with mock.patch('mytoy1._scan._BLOCK_SIZE', block_size):
+                    self.assertEqual(
+                        tally_sequences(path),
+                        (collections.Counter({9: 1, 0: 1, 4: 1}), 6, 1))
+
+    def test_range(self):
+        path = self._write(b'>seq-1\nACGT\n>seq-2\nAC\n>seq-3\nA\n')
+        self.assertEqual(tally_sequences(path, 12, 22),
+                         (collections.Counter({2: 1}), 1, 0))
+
+    def test_before_first_record(self):
+        path = self._write(b'GGGG\nNN\n>seq-1\nACGT\n')
+        self.assertEqual(tally_sequences(path),
+                         (collections.Counter({4: 1}), 2, 0))
+
+    def test_summarize(self):
+        stats, histogram = summarize_tallies([
+            (collections.Counter({10: 1, 5: 2}), 3, 1),
+            (collections.Counter({2: 3}), 0, 0)])
+        self.assertEqual(stats, {
+            'count': 6, 'total_length': 26, 'min_length': 2,
+            'max_length': 10, 'mean_length': 26 / 6, 'n50': 5,
+            'gc_fraction': 3 / 25, 'non_acgt_count': 1})
+        self.assertEqual(histogram, [(2, 3), (5, 2), (10, 1)])
+
+    def test_summarize_nothing(self):
+        stats, histogram = summarize_tallies([])
+        self.assertEqual(stats, {
+            'count': 0, 'total_length': 0, 'min_length': None,
+            'max_length': None, 'mean_length': None, 'n50': None,
+            'gc_fraction': None, 'non_acgt_count': 0})
+        self.assertEqual(histogram, [])
+
+
+class ScanTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.temp_dir.name, 'sequences.fasta')
+        with open(self.path, 'wb') as fh:
+            for k in range(50):
+                fh.write(b'>seq-%d a>b\n%s\n' % (k, b'ACGT' * k))
+
+    def test_record_ranges(self):
+        size = os.path.getsize(self.path)
+        with open(self.path, 'rb') as fh:
+            data = fh.read()
+        for n in (1, 2, 7, 50, 1000):
+            ranges = record_ranges(self.path, n)
+            self.assertLessEqual(len(ranges), n)
+            # contiguous, and each starting at a header
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], size)
+            for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                self.assertEqual(end, start)
+                self.assertEqual(data[start - 1:start + 1], b'\n>')
+        self.assertEqual(len(record_ranges(self.path, 1000)), 50)
+
+    def test_record_ranges_part(self):
+        # the first range starts where it's asked to, record or not
+        ranges = record_ranges(self.path, 1000, 100, 200)
+        self.assertEqual(ranges[0][0], 100)
+        self.assertEqual(ranges[-1][1], 200)
+        self.assertEqual(sum(count_records(self.path, start, end)
+                             for start, end in ranges),
+                         count_records(self.path, 100, 200))
+
+    def test_empty(self):
+        with open(self.path, 'wb'):
+            pass
+        self.assertEqual(record_ranges(self.path, 4), [(0, 0)])
+        self.assertEqual(list(scan(self.path, count_records, 2)), [0])
+
+    def test_scan(self):
+        self.assertEqual(list(scan(self.path, count_records)), [50])
+        # files this small are split only with a smaller minimum
+        self.assertEqual(list(scan(self.path, count_records, 2)), [50])
+        with mock.patch('mytoy1._scan._MIN_RANGE_SIZE', 1):
+            observed = list(scan(self.path, count_records, 2))
+        self.assertEqual(len(observed), 8)
+        self.assertEqual(sum(observed), 50)
+
+    def test_scan_part(self):
+        expected = count_records(self.path, 100)
+        self.assertEqual(list(scan(self.path, count_records, start=100)),
+                         [expected])
+        with mock.patch('mytoy1._scan._MIN_RANGE_SIZE', 1):
+            observed = list(scan(self.path, count_records, 2, start=100))
+        self.assertEqual(sum(observed), expected)
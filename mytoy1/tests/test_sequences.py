@@ -0,0 +1,64 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2025, AMeara.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy as np
+import numpy.testing as npt
+
+from qiime2.plugin.testing import TestPluginBase
+from skbio import DNA
+
+from mytoy1._alignment import encode
+from mytoy1._sequences import EncodedSequence, read_fasta
+
+
+class EncodedSequenceTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_packed(self):
+        rng = np.random.default_rng(2)
+        for length in range(10):
+            seq = ''.join(rng.choice(list('ACGT'), length))
+            observed = EncodedSequence(seq)
+            self.assertEqual(str(observed), seq)
+            self.assertEqual(len(observed), length)
+            npt.assert_array_equal(observed.codes, encode(seq))
+            # four bases to the byte
+            self.assertEqual(len(observed._data), (length + 3) // 4)
+
+    def test_lower_case(self):
+        self.assertEqual(str(EncodedSequence('acgT')), 'ACGT')
+
+    def test_degenerate(self):
+        observed = EncodedSequence('ACGTNWN')
+        self.assertEqual(str(observed), 'ACGTNWN')
+        npt.assert_array_equal(observed.codes,
+                               encode('ACGTNWN', degenerate=True))
+
+    def test_non_iupac(self):
+        with self.assertRaisesRegex(ValueError, 'X, Z'):
+            EncodedSequence('ACGTXZX').codes
+
+    def test_to_dna(self):
+        self.assertEqual(EncodedSequence('ACGT', id='seq-1').to_dna(),
+                         DNA('ACGT', metadata={'id': 'seq-1',
+                                               'description': ''}))
+        self.assertEqual(EncodedSequence('ACGT').to_dna(), DNA('ACGT'))
+
+
+class ReadFASTATests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_read_fasta(self):
+        with open(self.get_data_path('dna-sequences.fasta')) as fh:
+            observed = [(seq.id, seq.description, str(seq))
+                        for seq in read_fasta(fh)]
+
+        self.assertEqual(observed, [
+            ('seq-1', 'first sequence', 'ACCGGTGGAACCGGTAACACCCAC'),
+            ('seq-2', '', 'ACCGGTAACCGGTTAACACCCAC'),
+            ('seq-3', '', 'ACGTN')])
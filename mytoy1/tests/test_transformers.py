@@ -1,8 +1,16 @@
+import pandas as pd
+import qiime2
 from skbio import DNA
 
 from qiime2.plugin.testing import TestPluginBase
 
-from mytoy1 import SingleRecordDNAFASTAFormat
+from q2_types.feature_data import DNAFASTAFormat, DNASequencesDirectoryFormat
+
+from mytoy1 import (SingleRecordDNAFASTAFormat, PairwiseAlignmentsFormat,
+                    CIGARAlignmentsDirectoryFormat,
+                    SequenceStatsDirectoryFormat, EncodedSequence,
+                    EncodedDNAIterator, DNAFASTAFile,
+                    PairwiseAlignmentIterator)
 
 
 class SingleDNASequenceTransformerTests(TestPluginBase):
@@ -24,4 +32,120 @@ class SingleDNASequenceTransformerTests(TestPluginBase):
         expected = DNA('ACCGGTAACCGGTTAACACCCAC',
                        metadata={'id': 'example-sequence-2', 'description': ''})
 
-        self.assertEqual(observed, expected)
\ No newline at end of file
+        self.assertEqual(observed, expected)
+
+    def test_single_record_fasta_to_encoded_sequence(self):
+        _, observed = self.transform_format(
+            SingleRecordDNAFASTAFormat, EncodedSequence,
+            filename='seq-1.fasta')
+
+        self.assertEqual(observed.id, 'example-sequence-1')
+        self.assertEqual(str(observed), 'ACCGGTGGAACCGGTAACACCCAC')
+
+
+class EncodedDNAIteratorTransformerTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_dna_fasta_to_encoded_dna_iterator(self):
+        _, observed = self.transform_format(
+            DNAFASTAFormat, EncodedDNAIterator,
+            filename='dna-sequences.fasta')
+
+        observed = list(observed)
+        self.assertEqual([seq.id for seq in observed],
+                         ['seq-1', 'seq-2', 'seq-3'])
+        self.assertEqual(str(observed[1]), 'ACCGGTAACCGGTTAACACCCAC')
+
+
+class DNAFASTAFileTransformerTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_dna_sequences_directory_to_dna_fasta_file(self):
+        input, observed = self.transform_format(
+            DNASequencesDirectoryFormat, DNAFASTAFile,
+            filename='dna-sequences')
+
+        self.assertEqual(observed.path,
+                         str(input.path / 'dna-sequences.fasta'))
+
+
+class PairwiseAlignmentsTransformerTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_pairwise_alignments_to_dataframe(self):
+        _, observed = self.transform_format(
+            PairwiseAlignmentsFormat, pd.DataFrame,
+            filename='pairwise-alignments.tsv')
+
+        self.assertEqual(list(observed.index), ['ref-1', 'ref-2'])
+        self.assertEqual(observed.index.name, 'id')
+        self.assertEqual(list(observed['score']), [17.0, 3.0])
+        self.assertEqual(observed.loc['ref-2', 'aligned_target'],
+                         '----AAAAGGTTT----------')
+
+    def test_pairwise_alignments_to_metadata(self):
+        _, observed = self.transform_format(
+            PairwiseAlignmentsFormat, qiime2.Metadata,
+            filename='pairwise-alignments.tsv')
+
+        self.assertEqual(observed.id_count, 2)
+        self.assertEqual(observed.get_column('aligned_length').type,
+                         'numeric')
+
+
+class CIGARAlignmentsTransformerTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_cigar_alignments_to_dataframe(self):
+        _, observed = self.transform_format(
+            CIGARAlignmentsDirectoryFormat, pd.DataFrame,
+            filename='cigar-alignments')
+
+        self.assertEqual(list(observed.index), ['ref-1', 'ref-2', 'ref-3'])
+        self.assertEqual(observed.loc['ref-2', 'cigar'], '4I9M10I')
+        self.assertTrue(observed.loc['ref-3'].isna().all())
+
+    def test_cigar_alignments_to_metadata(self):
+        _, observed = self.transform_format(
+            CIGARAlignmentsDirectoryFormat, qiime2.Metadata,
+            filename='cigar-alignments')
+
+        self.assertEqual(observed.id_count, 3)
+        self.assertEqual(observed.get_column('target_end').type, 'numeric')
+
+    def test_cigar_alignments_to_alignment_iterator(self):
+        _, observed = self.transform_format(
+            CIGARAlignmentsDirectoryFormat, PairwiseAlignmentIterator,
+            filename='cigar-alignments')
+
+        observed = list(observed)
+        self.assertEqual([id_ for id_, _ in observed],
+                         ['ref-1', 'ref-2', 'ref-3'])
+        self.assertEqual([str(seq) for seq in observed[1][1]],
+                         ['AAAAAAAAGGTGGCCTTTTTTTT',
+                          '----AAAAGGTTT----------'])
+        self.assertEqual(observed[1][1][1].metadata['id'], 'ref-2')
+        self.assertIsNone(observed[2][1])
+
+
+class SequenceStatsTransformerTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_sequence_stats_to_dataframe(self):
+        _, observed = self.transform_format(
+            SequenceStatsDirectoryFormat, pd.DataFrame,
+            filename='sequence-stats')
+
+        self.assertEqual(list(observed.index),
+                         ['count', 'total_length', 'min_length',
+                          'max_length', 'mean_length', 'n50', 'gc_fraction',
+                          'non_acgt_count'])
+        self.assertEqual(observed.loc['n50', 'value'], 23.0)
+
+    def test_sequence_stats_to_metadata(self):
+        _, observed = self.transform_format(
+            SequenceStatsDirectoryFormat, qiime2.Metadata,
+            filename='sequence-stats')
+
+        self.assertEqual(observed.id_count, 8)
+        self.assertEqual(observed.get_column('value').type, 'numeric')
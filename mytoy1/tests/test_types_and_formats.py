@@ -1,8 +1,13 @@
+import shutil
+
 from qiime2.plugin import ValidationError
 from qiime2.plugin.testing import TestPluginBase
 
 from mytoy1 import (
-    SingleDNASequence, SingleRecordDNAFASTAFormat
+    SingleDNASequence, SingleRecordDNAFASTAFormat, PairwiseAlignments,
+    PairwiseAlignmentsFormat, CIGARAlignments, CIGARAlignmentsFormat,
+    CIGARAlignmentsDirectoryFormat, SequenceStats, SequenceStatsFormat,
+    SequenceLengthsFormat, SequenceStatsDirectoryFormat
 )
 
 
@@ -55,4 +60,142 @@ class SingleRecordDNAFASTAFormatTests(TestPluginBase):
         self.assertRaisesRegex(ValidationError,
                                "4 non-ACGT characters.*50 positions.",
                                format.validate,
-                               level='min')
\ No newline at end of file
+                               level='min')
+
+
+class PairwiseAlignmentsTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_semantic_type_registration(self):
+        self.assertRegisteredSemanticType(PairwiseAlignments)
+
+
+class PairwiseAlignmentsFormatTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_valid(self):
+        fp = self.get_data_path('pairwise-alignments.tsv')
+        format = PairwiseAlignmentsFormat(fp, mode='r')
+        format.validate(level='max')
+
+    def test_valid_not_aligned(self):
+        fp = self.get_data_path('pairwise-alignments-not-aligned.tsv')
+        format = PairwiseAlignmentsFormat(fp, mode='r')
+        format.validate(level='max')
+
+    def test_invalid_aligned_length(self):
+        fp = self.get_data_path('bad-pairwise-alignments.tsv')
+        format = PairwiseAlignmentsFormat(fp, mode='r')
+        self.assertRaisesRegex(ValidationError,
+                               "line 2 are not 23 positions long",
+                               format.validate)
+
+
+class CIGARAlignmentsTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_semantic_type_registration(self):
+        self.assertRegisteredSemanticType(CIGARAlignments)
+
+
+class CIGARAlignmentsFormatTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_valid(self):
+        fp = self.get_data_path('cigar-alignments/alignments.tsv')
+        format = CIGARAlignmentsFormat(fp, mode='r')
+        format.validate(level='max')
+
+    def test_invalid_aligned_length(self):
+        fp = self.get_data_path('bad-cigar-alignments-length.tsv')
+        format = CIGARAlignmentsFormat(fp, mode='r')
+        self.assertRaisesRegex(ValidationError,
+                               "line 2 is not 23 positions long",
+                               format.validate)
+
+    def test_invalid_positions(self):
+        fp = self.get_data_path('bad-cigar-alignments-positions.tsv')
+        format = CIGARAlignmentsFormat(fp, mode='r')
+        self.assertRaisesRegex(ValidationError,
+                               "positions on line 2 don't match",
+                               format.validate)
+
+
+class CIGARAlignmentsDirectoryFormatTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_valid(self):
+        fp = self.get_data_path('cigar-alignments')
+        format = CIGARAlignmentsDirectoryFormat(fp, mode='r')
+        format.validate(level='max')
+
+    def test_targets_out_of_order(self):
+        fp = self.temp_dir.name + '/cigar-alignments'
+        shutil.copytree(self.get_data_path('cigar-alignments'), fp)
+        with open(fp + '/targets.fasta', 'w') as fh:
+            fh.write('>ref-2\nAAAAGGTTT\n>ref-1\nAAAAAAAAGGGGCCTTTTTTTT\n'
+                     '>ref-3\nACGTACGTAC\n')
+        format = CIGARAlignmentsDirectoryFormat(fp, mode='r')
+        self.assertRaisesRegex(ValidationError,
+                               "Alignment 1 is of 'ref-1', but target 1 is "
+                               "'ref-2'",
+                               format.validate)
+
+
+class SequenceStatsTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_semantic_type_registration(self):
+        self.assertRegisteredSemanticType(SequenceStats)
+
+
+class SequenceStatsFormatTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_valid(self):
+        fp = self.get_data_path('sequence-stats/stats.tsv')
+        format = SequenceStatsFormat(fp, mode='r')
+        format.validate(level='max')
+
+    def test_invalid_names(self):
+        fp = self.get_data_path('bad-sequence-stats-names.tsv')
+        format = SequenceStatsFormat(fp, mode='r')
+        self.assertRaisesRegex(ValidationError,
+                               "got: count, total_length, max_length",
+                               format.validate)
+
+
+class SequenceLengthsFormatTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_valid(self):
+        fp = self.get_data_path('sequence-stats/length-histogram.tsv')
+        format = SequenceLengthsFormat(fp, mode='r')
+        format.validate(level='max')
+
+    def test_invalid_order(self):
+        fp = self.get_data_path('bad-sequence-lengths-order.tsv')
+        format = SequenceLengthsFormat(fp, mode='r')
+        self.assertRaisesRegex(ValidationError,
+                               "line 4 has a length of 22",
+                               format.validate)
+
+
+class SequenceStatsDirectoryFormatTests(TestPluginBase):
+    package = 'mytoy1.tests'
+
+    def test_valid(self):
+        fp = self.get_data_path('sequence-stats')
+        format = SequenceStatsDirectoryFormat(fp, mode='r')
+        format.validate(level='max')
+
+    def test_count_mismatch(self):
+        fp = self.temp_dir.name + '/sequence-stats'
+        shutil.copytree(self.get_data_path('sequence-stats'), fp)
+        with open(fp + '/length-histogram.tsv', 'w') as fh:
+            fh.write('length\tcount\n4\t1\n24\t2\n')
+        format = SequenceStatsDirectoryFormat(fp, mode='r')
+        self.assertRaisesRegex(ValidationError,
+                               "histogram has 3 sequences, but the count is "
+                               "4",
+                               format.validate)
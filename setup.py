@@ -32,7 +32,7 @@ setup(
     },
     package_data={
         "mytoy1": ["citations.bib"],
-        "mytoy1.tests": ["data/*"],
+        "mytoy1.tests": ["data/*", "data/*/*"],
     },
     zip_safe=False,
 )